@@ -0,0 +1,21 @@
+#!/usr/bin/python
+
+# Nothing is imported up front: "import acrylic_guitar" is cheap, and the guitar
+# itself (and through it the MIDI and output libraries) loads on first use.
+
+
+__all__ = ['AcrylicGuitar', 'DisplayMode', 'MidiMessageType', 'Color', 'constrain']
+
+
+
+# {{{ def __getattr__(name):
+def __getattr__(name):
+   if name in __all__:
+      from acrylic_guitar import guitar
+      return getattr(guitar, name)
+
+   raise AttributeError("module 'acrylic_guitar' has no attribute '%s'" % name)
+# def __getattr__(name):
+
+
+# }}}
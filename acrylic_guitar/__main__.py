@@ -0,0 +1,11 @@
+#!/usr/bin/python
+
+
+import sys
+
+from acrylic_guitar.cli import main
+
+
+# The guard matters: the render process is spawned, and re-imports this module
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/python
+
+
+import importlib
+
+from acrylic_guitar import fixed_point
+
+
+
+# Output backends by name, as (module, class). A backend's module is only
+# imported when it's selected, so e.g. RPi.GPIO is never loaded for network output.
+BACKENDS = {
+   'gpio'  : ('acrylic_guitar.backends.gpio', 'GpioOutput'),
+   'artnet': ('acrylic_guitar.backends.dmx' , 'ArtNetOutput'),
+   'sacn'  : ('acrylic_guitar.backends.dmx' , 'SacnOutput'),
+   'null'  : ('acrylic_guitar.backends.null', 'NullOutput'),
+
+   # Plays fades as segments and checks their timing, for benchmarks
+   'fake_segments': ('acrylic_guitar.backends.fake', 'FakeSegmentOutput'),
+
+   # Keeps every frame written, for simulations
+   'recorder': ('acrylic_guitar.backends.fake', 'RecordingOutput'),
+
+   # Only for use inside the render process
+   'shared_memory': ('acrylic_guitar.backends.shared_memory', 'SharedMemoryOutput'),
+}
+
+
+
+# {{{ class OutputBackend:
+class OutputBackend:
+   # Something that shows the guitar's current color. Backends read their
+   # settings from the guitar they're created for, or from a zone, which has
+   # the same settings with some of them overridden.
+
+   # Whether the backend can play a whole fade itself (see play_segment()). Fades
+   # only go out as segments when every output can; otherwise they're written a
+   # frame at a time.
+   SUPPORTS_SEGMENTS = False
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      self.guitar = guitar
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def start(self, color):
+   def start(self, color):
+      # Set up the hardware, showing the given color
+      pass
+   # def start(self, color):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      # Show a color, each channel a percentage already constrained to 0-100
+      raise NotImplementedError()
+   # def write(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def write_fixed(self, red, green, blue):
+   def write_fixed(self, red, green, blue):
+      # Show a fixed-point color (see fixed_point), each channel already within
+      # 0-FULL_SCALE. Backends that can take integers directly override this.
+      self.write(red / fixed_point.ONE_PERCENT, green / fixed_point.ONE_PERCENT, blue / fixed_point.ONE_PERCENT)
+   # def write_fixed(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def play_segment(self, segment):
+   def play_segment(self, segment):
+      # Play a segments.Segment on the backend's own timing, replacing any segment it's
+      # playing, and hold its end color after. A write() also replaces the segment.
+      raise NotImplementedError()
+   # def play_segment(self, segment):
+
+
+   # }}}
+   # {{{ def stop_segment(self, now):
+   def stop_segment(self, now):
+      # Stop the segment playing, holding the color it's at at the given frame clock time
+      raise NotImplementedError()
+   # def stop_segment(self, now):
+
+
+   # }}}
+   # {{{ def keep_alive(self):
+   def keep_alive(self):
+      # Called while a mode is idling, for outputs that need refreshing
+      pass
+   # def keep_alive(self):
+
+
+   # }}}
+   # {{{ def stop(self):
+   def stop(self):
+      pass
+   # def stop(self):
+
+
+   # }}}
+# class OutputBackend:
+
+
+# }}}
+
+# {{{ def create_backend(name, guitar):
+def create_backend(name, guitar):
+   if name not in BACKENDS:
+      raise RuntimeError("Unknown output backend: '%s'" % name)
+
+   module_name, class_name = BACKENDS[name]
+   module = importlib.import_module(module_name)
+
+   return getattr(module, class_name)(guitar)
+# def create_backend(name, guitar):
+
+
+# }}}
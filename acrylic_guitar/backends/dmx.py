@@ -0,0 +1,111 @@
+#!/usr/bin/python
+
+
+import logging
+
+from acrylic_guitar import fixed_point
+from acrylic_guitar import network_output
+from acrylic_guitar.backends import OutputBackend
+
+
+# The DMX level for each fixed-point value, rounded as write() does
+DMX_LEVELS = bytes([((value * 255) + (fixed_point.FULL_SCALE // 2)) // fixed_point.FULL_SCALE for value in range(fixed_point.FULL_SCALE + 1)])
+
+
+# {{{ class DmxOutput(OutputBackend):
+class DmxOutput(OutputBackend):
+   # Shows the color on RGB fixtures over the network, all fixtures in a
+   # universe going out in the same datagram
+   PROTOCOL = None
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      OutputBackend.__init__(self, guitar)
+
+      self.fixtures       = list(guitar.NETWORK_OUTPUT_FIXTURES)
+      self.network_output = None
+
+      # Reused for each fixed-point frame
+      self.__dmx_color = bytearray(3)
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def start(self, color):
+   def start(self, color):
+      universes = sorted(set([universe for universe, channel in self.fixtures]))
+
+      logging.debug("Starting %s output for universes %s", self.PROTOCOL, universes)
+      self.network_output = network_output.create_network_output(
+         self.PROTOCOL, universes, self.guitar.NETWORK_OUTPUT_HOST, None, self.guitar.NETWORK_OUTPUT_KEEP_ALIVE
+      )
+
+      self.write(color['red'], color['green'], color['blue'])
+   # def start(self, color):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      # Scale from percent to DMX levels
+      dmx_color = (int(red * 2.55 + 0.5), int(green * 2.55 + 0.5), int(blue * 2.55 + 0.5))
+
+      for universe, channel in self.fixtures:
+         self.network_output.set_channels(universe, channel, dmx_color)
+
+      self.network_output.send_frame()
+   # def write(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def write_fixed(self, red, green, blue):
+   def write_fixed(self, red, green, blue):
+      dmx_color    = self.__dmx_color
+      dmx_color[0] = DMX_LEVELS[red]
+      dmx_color[1] = DMX_LEVELS[green]
+      dmx_color[2] = DMX_LEVELS[blue]
+
+      for universe, channel in self.fixtures:
+         self.network_output.set_channels(universe, channel, dmx_color)
+
+      self.network_output.send_frame()
+   # def write_fixed(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def keep_alive(self):
+   def keep_alive(self):
+      self.network_output.send_frame()
+   # def keep_alive(self):
+
+
+   # }}}
+   # {{{ def stop(self):
+   def stop(self):
+      if self.network_output:
+         self.network_output.blackout()
+         self.network_output.close()
+      # if self.network_output:
+   # def stop(self):
+
+
+   # }}}
+# class DmxOutput(OutputBackend):
+
+
+# }}}
+# {{{ class ArtNetOutput(DmxOutput):
+class ArtNetOutput(DmxOutput):
+   PROTOCOL = 'artnet'
+# class ArtNetOutput(DmxOutput):
+
+
+# }}}
+# {{{ class SacnOutput(DmxOutput):
+class SacnOutput(DmxOutput):
+   PROTOCOL = 'sacn'
+# class SacnOutput(DmxOutput):
+
+
+# }}}
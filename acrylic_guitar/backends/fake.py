@@ -0,0 +1,144 @@
+#!/usr/bin/python
+
+
+import collections
+
+from acrylic_guitar.backends import OutputBackend
+
+
+
+# How far (percent) a new segment can start from the color being shown before it
+# counts as a jump: a few frames of the fastest fades
+MAX_SEGMENT_JUMP = 5.0
+
+# How many segments to keep for looking over afterwards
+SEGMENT_HISTORY = 1000
+
+
+
+# {{{ class FakeSegmentOutput(OutputBackend):
+class FakeSegmentOutput(OutputBackend):
+   # Plays segments the way hardware would, by working out the color at any time from
+   # the segment rather than being told each frame, and checks the timing of what it's
+   # sent: segments should arrive by the frame they start in, and pick up from the
+   # color being shown. Shows nothing; for benchmarks and trying the segment protocol.
+   SUPPORTS_SEGMENTS = True
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      OutputBackend.__init__(self, guitar)
+
+      self.frame_clock = guitar.frame_clock
+
+      # The segment playing, or None when holding color (percentages, brightness applied)
+      self.segment = None
+      self.color   = (0.0, 0.0, 0.0)
+
+      self.frames_written  = 0
+      self.segments_played = 0
+      self.segments_late   = 0
+      self.segment_jumps   = 0
+      self.max_start_lag   = 0.0
+
+      # (time received, segment) for the latest segments
+      self.segments = collections.deque(maxlen=SEGMENT_HISTORY)
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def start(self, color):
+   def start(self, color):
+      self.color = (color['red'], color['green'], color['blue'])
+   # def start(self, color):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      self.segment         = None
+      self.color           = (red, green, blue)
+      self.frames_written += 1
+   # def write(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def play_segment(self, segment):
+   def play_segment(self, segment):
+      now = self.frame_clock.now()
+
+      # Hardware would have to start the segment late
+      lag = now - segment.start_time
+      if lag > self.max_start_lag:
+         self.max_start_lag = lag
+      if lag > segment.frame_interval:
+         self.segments_late += 1
+
+      # The new segment should carry on from what's showing, not jump
+      showing  = self.get_color(now)
+      starting = segment.get_output_color(now)
+
+      if max([abs(starting[channel] - showing[channel]) for channel in range(3)]) > MAX_SEGMENT_JUMP:
+         self.segment_jumps += 1
+
+      self.segment          = segment
+      self.segments_played += 1
+      self.segments.append((now, segment))
+   # def play_segment(self, segment):
+
+
+   # }}}
+   # {{{ def stop_segment(self, now):
+   def stop_segment(self, now):
+      if self.segment is not None:
+         self.color   = self.segment.get_output_color(now)
+         self.segment = None
+      # if self.segment is not None:
+   # def stop_segment(self, now):
+
+
+   # }}}
+   # {{{ def get_color(self, now):
+   def get_color(self, now):
+      # The color being shown at the given frame clock time
+      if self.segment is not None:
+         return self.segment.get_output_color(now)
+
+      return self.color
+   # def get_color(self, now):
+
+
+   # }}}
+# class FakeSegmentOutput(OutputBackend):
+
+
+# }}}
+# {{{ class RecordingOutput(OutputBackend):
+class RecordingOutput(OutputBackend):
+   # Keeps every frame written, as (frame, red, green, blue) on the guitar's frame
+   # clock, so a run can be checked frame by frame afterwards. Shows nothing; for
+   # simulations (see simulation.Simulation).
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      OutputBackend.__init__(self, guitar)
+
+      self.frame_clock = guitar.frame_clock
+
+      self.frames = []
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      self.frames.append((self.frame_clock.current_frame(), red, green, blue))
+   # def write(self, red, green, blue):
+
+
+   # }}}
+# class RecordingOutput(OutputBackend):
+
+
+# }}}
@@ -0,0 +1,142 @@
+#!/usr/bin/python
+
+
+import array
+
+try:
+   import RPi.GPIO as GPIO
+except RuntimeError:
+   # RPi.GPIO raises this when it can't get at the hardware, e.g. when not run as root
+   raise RuntimeError("Error importing RPi.GPIO")
+
+from acrylic_guitar import fixed_point
+from acrylic_guitar.backends import OutputBackend
+
+
+# The duty cycle for each fixed-point value
+DUTY_CYCLES = array.array('d', [value / fixed_point.ONE_PERCENT for value in range(fixed_point.FULL_SCALE + 1)])
+
+
+# {{{ class GpioOutput(OutputBackend):
+class GpioOutput(OutputBackend):
+   # An RGB LED on three PWM pins, plus a status LED that's lit while we run
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      OutputBackend.__init__(self, guitar)
+
+      self.red_led    = None
+      self.green_led  = None
+      self.blue_led   = None
+
+      self.__duty_cycle_metric = guitar.metric_duty_cycle_changes
+
+      # The fixed-point color last written, or None after a write() in percent
+      self.__last_fixed = None
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def start(self, color):
+   def start(self, color):
+      guitar = self.guitar
+
+      #GPIO.setwarnings(False)
+      GPIO.setmode(GPIO.BOARD)
+
+
+      GPIO.setup([guitar.PIN_R, guitar.PIN_G, guitar.PIN_B], GPIO.OUT, initial=GPIO.LOW)
+
+      self.red_led = GPIO.PWM(guitar.PIN_R, guitar.PWM_FREQUENCY)
+      self.red_led.start(color['red'])
+
+      self.green_led = GPIO.PWM(guitar.PIN_G, guitar.PWM_FREQUENCY)
+      self.green_led.start(color['green'])
+
+      self.blue_led = GPIO.PWM(guitar.PIN_B, guitar.PWM_FREQUENCY)
+      self.blue_led.start(color['blue'])
+
+      # Turn on status LED to indicate we're running. With several zones only one has it.
+      if guitar.PIN_LED is not None:
+         GPIO.setup(guitar.PIN_LED, GPIO.OUT)
+         GPIO.output(guitar.PIN_LED, GPIO.HIGH)
+      # if guitar.PIN_LED is not None:
+   # def start(self, color):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      self.red_led.ChangeDutyCycle(red)
+      self.green_led.ChangeDutyCycle(green)
+      self.blue_led.ChangeDutyCycle(blue)
+
+      self.__duty_cycle_metric.inc(3)
+
+      self.__last_fixed = None
+   # def write(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def write_fixed(self, red, green, blue):
+   def write_fixed(self, red, green, blue):
+      # Only change the duty cycles that differ, as each change is a call into the driver
+      last_fixed = self.__last_fixed
+      if last_fixed is None:
+         self.red_led.ChangeDutyCycle(DUTY_CYCLES[red])
+         self.green_led.ChangeDutyCycle(DUTY_CYCLES[green])
+         self.blue_led.ChangeDutyCycle(DUTY_CYCLES[blue])
+
+         self.__duty_cycle_metric.inc(3)
+         self.__last_fixed = [red, green, blue]
+         return
+      # if last_fixed is None:
+
+      changes = 0
+      if red != last_fixed[0]:
+         self.red_led.ChangeDutyCycle(DUTY_CYCLES[red])
+         last_fixed[0]  = red
+         changes       += 1
+      # if red != last_fixed[0]:
+      if green != last_fixed[1]:
+         self.green_led.ChangeDutyCycle(DUTY_CYCLES[green])
+         last_fixed[1]  = green
+         changes       += 1
+      # if green != last_fixed[1]:
+      if blue != last_fixed[2]:
+         self.blue_led.ChangeDutyCycle(DUTY_CYCLES[blue])
+         last_fixed[2]  = blue
+         changes       += 1
+      # if blue != last_fixed[2]:
+
+      if changes:
+         self.__duty_cycle_metric.inc(changes)
+   # def write_fixed(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def stop(self):
+   def stop(self):
+      if self.red_led:   self.red_led.stop()
+      if self.green_led: self.green_led.stop()
+      if self.blue_led:  self.blue_led.stop()
+
+      guitar = self.guitar
+      pins   = [guitar.PIN_R, guitar.PIN_G, guitar.PIN_B]
+
+      if guitar.PIN_LED is not None:
+         GPIO.output(guitar.PIN_LED, GPIO.LOW)
+         pins.append(guitar.PIN_LED)
+      # if guitar.PIN_LED is not None:
+
+      # Only release our own pins, as other zones may still be using theirs
+      GPIO.cleanup(pins)
+   # def stop(self):
+
+
+   # }}}
+# class GpioOutput(OutputBackend):
+
+
+# }}}
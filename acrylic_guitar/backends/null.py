@@ -0,0 +1,59 @@
+#!/usr/bin/python
+
+
+import time
+import array
+
+from acrylic_guitar.backends import OutputBackend
+
+
+
+# {{{ class NullOutput(OutputBackend):
+class NullOutput(OutputBackend):
+   # Shows nothing, but keeps the last color and counts frames: for running
+   # without hardware, and for benchmarks
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      OutputBackend.__init__(self, guitar)
+
+      # The last color written, as percentages, or as fixed-point from write_fixed()
+      self.color            = (0.0, 0.0, 0.0)
+      self.fixed_color      = array.array('H', [0, 0, 0])
+      self.frames_written   = 0
+      self.first_write_time = None
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      if self.first_write_time is None:
+         self.first_write_time = time.monotonic()
+
+      self.color           = (red, green, blue)
+      self.frames_written += 1
+   # def write(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def write_fixed(self, red, green, blue):
+   def write_fixed(self, red, green, blue):
+      if self.first_write_time is None:
+         self.first_write_time = time.monotonic()
+
+      fixed_color    = self.fixed_color
+      fixed_color[0] = red
+      fixed_color[1] = green
+      fixed_color[2] = blue
+
+      self.frames_written += 1
+   # def write_fixed(self, red, green, blue):
+
+
+   # }}}
+# class NullOutput(OutputBackend):
+
+
+# }}}
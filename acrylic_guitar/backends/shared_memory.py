@@ -0,0 +1,40 @@
+#!/usr/bin/python
+
+
+from acrylic_guitar.backends import OutputBackend
+
+
+
+# {{{ class SharedMemoryOutput(OutputBackend):
+class SharedMemoryOutput(OutputBackend):
+   # Used inside the render process: hands each frame to the MIDI/output process
+   # through the guitar's render link, which drives the real outputs
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      OutputBackend.__init__(self, guitar)
+
+      self.render_link = guitar.render_link
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def start(self, color):
+   def start(self, color):
+      self.write(color['red'], color['green'], color['blue'])
+   # def start(self, color):
+
+
+   # }}}
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      self.render_link.publish_frame(red, green, blue)
+   # def write(self, red, green, blue):
+
+
+   # }}}
+# class SharedMemoryOutput(OutputBackend):
+
+
+# }}}
@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+
+import sys
+import logging
+import argparse
+
+from acrylic_guitar import backends
+
+
+
+# {{{ def parse_fixture(value):
+def parse_fixture(value):
+   # "UNIVERSE:CHANNEL", e.g. "1:4" for a fixture on channels 4-6 of universe 1
+   try:
+      universe, channel = value.split(':')
+      return (int(universe), int(channel))
+   except ValueError:
+      raise argparse.ArgumentTypeError("Fixtures are given as UNIVERSE:CHANNEL, not '%s'" % value)
+   # except ValueError:
+# def parse_fixture(value):
+
+
+# }}}
+# {{{ def get_argument_parser():
+def get_argument_parser():
+   parser = argparse.ArgumentParser(prog='acrylic-guitar', description='Light up the acrylic guitar from MIDI input.')
+
+   parser.add_argument('-b', '--backend', action='append', choices=sorted(backends.BACKENDS), dest='backends',
+      help="Output to drive; repeat for several (default: gpio)")
+   parser.add_argument('-m', '--mode', type=int,
+      help="Display mode to start in")
+   parser.add_argument('-q', '--quiet', action='store_true',
+      help="Only log warnings and errors")
+   parser.add_argument('--render-process', action='store_true',
+      help="Render in a separate process, on its own core")
+   parser.add_argument('--fixed-point', action='store_true',
+      help="Fade with integer arithmetic; only measurably faster for velocity-scaled fades (see bench_fixed_point.py)")
+   parser.add_argument('--fixed-frame-rate', action='store_true',
+      help="Render every frame, rather than fewer when idle or overloaded")
+   parser.add_argument('--power-budget', type=float, metavar='AMPS',
+      help="Dim frames that would draw more than this from the LED supply")
+   parser.add_argument('--seed', type=int,
+      help="Seed for the random modes, to repeat a run (default: a new one each run, logged)")
+   parser.add_argument('--midi-latency', type=float, metavar='SECONDS',
+      help="Constant delay from playing a note to the lights changing; 0 applies MIDI as it's read (default: 0.02)")
+   parser.add_argument('--midi-thru', metavar='DEVICE',
+      help="Pass all MIDI read on to this MIDI output")
+   parser.add_argument('--midi-state', action='store_true',
+      help="Also send the display mode and color to the MIDI thru output")
+
+   network = parser.add_argument_group('network output')
+   network.add_argument('--network-host',
+      help="Host to send Art-Net/sACN packets to (default: broadcast/multicast)")
+   network.add_argument('--fixture', action='append', type=parse_fixture, dest='fixtures', metavar='UNIVERSE:CHANNEL',
+      help="RGB fixture to drive; repeat for several")
+
+   cluster = parser.add_argument_group('cluster sync')
+   cluster.add_argument('--cluster', choices=['leader', 'follower'],
+      help="Sync with other guitars as the leader or a follower")
+   cluster.add_argument('--cluster-address',
+      help="Multicast group or broadcast address for sync packets")
+   cluster.add_argument('--cluster-port', type=int,
+      help="UDP port for sync packets")
+   cluster.add_argument('--follow-midi', action='store_true',
+      help="As a follower, take key state from the leader")
+
+   diagnostics = parser.add_argument_group('diagnostics')
+   diagnostics.add_argument('--metrics-port', type=int,
+      help="Serve Prometheus metrics on this port")
+   diagnostics.add_argument('--state-file', metavar='PATH',
+      help="Publish live state to this file, for acrylic-guitar-monitor and dashboards")
+   diagnostics.add_argument('--profile', action='store_true',
+      help="Start with hot-path profiling on (SIGUSR2 toggles, SIGUSR1 dumps)")
+   diagnostics.add_argument('--profile-path',
+      help="Where to write profile traces; %%s is replaced by a timestamp")
+
+   return parser
+# def get_argument_parser():
+
+
+# }}}
+# {{{ def main(argv = None):
+def main(argv = None):
+   options = get_argument_parser().parse_args(argv)
+
+   logging.basicConfig(level=logging.WARNING if options.quiet else logging.DEBUG, format='(%(threadName)-15s) %(message)s',)
+
+
+   # Only now load the guitar, and with it whatever the options need
+   from acrylic_guitar.guitar import AcrylicGuitar
+
+   try:
+      ag = AcrylicGuitar()
+
+      if options.backends:
+         ag.OUTPUT_BACKENDS = options.backends
+      if options.mode is not None:
+         ag.display_mode = options.mode
+      ag.RENDER_PROCESS = options.render_process
+      ag.DISPLAY_MANAGER__FIXED_POINT = options.fixed_point
+      ag.DISPLAY_MANAGER__ADAPTIVE_FRAME_RATE = not options.fixed_frame_rate
+      if options.midi_latency is not None:
+         ag.MIDI_READER__TARGET_LATENCY = options.midi_latency
+      if options.midi_thru:
+         ag.MIDI_THRU__OUTPUT = options.midi_thru
+      ag.MIDI_THRU__SEND_STATE = options.midi_state
+      if options.seed is not None:
+         ag.PATTERN_SEED = options.seed
+      if options.power_budget:
+         ag.POWER_LIMITER__BUDGET = options.power_budget
+
+      if options.network_host:
+         ag.NETWORK_OUTPUT_HOST = options.network_host
+      if options.fixtures:
+         ag.NETWORK_OUTPUT_FIXTURES = options.fixtures
+
+      ag.CLUSTER_ROLE        = options.cluster
+      ag.CLUSTER_FOLLOW_MIDI = options.follow_midi
+      if options.cluster_address:
+         ag.CLUSTER_ADDRESS = options.cluster_address
+      if options.cluster_port:
+         ag.CLUSTER_PORT = options.cluster_port
+
+      ag.METRICS_PORT = options.metrics_port
+      if options.state_file:
+         ag.STATE_EXPORT_PATH = options.state_file
+      if options.profile:
+         ag.profiler.enabled = True
+      if options.profile_path:
+         ag.PROFILER_TRACE_PATH = options.profile_path
+
+      ag.run()
+
+   except RuntimeError as e:
+      logging.error("ERROR: %s", e)
+      return 1
+   except KeyboardInterrupt:
+      pass
+   # except KeyboardInterrupt:
+
+   return 0
+# def main(argv = None):
+
+
+# }}}
+
+
+if __name__ == '__main__':
+   sys.exit(main())
@@ -0,0 +1,326 @@
+#!/usr/bin/python
+
+
+import time
+import socket
+import struct
+import logging
+import threading
+
+
+
+# Default UDP port and group for cluster sync packets
+CLUSTER_PORT    = 5599
+CLUSTER_ADDRESS = '239.255.42.99'
+
+
+# Magic, version, flags, sequence, leader time, frame interval, display mode,
+# mode epoch frame, mode start color, current color, lowest key, max velocity,
+# and a bitmap of held keys: 73 bytes in all
+PACKET_MAGIC   = b'AGCS'
+PACKET_VERSION = 1
+PACKET_FORMAT  = struct.Struct('>4sBBIdfBQffffffBB16s')
+
+# Set when the packet carries the leader's MIDI key state
+FLAG_MIDI_STATE = 0x01
+
+# Sent in place of lowest_key_on when no key is held
+NO_KEY = 0xff
+
+
+
+# {{{ class ClusterState:
+class ClusterState:
+   # What the leader is showing, as carried by each sync packet
+
+
+   # {{{ def __init__(self):
+   def __init__(self):
+      self.sequence         = 0
+      self.leader_time      = 0.0
+      self.frame_interval   = 0.0
+
+      self.display_mode     = 0
+      self.mode_epoch_frame = 0
+      self.mode_start_color = {'red': 0, 'green': 0, 'blue': 0}
+      self.current_color    = {'red': 0, 'green': 0, 'blue': 0}
+
+      self.midi_state       = False
+      self.lowest_key_on    = None
+      self.max_key_velocity = 0
+      self.keys_held        = bytes(16)
+   # def __init__(self):
+
+
+   # }}}
+# class ClusterState:
+
+
+# }}}
+
+# {{{ def pack_state(state):
+def pack_state(state):
+   return PACKET_FORMAT.pack(
+      PACKET_MAGIC, PACKET_VERSION, FLAG_MIDI_STATE if state.midi_state else 0,
+      state.sequence & 0xffffffff, state.leader_time, state.frame_interval,
+      state.display_mode, state.mode_epoch_frame,
+      state.mode_start_color['red'], state.mode_start_color['green'], state.mode_start_color['blue'],
+      state.current_color['red']   , state.current_color['green']   , state.current_color['blue']   ,
+      NO_KEY if state.lowest_key_on is None else state.lowest_key_on, state.max_key_velocity,
+      state.keys_held
+   )
+# def pack_state(state):
+
+
+# }}}
+# {{{ def unpack_state(packet):
+def unpack_state(packet):
+   # Returns None for anything that isn't a sync packet we understand
+   if len(packet) != PACKET_FORMAT.size:
+      return None
+
+   fields = PACKET_FORMAT.unpack(packet)
+   if fields[0] != PACKET_MAGIC or fields[1] != PACKET_VERSION:
+      return None
+
+   state = ClusterState()
+   state.midi_state       = bool(fields[2] & FLAG_MIDI_STATE)
+   state.sequence         = fields[3]
+   state.leader_time      = fields[4]
+   state.frame_interval   = fields[5]
+   state.display_mode     = fields[6]
+   state.mode_epoch_frame = fields[7]
+   state.mode_start_color = {'red': fields[8] , 'green': fields[9] , 'blue': fields[10]}
+   state.current_color    = {'red': fields[11], 'green': fields[12], 'blue': fields[13]}
+   state.lowest_key_on    = None if fields[14] == NO_KEY else fields[14]
+   state.max_key_velocity = fields[15]
+   state.keys_held        = fields[16]
+
+   return state
+# def unpack_state(packet):
+
+
+# }}}
+# {{{ def is_multicast(address):
+def is_multicast(address):
+   try:
+      return 224 <= int(address.split('.')[0]) <= 239
+   except ValueError:
+      return False
+# def is_multicast(address):
+
+
+# }}}
+# {{{ class ClusterLeader:
+class ClusterLeader:
+   # Broadcasts the leader's frame clock and display state at a fixed rate, or
+   # straight away when woken (e.g. on a mode change)
+
+
+   # {{{ def __init__(self, get_state, frame_clock, address = CLUSTER_ADDRESS, port = CLUSTER_PORT, interval = 0.05):
+   def __init__(self, get_state, frame_clock, address = CLUSTER_ADDRESS, port = CLUSTER_PORT, interval = 0.05):
+      self.get_state   = get_state
+      self.frame_clock = frame_clock
+      self.address     = address
+      self.port        = port
+      self.interval    = interval
+
+      self.packets_sent = 0
+
+      self.__wake_event = threading.Event()
+      self.__sequence   = 0
+   # def __init__(self, get_state, frame_clock, address = CLUSTER_ADDRESS, port = CLUSTER_PORT, interval = 0.05):
+
+
+   # }}}
+   # {{{ def wake(self):
+   def wake(self):
+      self.__wake_event.set()
+   # def wake(self):
+
+
+   # }}}
+   # {{{ def run(self, stop_event):
+   def run(self, stop_event):
+      sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+
+      if is_multicast(self.address):
+         sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+         sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+      # if is_multicast(self.address):
+
+      logging.debug("Cluster leader sending to %s:%d", self.address, self.port)
+
+      try:
+         while not stop_event.is_set():
+            state = self.get_state()
+
+            self.__sequence   += 1
+            state.sequence     = self.__sequence
+            state.leader_time  = self.frame_clock.now()
+
+            try:
+               sock.sendto(pack_state(state), (self.address, self.port))
+               self.packets_sent += 1
+            except OSError as e:
+               logging.debug("Unable to send cluster sync packet: %s", e)
+            # except OSError as e:
+
+            self.__wake_event.wait(self.interval)
+            self.__wake_event.clear()
+         # while not stop_event.is_set():
+      finally:
+         sock.close()
+      # finally:
+   # def run(self, stop_event):
+
+
+   # }}}
+# class ClusterLeader:
+
+
+# }}}
+# {{{ class ClusterFollower:
+class ClusterFollower:
+   # Listens for the leader's packets and tracks the leader's clock with an
+   # alpha-beta filter: a smoothed offset plus a drift rate, so leader_time()
+   # stays locked between packets and across lost ones. Each packet is handed to
+   # on_state() for the guitar to mirror the leader's mode and MIDI state.
+
+   # Filter gains for the offset and drift estimates
+   OFFSET_GAIN = 0.1
+   DRIFT_GAIN  = 0.01
+
+   # Largest drift (sec/sec) we'll believe between two clocks
+   MAX_DRIFT = 0.0005
+
+   # Errors bigger than this (sec) mean the leader restarted, so start over
+   RESYNC_THRESHOLD = 0.25
+
+
+   # {{{ def __init__(self, on_state, address = CLUSTER_ADDRESS, port = CLUSTER_PORT, clock = None):
+   def __init__(self, on_state, address = CLUSTER_ADDRESS, port = CLUSTER_PORT, clock = None):
+      self.on_state = on_state
+      self.address  = address
+      self.port     = port
+      self.clock    = clock if clock else time.monotonic
+
+      self.packets_received = 0
+      self.last_error       = 0.0
+
+      # (local reference time, offset at that time, drift), swapped as a whole so
+      # leader_time() never sees a half-updated estimate
+      self.__estimate      = None
+      self.__last_sequence = None
+   # def __init__(self, on_state, address = CLUSTER_ADDRESS, port = CLUSTER_PORT, clock = None):
+
+
+   # }}}
+   # {{{ def is_locked(self):
+   def is_locked(self):
+      return self.__estimate is not None
+   # def is_locked(self):
+
+
+   # }}}
+   # {{{ def leader_time(self):
+   def leader_time(self):
+      # Until we've heard from the leader, run on our own clock
+      now      = self.clock()
+      estimate = self.__estimate
+
+      if estimate is None:
+         return now
+
+      reference, offset, drift = estimate
+      return now + offset + drift * (now - reference)
+   # def leader_time(self):
+
+
+   # }}}
+   # {{{ def run(self, stop_event):
+   def run(self, stop_event):
+      sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+      if hasattr(socket, 'SO_REUSEPORT'):
+         sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+
+      sock.bind(('', self.port))
+
+      if is_multicast(self.address):
+         membership = socket.inet_aton(self.address) + socket.inet_aton('0.0.0.0')
+         sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+      # if is_multicast(self.address):
+
+      sock.settimeout(0.1)
+
+      logging.debug("Cluster follower listening on %s:%d", self.address, self.port)
+
+      try:
+         while not stop_event.is_set():
+            try:
+               packet = sock.recv(1024)
+            except socket.timeout:
+               continue
+
+            received_at = self.clock()
+
+            state = unpack_state(packet)
+            if state is None:
+               continue
+
+            # Drop duplicates and stragglers that arrive after a newer packet. A
+            # sequence far behind ours means the leader restarted, so accept it.
+            if self.__last_sequence is not None and ((self.__last_sequence - state.sequence) & 0xffffffff) < 64:
+               continue
+
+            self.__last_sequence = state.sequence
+            self.packets_received += 1
+
+            self.update_estimate(state.leader_time, received_at)
+            self.on_state(state)
+         # while not stop_event.is_set():
+      finally:
+         sock.close()
+      # finally:
+   # def run(self, stop_event):
+
+
+   # }}}
+   # {{{ def update_estimate(self, leader_time, local_time):
+   def update_estimate(self, leader_time, local_time):
+      sample   = leader_time - local_time
+      estimate = self.__estimate
+
+      if estimate is None:
+         self.__estimate = (local_time, sample, 0.0)
+         return
+      # if estimate is None:
+
+      reference, offset, drift = estimate
+      elapsed   = local_time - reference
+      predicted = offset + drift * elapsed
+      error     = sample - predicted
+
+      self.last_error = error
+
+      if abs(error) > self.RESYNC_THRESHOLD:
+         logging.debug("Cluster clock jumped by %0.3f sec, resyncing", error)
+         self.__estimate = (local_time, sample, 0.0)
+         return
+      # if abs(error) > self.RESYNC_THRESHOLD:
+
+      offset = predicted + self.OFFSET_GAIN * error
+      if elapsed > 0:
+         drift = max(-self.MAX_DRIFT, min(self.MAX_DRIFT, drift + self.DRIFT_GAIN * error / elapsed))
+
+      self.__estimate = (local_time, offset, drift)
+   # def update_estimate(self, leader_time, local_time):
+
+
+   # }}}
+# class ClusterFollower:
+
+
+# }}}
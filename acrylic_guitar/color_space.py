@@ -0,0 +1,268 @@
+#!/usr/bin/python
+
+
+import math
+import colorsys
+
+
+
+# Color spaces fades can interpolate in. Colors come in and go out as RGB percentages.
+# PWM duty cycle is linear in light output, so the RGB values are taken to be linear
+# light: OKLab uses them directly, and HSV/HSL work on them as they are.
+COLOR_SPACES = ['rgb', 'hsv', 'hsl', 'oklab', 'oklch']
+
+# Most fade paths to keep. Glow modes cycle through the same few fades, so they hit.
+PATH_CACHE_SIZE = 256
+
+_path_cache = {}
+
+
+
+# Easing curves, mapping progress through a fade (0.0-1.0) to how far along the color is
+# {{{ def ease_linear(t):
+def ease_linear(t):
+   return t
+# def ease_linear(t):
+
+
+# }}}
+# {{{ def ease_in(t):
+def ease_in(t):
+   return t * t
+# def ease_in(t):
+
+
+# }}}
+# {{{ def ease_out(t):
+def ease_out(t):
+   return 1.0 - ((1.0 - t) * (1.0 - t))
+# def ease_out(t):
+
+
+# }}}
+# {{{ def ease_in_out(t):
+def ease_in_out(t):
+   return t * t * (3.0 - (2.0 * t))
+# def ease_in_out(t):
+
+
+# }}}
+# {{{ def ease_sine(t):
+def ease_sine(t):
+   return 0.5 - (0.5 * math.cos(math.pi * t))
+# def ease_sine(t):
+
+
+# }}}
+
+EASINGS = {
+   'linear'     : ease_linear,
+   'ease_in'    : ease_in,
+   'ease_out'   : ease_out,
+   'ease_in_out': ease_in_out,
+   'sine'       : ease_sine,
+}
+
+
+# {{{ def check_fade_settings(color_space, easing):
+def check_fade_settings(color_space, easing):
+   if color_space not in COLOR_SPACES:
+      raise RuntimeError("Unknown color space: '%s'" % color_space)
+   if easing not in EASINGS:
+      raise RuntimeError("Unknown easing: '%s'" % easing)
+# def check_fade_settings(color_space, easing):
+
+
+# }}}
+# {{{ def get_fade_path(start_color, end_color, num_frames, color_space = 'rgb', easing = 'linear'):
+def get_fade_path(start_color, end_color, num_frames, color_space = 'rgb', easing = 'linear'):
+   # Every frame of a fade as (red, green, blue) percentages, from start_color on frame 0
+   # to end_color on frame num_frames. Computed once per fade, so each frame is a lookup
+   # whatever the color space, and shared between fades going the same way.
+   key = (tuple(start_color), tuple(end_color), num_frames, color_space, easing)
+
+   path = _path_cache.get(key)
+   if path is not None:
+      return path
+
+   check_fade_settings(color_space, easing)
+
+   ease = EASINGS[easing]
+
+   if color_space == 'rgb':
+      start_red, start_green, start_blue = start_color
+
+      red_delta   = end_color[0] - start_red
+      green_delta = end_color[1] - start_green
+      blue_delta  = end_color[2] - start_blue
+
+      path = []
+      for frame in range(0, num_frames + 1):
+         progress = ease(float(frame) / num_frames)
+         path.append((start_red + (red_delta * progress), start_green + (green_delta * progress), start_blue + (blue_delta * progress)))
+      # for frame in range(0, num_frames + 1):
+   else:
+      to_space, from_space, hue_index = CONVERSIONS[color_space]
+
+      start = to_space(start_color[0] / 100.0, start_color[1] / 100.0, start_color[2] / 100.0)
+      end   = to_space(end_color[0]   / 100.0, end_color[1]   / 100.0, end_color[2]   / 100.0)
+
+      if hue_index is not None:
+         start, end = get_hue_path_ends(start, end, hue_index)
+
+      deltas = (end[0] - start[0], end[1] - start[1], end[2] - start[2])
+
+      path = []
+      for frame in range(0, num_frames + 1):
+         progress = ease(float(frame) / num_frames)
+
+         red, green, blue = from_space(
+            start[0] + (deltas[0] * progress), start[1] + (deltas[1] * progress), start[2] + (deltas[2] * progress)
+         )
+
+         path.append((
+            min(max(red   * 100.0, 0.0), 100.0),
+            min(max(green * 100.0, 0.0), 100.0),
+            min(max(blue  * 100.0, 0.0), 100.0),
+         ))
+      # for frame in range(0, num_frames + 1):
+   # else:
+
+   # Land exactly on the colors asked for, whatever rounding the conversions did, so
+   # the next fade starts from exactly this one's end color and can share its path
+   path[0]  = tuple(start_color)
+   path[-1] = tuple(end_color)
+
+   path = tuple(path)
+
+   if len(_path_cache) >= PATH_CACHE_SIZE:
+      _path_cache.clear()
+   _path_cache[key] = path
+
+   return path
+# def get_fade_path(start_color, end_color, num_frames, color_space = 'rgb', easing = 'linear'):
+
+
+# }}}
+# {{{ def get_hue_path_ends(start, end, hue_index):
+def get_hue_path_ends(start, end, hue_index):
+   # Make the hue go the short way round, and hold still when one end has no hue
+   # to speak of (black, white or grey) rather than sweeping in from red. In every
+   # space with a hue, saturation or chroma comes second.
+   start = list(start)
+   end   = list(end)
+
+   if start[1] < 1e-6:
+      start[hue_index] = end[hue_index]
+   elif end[1] < 1e-6:
+      end[hue_index] = start[hue_index]
+   # elif end[1] < 1e-6:
+
+   hue_delta = end[hue_index] - start[hue_index]
+   if hue_delta > 0.5:
+      end[hue_index] -= 1.0
+   elif hue_delta < -0.5:
+      end[hue_index] += 1.0
+   # elif hue_delta < -0.5:
+
+   return (start, end)
+# def get_hue_path_ends(start, end, hue_index):
+
+
+# }}}
+
+
+# Conversions from RGB (0.0-1.0) to each space and back. Hues are in turns (0.0-1.0).
+# {{{ def rgb_to_hsv(red, green, blue):
+def rgb_to_hsv(red, green, blue):
+   return colorsys.rgb_to_hsv(red, green, blue)
+# def rgb_to_hsv(red, green, blue):
+
+
+# }}}
+# {{{ def hsv_to_rgb(hue, saturation, value):
+def hsv_to_rgb(hue, saturation, value):
+   return colorsys.hsv_to_rgb(hue % 1.0, saturation, value)
+# def hsv_to_rgb(hue, saturation, value):
+
+
+# }}}
+# {{{ def rgb_to_hsl(red, green, blue):
+def rgb_to_hsl(red, green, blue):
+   hue, lightness, saturation = colorsys.rgb_to_hls(red, green, blue)
+   return (hue, saturation, lightness)
+# def rgb_to_hsl(red, green, blue):
+
+
+# }}}
+# {{{ def hsl_to_rgb(hue, saturation, lightness):
+def hsl_to_rgb(hue, saturation, lightness):
+   return colorsys.hls_to_rgb(hue % 1.0, lightness, saturation)
+# def hsl_to_rgb(hue, saturation, lightness):
+
+
+# }}}
+# {{{ def rgb_to_oklab(red, green, blue):
+def rgb_to_oklab(red, green, blue):
+   # From linear sRGB, per https://bottosson.github.io/posts/oklab/
+   l = (0.4122214708 * red) + (0.5363325363 * green) + (0.0514459929 * blue)
+   m = (0.2119034982 * red) + (0.6806995451 * green) + (0.1073969566 * blue)
+   s = (0.0883024619 * red) + (0.2817188376 * green) + (0.6299787005 * blue)
+
+   l = l ** (1.0 / 3.0)
+   m = m ** (1.0 / 3.0)
+   s = s ** (1.0 / 3.0)
+
+   return (
+      (0.2104542553 * l) + (0.7936177850 * m) - (0.0040720468 * s),
+      (1.9779984951 * l) - (2.4285922050 * m) + (0.4505937099 * s),
+      (0.0259040371 * l) + (0.7827717662 * m) - (0.8086757660 * s),
+   )
+# def rgb_to_oklab(red, green, blue):
+
+
+# }}}
+# {{{ def oklab_to_rgb(lightness, a, b):
+def oklab_to_rgb(lightness, a, b):
+   l = lightness + (0.3963377774 * a) + (0.2158037573 * b)
+   m = lightness - (0.1055613458 * a) - (0.0638541728 * b)
+   s = lightness - (0.0894841775 * a) - (1.2914855480 * b)
+
+   l = l * l * l
+   m = m * m * m
+   s = s * s * s
+
+   return (
+      ( 4.0767416621 * l) - (3.3077115913 * m) + (0.2309699292 * s),
+      (-1.2684380046 * l) + (2.6097574011 * m) - (0.3413193965 * s),
+      (-0.0041960863 * l) - (0.7034186147 * m) + (1.7076147010 * s),
+   )
+# def oklab_to_rgb(lightness, a, b):
+
+
+# }}}
+# {{{ def rgb_to_oklch(red, green, blue):
+def rgb_to_oklch(red, green, blue):
+   # OKLab in polar form, so fades keep their saturation on the way round the hues
+   lightness, a, b = rgb_to_oklab(red, green, blue)
+   return (lightness, math.hypot(a, b), (math.atan2(b, a) / (2.0 * math.pi)) % 1.0)
+# def rgb_to_oklch(red, green, blue):
+
+
+# }}}
+# {{{ def oklch_to_rgb(lightness, chroma, hue):
+def oklch_to_rgb(lightness, chroma, hue):
+   angle = hue * 2.0 * math.pi
+   return oklab_to_rgb(lightness, chroma * math.cos(angle), chroma * math.sin(angle))
+# def oklch_to_rgb(lightness, chroma, hue):
+
+
+# }}}
+
+# To a space, back from it, and which component is the hue (if any)
+CONVERSIONS = {
+   'hsv'  : (rgb_to_hsv  , hsv_to_rgb  , 0),
+   'hsl'  : (rgb_to_hsl  , hsl_to_rgb  , 0),
+   'oklab': (rgb_to_oklab, oklab_to_rgb, None),
+   'oklch': (rgb_to_oklch, oklch_to_rgb, 2),
+}
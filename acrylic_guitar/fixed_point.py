@@ -0,0 +1,109 @@
+#!/usr/bin/python
+
+
+import array
+
+from acrylic_guitar import color_space
+
+
+
+# Colors on the fixed-point render path are unsigned 16-bit integers in 1/256ths of
+# a percent, so 0-100% is 0-25600 and fits an array('H') triple with room to spare.
+ONE_PERCENT = 256
+FULL_SCALE  = 100 * ONE_PERCENT
+
+# Velocity scales are fractions of SCALE_ONE, applied with a shift
+SCALE_SHIFT = 8
+SCALE_ONE   = 1 << SCALE_SHIFT
+
+# Most fade paths to keep, as for color_space.PATH_CACHE_SIZE
+PATH_CACHE_SIZE = 256
+
+_path_cache = {}
+
+
+
+# {{{ def from_percent(value):
+def from_percent(value):
+   return int((value * ONE_PERCENT) + 0.5)
+# def from_percent(value):
+
+
+# }}}
+# {{{ def to_percent(value):
+def to_percent(value):
+   return float(value) / ONE_PERCENT
+# def to_percent(value):
+
+
+# }}}
+# {{{ def new_color(red = 0, green = 0, blue = 0):
+def new_color(red = 0, green = 0, blue = 0):
+   # A fixed-point color buffer from RGB percentages
+   return array.array('H', [from_percent(red), from_percent(green), from_percent(blue)])
+# def new_color(red = 0, green = 0, blue = 0):
+
+
+# }}}
+# {{{ def constrain(n, minn, maxn):
+def constrain(n, minn, maxn):
+   # Integer clamp, for callers that know minn <= maxn
+   if n < minn:
+      return minn
+   if n > maxn:
+      return maxn
+   return n
+# def constrain(n, minn, maxn):
+
+
+# }}}
+# {{{ def get_velocity_scale(velocity, max_velocity):
+def get_velocity_scale(velocity, max_velocity):
+   # Brightness scale for a key velocity, between half and full, in fractions of SCALE_ONE
+   return constrain((velocity * SCALE_ONE) // max_velocity, SCALE_ONE // 2, SCALE_ONE)
+# def get_velocity_scale(velocity, max_velocity):
+
+
+# }}}
+# {{{ def get_fade_path(start_color, end_color, num_frames, space = 'rgb', easing = 'linear'):
+def get_fade_path(start_color, end_color, num_frames, space = 'rgb', easing = 'linear'):
+   # color_space.get_fade_path() as one flat array('H') of red, green, blue per frame,
+   # taking fixed-point colors. Frame n's color starts at index 3 * n.
+   key = (tuple(start_color), tuple(end_color), num_frames, space, easing)
+
+   path = _path_cache.get(key)
+   if path is not None:
+      return path
+
+   if space == 'rgb' and easing == 'linear':
+      # Straight integer interpolation
+      path = array.array('H', [0] * (3 * (num_frames + 1)))
+
+      for channel in range(0, 3):
+         start = start_color[channel]
+         delta = end_color[channel] - start
+
+         for frame in range(0, num_frames + 1):
+            # Round to nearest, going either way
+            path[(3 * frame) + channel] = start + (((2 * delta * frame) + num_frames) // (2 * num_frames))
+         # for frame in range(0, num_frames + 1):
+      # for channel in range(0, 3):
+   else:
+      float_path = color_space.get_fade_path(
+         (to_percent(start_color[0]), to_percent(start_color[1]), to_percent(start_color[2])),
+         (to_percent(end_color[0])  , to_percent(end_color[1])  , to_percent(end_color[2])),
+         num_frames, space, easing
+      )
+
+      path = array.array('H', [from_percent(value) for color in float_path for value in color])
+   # else:
+
+   if len(_path_cache) >= PATH_CACHE_SIZE:
+      _path_cache.clear()
+   _path_cache[key] = path
+
+   return path
+# def get_fade_path(start_color, end_color, num_frames, space = 'rgb', easing = 'linear'):
+
+
+# }}}
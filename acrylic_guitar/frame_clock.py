@@ -0,0 +1,126 @@
+#!/usr/bin/python
+
+
+import time
+import threading
+
+
+
+# Fraction of a frame within which a time counts as on the frame boundary, so waking
+# right on one doesn't round down into the frame before
+FRAME_EPSILON = 1e-9
+
+
+
+# {{{ class FrameClock:
+class FrameClock:
+   # Divides a timeline into fixed-length frames. Standalone guitars use the local
+   # monotonic clock; cluster followers plug in the leader's timeline so every
+   # guitar's frames begin at the same instant. Display modes do all their waiting
+   # through here, so a simulation.SimulatedTime can stand in for the real thing.
+
+
+   # {{{ def __init__(self, frame_interval, time_source = None):
+   def __init__(self, frame_interval, time_source = None):
+      self.frame_interval = frame_interval
+      self.time_source    = time_source if time_source else time.monotonic
+
+      # How to sleep, and how to wait for an event with a timeout
+      self.sleep          = time.sleep
+      self.wait_for_event = wait_for_event
+
+      self.last_overshoot = 0.0
+   # def __init__(self, frame_interval, time_source = None):
+
+
+   # }}}
+   # {{{ def now(self):
+   def now(self):
+      return self.time_source()
+   # def now(self):
+
+
+   # }}}
+   # {{{ def current_frame(self):
+   def current_frame(self):
+      return int((self.time_source() / self.frame_interval) + FRAME_EPSILON)
+   # def current_frame(self):
+
+
+   # }}}
+   # {{{ def wait_until_frame(self, frame):
+   def wait_until_frame(self, frame):
+      # Sleep until the given frame begins, and return the frame we woke up in.
+      # Re-check after each sleep since the time source can be corrected under us.
+      target = frame * self.frame_interval
+
+      while True:
+         now = self.time_source()
+         if now >= target:
+            break
+
+         self.sleep(target - now)
+      # while True:
+
+      # How late we were for the frame, from sleep overshoot or from running over
+      self.last_overshoot = now - target
+
+      # Waking right on the boundary can round down into the frame before
+      return max(frame, int((now / self.frame_interval) + FRAME_EPSILON))
+   # def wait_until_frame(self, frame):
+
+
+   # }}}
+   # {{{ def wait(self, event, timeout):
+   def wait(self, event, timeout):
+      # Wait up to timeout (sec) for event to be set, and return whether it is
+      return self.wait_for_event(event, timeout)
+   # def wait(self, event, timeout):
+
+
+   # }}}
+   # {{{ def wait_for_next_frame(self):
+   def wait_for_next_frame(self):
+      return self.wait_until_frame(self.current_frame() + 1)
+   # def wait_for_next_frame(self):
+
+
+   # }}}
+# class FrameClock:
+
+
+# }}}
+# {{{ class WakeEvent(threading.Event):
+class WakeEvent(threading.Event):
+   # An event that also sets wake_event when it's set, so a single wait on wake_event
+   # notices any of several events
+
+
+   # {{{ def __init__(self, wake_event):
+   def __init__(self, wake_event):
+      threading.Event.__init__(self)
+
+      self.wake_event = wake_event
+   # def __init__(self, wake_event):
+
+
+   # }}}
+   # {{{ def set(self):
+   def set(self):
+      threading.Event.set(self)
+      self.wake_event.set()
+   # def set(self):
+
+
+   # }}}
+# class WakeEvent(threading.Event):
+
+
+# }}}
+# {{{ def wait_for_event(event, timeout):
+def wait_for_event(event, timeout):
+   return event.wait(timeout)
+# def wait_for_event(event, timeout):
+
+
+# }}}
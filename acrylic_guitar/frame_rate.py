@@ -0,0 +1,161 @@
+#!/usr/bin/python
+
+
+import logging
+
+
+
+# How far rendering is cut back when frames keep overrunning
+DEGRADE_NONE        = 0
+DEGRADE_SKIP_FRAMES = 1  # Render half as many frames; fades skip the frames in between
+DEGRADE_SIMPLIFY    = 2  # ...and cheaper effects: fixed-point fades, no overlay layers or crossfades
+
+# How quickly the overrun ratio follows each frame
+OVERRUN_SMOOTHING = 0.05
+
+# Fewest frames to render at a degrade level before degrading further, and before
+# recovering, which waits longer so we don't flap between levels
+DEGRADE_SETTLE_FRAMES = 50
+RECOVER_SETTLE_FRAMES = 500
+
+
+
+# {{{ class FrameRateGovernor:
+class FrameRateGovernor:
+   # Picks which frame of the frame clock to render next. Fades are scheduled by
+   # frame number, so rendering fewer frames skips steps rather than slowing them.
+   # Renders every DISPLAY_MANAGER__ACTIVE_INTERVAL while notes are being played,
+   # every DISPLAY_MANAGER__AMBIENT_INTERVAL otherwise, and checks in every
+   # DISPLAY_MANAGER__IDLE_INTERVAL while the output isn't changing. Strides are
+   # kept to multiples of themselves, so guitars at the same rate render the same
+   # frames. When frames overrun, it degrades a level at a time, and recovers the
+   # same way once they stop.
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      self.guitar = guitar
+
+      self.stride        = 1
+      self.state         = None
+      self.degrade_level = DEGRADE_NONE
+      self.overrun_ratio = 0.0
+
+      self.__key_state_version = guitar.key_state_version
+      self.__last_active_frame = None
+      self.__settle_frames     = 0
+
+      self.decision_metrics = dict([
+         (decision, guitar.metric_frame_rate_decisions.labels(decision))
+         for decision in ['active', 'ambient', 'idle', 'degrade', 'recover']
+      ])
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def get_next_frame(self, frame):
+   def get_next_frame(self, frame):
+      # The frame to render after this one, while the output is changing
+      guitar         = self.guitar
+      frame_interval = guitar.frame_clock.frame_interval
+
+      if not guitar.DISPLAY_MANAGER__ADAPTIVE_FRAME_RATE:
+         return frame + 1
+
+      # Notes held, or played recently, keep us at the active rate
+      if guitar.max_key_velocity or guitar.key_state_version != self.__key_state_version:
+         self.__key_state_version = guitar.key_state_version
+         self.__last_active_frame = frame
+      # if guitar.max_key_velocity or guitar.key_state_version != self.__key_state_version:
+
+      if self.__last_active_frame is not None and (frame - self.__last_active_frame) * frame_interval <= guitar.DISPLAY_MANAGER__ACTIVE_HOLD_TIME:
+         state    = 'active'
+         interval = guitar.DISPLAY_MANAGER__ACTIVE_INTERVAL
+      else:
+         state    = 'ambient'
+         interval = guitar.DISPLAY_MANAGER__AMBIENT_INTERVAL
+      # else:
+
+      stride = max(1, int(round(interval / frame_interval)))
+      if self.degrade_level >= DEGRADE_SKIP_FRAMES:
+         stride *= 2
+
+      if state != self.state or stride != self.stride:
+         self.decision_metrics[state].inc()
+         guitar.metric_frame_rate.set(1.0 / (stride * frame_interval))
+
+         self.state  = state
+         self.stride = stride
+      # if state != self.state or stride != self.stride:
+
+      return ((frame // stride) + 1) * stride
+   # def get_next_frame(self, frame):
+
+
+   # }}}
+   # {{{ def get_idle_interval(self):
+   def get_idle_interval(self):
+      # How long (sec) a mode sitting on one color should wait between checks
+      guitar = self.guitar
+
+      if not guitar.DISPLAY_MANAGER__ADAPTIVE_FRAME_RATE:
+         return guitar.DISPLAY_MANAGER__MIN_INTERVAL
+
+      if self.state != 'idle':
+         self.decision_metrics['idle'].inc()
+         guitar.metric_frame_rate.set(1.0 / guitar.DISPLAY_MANAGER__IDLE_INTERVAL)
+
+         self.state = 'idle'
+      # if self.state != 'idle':
+
+      return guitar.DISPLAY_MANAGER__IDLE_INTERVAL
+   # def get_idle_interval(self):
+
+
+   # }}}
+   # {{{ def record_wake(self, target_frame, frame):
+   def record_wake(self, target_frame, frame):
+      # Note whether we woke in the frame we were waiting for, or overran into a later one
+      guitar  = self.guitar
+      overrun = frame > target_frame
+
+      if overrun:
+         guitar.metric_frame_overruns.inc()
+         guitar.metric_frames_dropped.inc(frame - target_frame)
+      # if overrun:
+
+      self.overrun_ratio += ((1.0 if overrun else 0.0) - self.overrun_ratio) * OVERRUN_SMOOTHING
+
+      if not guitar.DISPLAY_MANAGER__ADAPTIVE_FRAME_RATE:
+         return
+
+      self.__settle_frames += 1
+
+      if self.overrun_ratio > guitar.DISPLAY_MANAGER__OVERRUN_DEGRADE_RATIO:
+         if self.degrade_level < DEGRADE_SIMPLIFY and self.__settle_frames >= DEGRADE_SETTLE_FRAMES:
+            self.set_degrade_level(self.degrade_level + 1, 'degrade')
+      elif self.overrun_ratio < guitar.DISPLAY_MANAGER__OVERRUN_RECOVER_RATIO:
+         if self.degrade_level > DEGRADE_NONE and self.__settle_frames >= RECOVER_SETTLE_FRAMES:
+            self.set_degrade_level(self.degrade_level - 1, 'recover')
+      # elif self.overrun_ratio < guitar.DISPLAY_MANAGER__OVERRUN_RECOVER_RATIO:
+   # def record_wake(self, target_frame, frame):
+
+
+   # }}}
+   # {{{ def set_degrade_level(self, degrade_level, decision):
+   def set_degrade_level(self, degrade_level, decision):
+      logging.debug("Frames overrunning %0.0f%% of the time, %s to level %d", 100.0 * self.overrun_ratio, decision, degrade_level)
+
+      self.degrade_level   = degrade_level
+      self.__settle_frames = 0
+
+      self.decision_metrics[decision].inc()
+      self.guitar.metric_degrade_level.set(degrade_level)
+   # def set_degrade_level(self, degrade_level, decision):
+
+
+   # }}}
+# class FrameRateGovernor:
+
+
+# }}}
@@ -0,0 +1,1373 @@
+#!/usr/bin/python
+
+
+import time
+import signal
+import logging
+import threading
+
+from acrylic_guitar import metrics
+from acrylic_guitar import backends
+from acrylic_guitar import profiler
+from acrylic_guitar import frame_rate
+from acrylic_guitar import frame_clock
+from acrylic_guitar import fixed_point
+from acrylic_guitar import patterns
+from acrylic_guitar import key_state
+from acrylic_guitar import zones
+from acrylic_guitar import parameters
+from acrylic_guitar import power_limiter
+from acrylic_guitar import midi_timing
+
+
+
+# {{{ class DisplayMode:
+class DisplayMode:
+   # All LEDS off
+   off = 0
+
+   # Cycle through random colors. No MIDI input
+   random_glow = 1
+
+   # Flash random pre-defined colors, jumping directly to each. No MIDI input
+   crazy_flash_jump = 2
+
+   # Glow a color based on the lowest MIDI key currently on
+   glow_lowest_midi_key_on = 3
+
+   # Flash a color based on the lowest MIDI key currently on
+   flash_lowest_midi_key_on = 4
+
+   # Flash random pre-defined colors, fading between each. No MIDI input
+   crazy_flash_fade = 5
+
+   # Cycle through random colors, with intensity varying between
+   # 50% and 100% based on average MIDI key velocity
+   random_glow_midi_velocity = 6
+
+
+   # {{{ def get_modes(self):
+   @classmethod
+   def get_modes(cls):
+      return [
+         cls.off,
+         cls.random_glow,
+         cls.crazy_flash_jump,
+         cls.glow_lowest_midi_key_on,
+         cls.flash_lowest_midi_key_on,
+         cls.crazy_flash_fade,
+         cls.random_glow_midi_velocity,
+      ]
+   # def get_modes(cls):
+
+
+   # }}}
+# class DisplayMode:
+
+
+# }}}
+# {{{ class MidiMessageType:
+class MidiMessageType:
+   # TODO: This is actually more complicated than this
+   # http://www.midi.org/techspecs/midimessages.php
+   note = 144
+   control_change = 176
+   # The Oxygen8 also sends two other CC messages to select a bank when
+   # changing programs -- the full sequence for selecting patch 4 is:
+   # [[[176, 0, 0, 0], 108813]]
+   # [[[176, 32, 0, 0], 108813]]
+   # [[[192, 3, 0, 0], 108814]]
+   program_change = 192
+
+
+# }}}
+# {{{ class Color:
+class Color:
+   # {{{ def __init__(self, red = 0, green = 0, blue = 0):
+   def __init__(self, red = 0, green = 0, blue = 0):
+      self.red = red
+      self.green = green
+      self.blue = blue
+   # def __init__(self, red = 0, green = 0, blue = 0):
+
+
+   # }}}
+# class Color:
+
+
+# }}}
+# {{{ class AcrylicGuitar:
+class AcrylicGuitar:
+
+
+   # Constructor
+   # {{{ def __init__(self):
+   def __init__(self):
+      # Pin assignments (Board-numbering)
+      self.PIN_R = 12
+      self.PIN_G = 11
+      self.PIN_B = 13
+
+      self.PIN_LED = 15
+
+
+      # PWM frequency in Hz
+      self.PWM_FREQUENCY = 100
+
+
+      # Outputs to show the colors on: any of 'gpio', 'artnet', 'sacn' and 'null'.
+      # Only the selected backends are loaded.
+      self.OUTPUT_BACKENDS = ['gpio']
+
+
+      # Where to send DMX packets. None means broadcast for Art-Net and multicast for sACN
+      self.NETWORK_OUTPUT_HOST = None
+
+      # Interval (sec) at which unchanged universes are resent so fixtures don't time out
+      self.NETWORK_OUTPUT_KEEP_ALIVE = 1.0
+
+      # RGB fixtures to drive with the current color, as (universe, first DMX channel)
+      self.NETWORK_OUTPUT_FIXTURES = [(1, 1)]
+
+
+      # Zones (e.g. body, neck, headstock) to render independently, all from one frame
+      # loop. Empty means a single zone driven by the settings above. Each zone is a
+      # dict of:
+      #    'name'         : for logging
+      #    'display_mode' : the zone's mode, or None to follow the guitar's display mode
+      #    'palette'      : color names to use in place of the mode's usual ones
+      #    'keys'         : (lowest, highest) key the zone's note modes respond to
+      #    'backends'     : outputs for the zone, defaulting to OUTPUT_BACKENDS
+      #    'layers'       : layers to blend over the zone's display mode, as for LAYERS
+      # plus any upper-case settings the zone's backends should use instead of the
+      # guitar's, e.g. 'PIN_R'/'PIN_G'/'PIN_B' or 'NETWORK_OUTPUT_FIXTURES'.
+      self.ZONES = []
+
+      # Layers to blend over the display mode when there are no ZONES, e.g. a velocity
+      # flash over a background glow. Each is a dict of 'display_mode', 'palette' and
+      # 'keys' as for a zone, plus:
+      #    'blend'   : 'alpha' (the default), 'add', 'multiply' or 'max'
+      #    'opacity' : 0.0 to 1.0
+      # and any upper-case DISPLAY_MANAGER__ settings the layer should use instead of
+      # the zone's, e.g. 'DISPLAY_MANAGER__COLOR_SPACE'.
+      self.LAYERS = []
+
+
+      # Role of this guitar when several share a stage: 'leader', 'follower', or None to run alone
+      self.CLUSTER_ROLE = None
+
+      # Multicast group (or broadcast address) and port for cluster sync packets. None uses the defaults.
+      self.CLUSTER_ADDRESS = None
+      self.CLUSTER_PORT    = None
+
+      # Interval (sec) between leader sync packets
+      self.CLUSTER_SYNC_INTERVAL = 0.05
+
+      # Whether followers take their key state from the leader instead of their own MIDI inputs
+      self.CLUSTER_FOLLOW_MIDI = False
+
+
+      # Whether to start with hot-path profiling on. SIGUSR2 toggles it while running.
+      self.PROFILER_ENABLED = False
+
+      # How many of the most recent spans to keep for the trace
+      self.PROFILER_CAPACITY = 65536
+
+      # Where SIGUSR1 writes the Chrome trace; %s is replaced by a timestamp
+      self.PROFILER_TRACE_PATH = '/tmp/acrylic_guitar_trace_%s.json'
+
+
+      # Seed for the random modes, so runs can be repeated, e.g. for benchmarks and
+      # regression renders. None picks a new one each run, and logs it.
+      self.PATTERN_SEED = None
+
+
+      # Whether to run the mode engine in a separate process, exchanging input state and
+      # frames with this one through shared memory, so rendering gets a core of its own
+      self.RENDER_PROCESS = False
+
+      # Interval (sec) at which each side of the render process checks for new data
+      self.RENDER_PROCESS__POLL_INTERVAL = 0.001
+
+
+      # Port to serve Prometheus metrics on over HTTP, or None to not serve them
+      self.METRICS_PORT    = None
+      self.METRICS_ADDRESS = ''
+
+      # File to publish live state into for dashboards and acrylic-guitar-monitor, or None
+      # to not publish it, and the interval (sec) between updates
+      self.STATE_EXPORT_PATH     = None
+      self.STATE_EXPORT_INTERVAL = 0.02
+
+
+      # These are the system interfaces that shouldn't be used
+      self.MIDI_INTERFACES_TO_IGNORE = ['Midi Through Port-0', 'Synth input port (2225:0)']
+
+
+      # How many percentage points above and below the requested value should we glow
+      self.GLOW_COLOR_DIFFUSION = 5
+
+
+      # MIDI CCs that adjust settings live, as {CC number: (setting, value at 0, value at 127)}.
+      # Mapped CCs no longer pick display modes; any others still do.
+      self.CC_PARAMETERS = {
+          1: ('DISPLAY_MANAGER__GLOW_COLOR_SPEED', 1.5, 0.25),  # Mod wheel: glows speed up
+          7: ('DISPLAY_MANAGER__BRIGHTNESS', 0.0, 1.0),         # Volume: overall brightness
+         74: ('GLOW_COLOR_DIFFUSION', 0.0, 25.0),               # Cutoff: how far glows swing
+      }
+
+      # Time constant (sec) for settings to follow their CCs, so knob steps don't show
+      self.CC_PARAMETERS__SMOOTHING_TIME = 0.08
+
+
+      # CCs for the sustain and sostenuto pedals, or None to ignore one. Keys stay on
+      # while a pedal holds their notes, and pedals don't pick display modes.
+      self.MIDI_READER__SUSTAIN_CC   = 64
+      self.MIDI_READER__SOSTENUTO_CC = 66
+
+      # Interval (sec) between MIDI Reader loops
+      self.MIDI_READER__INTERVAL = (1 / 100)
+
+      # Most MIDI messages to read from an interface in one go
+      self.MIDI_READER__BATCH_SIZE = 32
+
+      # Time (sec) from a MIDI event being played to it being applied. Events are held
+      # back to exactly this, by their pygame.midi timestamps, so queueing and polling
+      # delays don't show up as jitter. Zero applies them as soon as they're read.
+      self.MIDI_READER__TARGET_LATENCY = 0.02
+
+      # Interval (sec) between readings of the MIDI and local clocks, to track drift
+      self.MIDI_READER__CLOCK_SAMPLE_INTERVAL = 0.5
+
+
+      # MIDI output to pass everything read on to, by device name, or None for no MIDI thru
+      self.MIDI_THRU__OUTPUT = None
+
+      # Longest interval (sec) between MIDI Reader polls while passing MIDI on, which is
+      # about the most thru adds to the MIDI chain's latency
+      self.MIDI_THRU__POLL_INTERVAL = 0.0005
+
+      # Also send the display mode (program change) and color (CCs, and 14-bit SysEx)
+      # to the MIDI thru output, on this channel, when they change
+      self.MIDI_THRU__SEND_STATE     = False
+      self.MIDI_THRU__STATE_CHANNEL  = 1
+      self.MIDI_THRU__STATE_INTERVAL = 0.05
+
+      # CCs carrying red, green and blue. Guitars take these as color, not display modes.
+      self.MIDI_THRU__COLOR_CCS = (102, 103, 104)
+
+      # Minimum interval (sec) to wait between Display Manager loops
+      self.DISPLAY_MANAGER__MIN_INTERVAL = (1 / 100)
+
+      # Interval (sec) between individual color steps in glow modes
+      self.DISPLAY_MANAGER__GLOW_INTERVAL = 0.01
+
+      # Interval (sec) between colors in glow modes
+      self.DISPLAY_MANAGER__GLOW_COLOR_SPEED = 1.5
+
+      # Interval (sec) between colors in flash modes
+      self.DISPLAY_MANAGER__FLASH_INTERVAL = 0.065
+
+      # How long (sec) to take to fade note color to black
+      self.DISPLAY_MANAGER__FLASH_NOTE_DURATION = 3.0
+
+      # Color space fades interpolate in: 'rgb', 'hsv', 'hsl', 'oklab' or 'oklch'
+      self.DISPLAY_MANAGER__COLOR_SPACE = 'rgb'
+
+      # Easing curve for fades: 'linear', 'ease_in', 'ease_out', 'ease_in_out' or 'sine'
+      self.DISPLAY_MANAGER__EASING = 'linear'
+
+      # Overall brightness (0.0-1.0), applied to everything as it's output
+      self.DISPLAY_MANAGER__BRIGHTNESS = 1.0
+
+      # Supply current (A) to keep the LEDs within, or None for no limit. Each frame's
+      # current is estimated from its duty cycles, and frames over it are dimmed to fit.
+      self.POWER_LIMITER__BUDGET = None
+
+      # Current (A) one LED draws on each channel at full duty cycle, as (red, green, blue)
+      self.POWER_LIMITER__CHANNEL_CURRENT = (0.02, 0.02, 0.02)
+
+      # How many LEDs each output drives
+      self.POWER_LIMITER__PIXELS = 1
+
+      # How long (sec) the dimming takes to ease off once frames fit again
+      self.POWER_LIMITER__RELEASE_TIME = 0.5
+
+      # Whether the display manager's fades run on integers (fixed-point colors in
+      # array('H') buffers) instead of floats. bench_fixed_point.py only finds it faster
+      # for velocity-scaled fades; the others are within noise of the float path.
+      self.DISPLAY_MANAGER__FIXED_POINT = False
+
+      # Whether to hand fades to the outputs as whole segments when they can all play
+      # them (see backends.OutputBackend.play_segment()), instead of writing every frame
+      self.DISPLAY_MANAGER__SEGMENTS = True
+
+      # How long (sec) to crossfade from the old display mode to the new one, running
+      # both meanwhile. Zero jumps straight to the new mode.
+      self.DISPLAY_MANAGER__CROSSFADE_TIME = 0.0
+
+      # Whether to adapt the frame rate: rendering every ACTIVE_INTERVAL (sec) while
+      # notes are being played and for ACTIVE_HOLD_TIME after, every AMBIENT_INTERVAL
+      # otherwise, and checking in every IDLE_INTERVAL while the color isn't changing.
+      # Off renders every frame of DISPLAY_MANAGER__GLOW_INTERVAL.
+      self.DISPLAY_MANAGER__ADAPTIVE_FRAME_RATE = True
+      self.DISPLAY_MANAGER__ACTIVE_INTERVAL     = 0.01
+      self.DISPLAY_MANAGER__AMBIENT_INTERVAL    = 0.02
+      self.DISPLAY_MANAGER__IDLE_INTERVAL       = 0.1
+      self.DISPLAY_MANAGER__ACTIVE_HOLD_TIME    = 2.0
+
+      # Share of frames overrunning into the next at which to cut back on rendering
+      # (skipping frames, then cheaper effects), and below which to restore it
+      self.DISPLAY_MANAGER__OVERRUN_DEGRADE_RATIO = 0.2
+      self.DISPLAY_MANAGER__OVERRUN_RECOVER_RATIO = 0.02
+
+
+
+      self.MAX_VELOCITY = 127
+      self.NUM_KEYS     = 127
+      self.NUM_NOTES    =  12
+
+      self.NOTE_NAMES = {}
+      self.NOTE_NAMES['C']  =  0
+      self.NOTE_NAMES['Cs'] =  1
+      self.NOTE_NAMES['D']  =  2
+      self.NOTE_NAMES['Ds'] =  3
+      self.NOTE_NAMES['E']  =  4
+      self.NOTE_NAMES['F']  =  5
+      self.NOTE_NAMES['Fs'] =  6
+      self.NOTE_NAMES['G']  =  7
+      self.NOTE_NAMES['Gs'] =  8
+      self.NOTE_NAMES['A']  =  9
+      self.NOTE_NAMES['As'] = 10
+      self.NOTE_NAMES['B']  = 11
+
+      
+
+      # Initialize colors
+      self.colors = {}
+      self.colors['black']   = {'red':   0, 'green':   0, 'blue':   0}
+      self.colors['white']   = {'red': 100, 'green': 100, 'blue': 100}
+
+      self.colors['red']     = {'red': 100, 'green':   0, 'blue':   0}
+      self.colors['green']   = {'red':   0, 'green': 100, 'blue':   0}
+      self.colors['blue']    = {'red':   0, 'green':   0, 'blue': 100}
+
+      self.colors['cyan']    = {'red':   0, 'green': 100, 'blue': 100}
+      self.colors['magenta'] = {'red': 100, 'green':   0, 'blue': 100}
+      self.colors['yellow']  = {'red': 100, 'green': 100, 'blue':   0}
+
+      self.colors['pink']    = {'red':  90, 'green':   9, 'blue':  35}
+      self.colors['orange']  = {'red': 100, 'green':  13, 'blue':   0}
+
+
+      self.current_color_name = 'black'
+      self.current_color      = self.colors[self.current_color_name]
+
+      # The color being shown on the fixed-point path, updated in place every frame from
+      # the first zone. current_color catches up at the end of each fixed-point fade.
+      self.current_color_fixed = fixed_point.new_color()
+
+      # The segment the first zone's outputs are playing, while a fade is out as one.
+      # current_color catches up when it ends.
+      self.current_segment = None
+
+
+      self.keys = []
+      for key in range(0, self.NUM_KEYS):
+         self.keys.append(0)
+      # for key in range(0, self.NUM_KEYS):
+
+      self.notes = []
+      for note in range(0, self.NUM_NOTES):
+         self.notes.append(0)
+      # for note in range(0, self.NUM_NOTES):
+
+      # Keeps keys and notes to what's sounding, pedals and all, as MIDI comes in
+      self.key_state = key_state.KeyState(self.keys, self.notes)
+
+      self.max_key_velocity = 0
+      self.lowest_key_on    = None
+      self.lowest_note_on   = None
+
+      # Bumped whenever the key stats are recalculated, so renderers can tell they changed
+      self.key_state_version = 0
+
+
+      #self.display_mode = DisplayMode.off
+      self.display_mode = DisplayMode.random_glow
+
+
+      # Initialize a lock to let us synchronize accessing the keys and notes instance variables
+      self.midi_data_lock = threading.Lock()
+
+
+      # Set along with each of the events below, with every thread's stop event, and by
+      # CCs for settings, so a display mode sitting on a color can sleep in one wait
+      # and still notice any of them. Only the display manager waits on it.
+      self.wake_event = threading.Event()
+
+      # Initialize an event to let the midi_reader thread tell
+      # the display_manager thread that we've changed modes
+      self.display_mode_change_event = frame_clock.WakeEvent(self.wake_event)
+
+      # Initialize an event to let the midi_reader thread tell the display_manager
+      # thread that the keys have changed. Any key can change the lowest note or top
+      # velocity within a layer's keys, so it's set for every one.
+      self.key_change_event = frame_clock.WakeEvent(self.wake_event)
+
+
+      # Frame clock that fades are scheduled against. Cluster followers swap in the leader's timeline.
+      self.frame_clock = frame_clock.FrameClock(self.DISPLAY_MANAGER__GLOW_INTERVAL)
+
+      # Frame and color at which the current display mode started
+      self.mode_epoch_frame = 0
+      self.mode_start_color = self.current_color
+
+      # Leader or follower for cluster sync, a mode start received from the leader, and
+      # the keys held and velocity from the leader's last packet
+      self.cluster_leader           = None
+      self.cluster_follower         = None
+      self.__pending_mode_start     = None
+      self.__last_cluster_key_state = None
+
+      # Renders the display modes, on ZONES if there are any, while the display manager runs
+      self.zone_scheduler = None
+
+      # Serves self.metrics when METRICS_PORT is set
+      self.metrics_server = None
+
+      # Publishes live state when STATE_EXPORT_PATH is set
+      self.state_exporter = None
+
+      # Passes MIDI on when MIDI_THRU__OUTPUT is set
+      self.midi_thru = None
+
+      # Shared memory and process for RENDER_PROCESS
+      self.render_link       = None
+      self.render_process    = None
+      self.render_stop_event = None
+
+
+      # Initialize the variables to be used by __init_midi() and __init_display(). Neither
+      # runs until it's needed, so creating an AcrylicGuitar doesn't touch any hardware.
+      self.__pygame_midi     = None
+      self.__midi_interfaces = {}
+      self.outputs           = []
+
+
+      # Set up the metrics we record, whether or not they're served
+      self.__init_metrics()
+
+      # Decides how often to render
+      self.frame_rate = frame_rate.FrameRateGovernor(self)
+
+      # Settings adjusted live from MIDI CCs
+      self.parameters = parameters.ParameterBus(self)
+
+      # Dims frames that would draw more than the supply can give
+      self.power_limiter = power_limiter.PowerLimiter(self)
+
+      # Seeded randomness for the random modes
+      self.patterns = patterns.PatternGenerator(self)
+
+      # The profiler always exists so call sites can check profiler.enabled
+      self.profiler = profiler.Profiler(self.PROFILER_CAPACITY, self.PROFILER_ENABLED)
+   # def __init__(self):
+
+
+   # }}}
+   # {{{ def __init_midi(self):
+   def __init_midi(self):
+      # Only pygame.midi is needed, so skip pygame.init() and the video and audio
+      # modules it would start
+      import pygame.midi
+
+      pygame.midi.init()
+
+      self.__pygame_midi = pygame.midi
+   # def __init_midi(self):
+
+
+   # }}}
+   # {{{ def __init_metrics(self):
+   def __init_metrics(self):
+      self.metrics = metrics.MetricsRegistry()
+
+      self.metric_midi_messages = self.metrics.counter(
+         'acrylic_guitar_midi_messages_total', 'MIDI messages received', ('interface', 'type')
+      )
+      self.metric_midi_batch_size = self.metrics.histogram(
+         'acrylic_guitar_midi_batch_size', 'MIDI messages read per poll', metrics.BATCH_SIZE_BUCKETS, ('interface',)
+      )
+      self.metric_midi_latency = self.metrics.histogram(
+         'acrylic_guitar_midi_latency_seconds', 'Time from a MIDI event being played to it being applied', metrics.LATENCY_BUCKETS, ('interface',)
+      )
+      self.metric_midi_late_events = self.metrics.counter(
+         'acrylic_guitar_midi_late_events_total', 'MIDI events read too late to be applied at the target latency', ('interface',)
+      )
+      self.metric_midi_clock_drift = self.metrics.gauge(
+         'acrylic_guitar_midi_clock_drift_ppm', 'How much faster the local clock runs than the MIDI clock', ('interface',)
+      )
+      self.metric_midi_thru_messages = self.metrics.counter(
+         'acrylic_guitar_midi_thru_messages_total', 'MIDI messages sent to the MIDI thru output', ('source',)
+      )
+      self.metric_midi_thru_write_time = self.metrics.histogram(
+         'acrylic_guitar_midi_thru_write_seconds', 'Time to pass a batch of MIDI messages on', metrics.TIMING_BUCKETS
+      )
+      self.metric_midi_lock_wait = self.metrics.histogram(
+         'acrylic_guitar_midi_lock_wait_seconds', 'Time spent waiting for midi_data_lock, by the thread taking it', metrics.TIMING_BUCKETS, ('thread',)
+      )
+      self.metric_frame_render_time = self.metrics.histogram(
+         'acrylic_guitar_frame_render_seconds', 'Time to compute and output a frame', metrics.TIMING_BUCKETS
+      )
+      self.metric_frame_overshoot = self.metrics.histogram(
+         'acrylic_guitar_frame_sleep_overshoot_seconds', 'How late the display manager woke for each frame', metrics.TIMING_BUCKETS
+      )
+      self.metric_duty_cycle_changes = self.metrics.counter(
+         'acrylic_guitar_duty_cycle_changes_total', 'ChangeDutyCycle calls made on the RGB pins'
+      )
+      self.metric_fade_segments = self.metrics.counter(
+         'acrylic_guitar_fade_segments_total', 'Fade segments handed to the outputs to play'
+      )
+      self.metric_power_current = self.metrics.gauge(
+         'acrylic_guitar_power_current_amps', 'Estimated current the latest frame would draw, before limiting'
+      )
+      self.metric_power_limiter_scale = self.metrics.gauge(
+         'acrylic_guitar_power_limiter_scale', 'What the power limiter is scaling frames by'
+      )
+      self.metric_power_limiter_activations = self.metrics.counter(
+         'acrylic_guitar_power_limiter_activations_total', 'Times the power limiter started dimming frames'
+      )
+      self.metric_display_mode = self.metrics.gauge(
+         'acrylic_guitar_display_mode', 'Current display mode'
+      )
+      self.metric_frame_rate = self.metrics.gauge(
+         'acrylic_guitar_frame_rate', 'Frames per second being rendered'
+      )
+      self.metric_degrade_level = self.metrics.gauge(
+         'acrylic_guitar_degrade_level', 'How far rendering is cut back because frames are overrunning'
+      )
+      self.metric_frame_overruns = self.metrics.counter(
+         'acrylic_guitar_frame_overruns_total', 'Frames that overran into a later frame'
+      )
+      self.metric_frames_dropped = self.metrics.counter(
+         'acrylic_guitar_frames_dropped_total', 'Frames skipped because of overruns'
+      )
+      self.metric_frame_rate_decisions = self.metrics.counter(
+         'acrylic_guitar_frame_rate_decisions_total', 'Frame rate changes, by reason', ('decision',)
+      )
+   # def __init_metrics(self):
+
+
+   # }}}
+   # {{{ def __init_display(self):
+   def __init_display(self):
+      self.outputs = []
+
+      for backend_name in self.OUTPUT_BACKENDS:
+         logging.debug("Starting %s output...", backend_name)
+
+         output = backends.create_backend(backend_name, self)
+         output.start(self.current_color)
+
+         self.outputs.append(output)
+      # for backend_name in self.OUTPUT_BACKENDS:
+   # def __init_display(self):
+
+
+   # }}}
+
+
+   # Action Methods
+   # {{{ def display_color_name(self, color_name, update_current_color = True):
+   def display_color_name(self, color_name, update_current_color = True):
+      if color_name in self.colors:
+         self.display_color(self.colors[color_name], update_current_color)
+      else:
+         raise RuntimeException("Invalid color name requested: '%s" % color_name)
+      # if color_name in self.colors:
+   # def display_color_name(self, color_name, update_current_color = True):
+
+
+   # }}}
+   # {{{ def display_color(self, color, update_current_color = True):
+   def display_color(self, color, update_current_color = True):
+      self.display_color_rgb(color['red'], color['green'], color['blue'], update_current_color)
+   # def display_color(self, color, update_current_color = True):
+
+
+   # }}}
+   # {{{ def display_current_color(self):
+   def display_current_color(self):
+      self.display_color(self.current_color, False)
+   # def display_current_color(self):
+
+
+   # }}}
+   # {{{ def display_color_rgb(self, red, green, blue, update_current_color = True):
+   def display_color_rgb(self, red, green, blue, update_current_color = True):
+      profiling = self.profiler.enabled
+      if profiling: span_start = time.perf_counter_ns()
+
+      red   = constrain(float(red)  , 0.0, 100.0)
+      green = constrain(float(green), 0.0, 100.0)
+      blue  = constrain(float(blue) , 0.0, 100.0)
+
+#      logging.debug("Displaying %d/%d/%d" % (red, green, blue))
+
+      # Brightness and the power limit only apply on the way out; current_color keeps the mode's color
+      scale = self.get_output_scale(red, green, blue)
+      if scale != 1.0:
+         for output in self.outputs:
+            output.write(red * scale, green * scale, blue * scale)
+      else:
+         for output in self.outputs:
+            output.write(red, green, blue)
+      # else:
+
+      if update_current_color:
+         self.set_current_color_rgb(red, green, blue)
+
+      if profiling: self.profiler.record(profiler.STAGE_OUTPUT_WRITE, span_start, time.perf_counter_ns())
+   # def display_color_rgb(self, red, green, blue, update_current_color = True):
+
+
+   # }}}
+   # {{{ def get_output_scale(self, red, green, blue):
+   def get_output_scale(self, red, green, blue):
+      # What to scale a color (percentages) by as it's output: the brightness, and
+      # whatever more the power limiter needs to keep within budget
+      scale = self.DISPLAY_MANAGER__BRIGHTNESS
+
+      if self.POWER_LIMITER__BUDGET:
+         current = self.power_limiter.get_current(red, green, blue, self.POWER_LIMITER__PIXELS * len(self.outputs)) * scale
+         scale  *= self.power_limiter.limit(current, self.frame_clock.now())
+      # if self.POWER_LIMITER__BUDGET:
+
+      return scale
+   # def get_output_scale(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def update_key_stats(self):
+   def update_key_stats(self):
+      # Recalculate the stats the display modes use. Call with midi_data_lock held.
+      self.key_state_version += 1
+
+      self.max_key_velocity = max(self.keys)
+
+      # Stop at the first key on, rather than listing them all
+      self.lowest_key_on = next((i for i, e in enumerate(self.keys) if e != 0), None)
+
+      self.lowest_note_on   = (self.lowest_key_on % self.NUM_NOTES) if self.lowest_key_on != None else None
+
+      self.key_change_event.set()
+   # def update_key_stats(self):
+
+
+   # }}}
+   # {{{ def start_display_mode(self):
+   def start_display_mode(self):
+      # Pick the frame the new mode starts on. Fades chain from there, so a follower
+      # given the leader's epoch and start color runs through the same frames. Returns
+      # whether the start came from the cluster leader.
+      pending_mode_start = self.__pending_mode_start
+      self.__pending_mode_start = None
+
+      if pending_mode_start:
+         self.mode_epoch_frame, self.mode_start_color = pending_mode_start
+         self.set_current_color(self.mode_start_color)
+      else:
+         self.mode_epoch_frame = self.frame_clock.current_frame() + 1
+         self.mode_start_color = dict(self.current_color)
+      # else:
+
+      # Let followers know straight away rather than at the next sync interval
+      if self.cluster_leader:
+         self.cluster_leader.wake()
+
+      return bool(pending_mode_start)
+   # def start_display_mode(self):
+
+
+   # }}}
+   # {{{ def get_cluster_state(self):
+   def get_cluster_state(self):
+      from acrylic_guitar import cluster_sync
+
+      state = cluster_sync.ClusterState()
+      state.frame_interval   = self.frame_clock.frame_interval
+      state.display_mode     = self.display_mode
+      state.mode_epoch_frame = self.mode_epoch_frame
+      state.mode_start_color = self.mode_start_color
+      state.current_color    = self.current_color
+
+      lock_wait_metric = self.metric_midi_lock_wait.labels(threading.current_thread().name)
+
+      lock_requested = time.perf_counter_ns()
+      with self.midi_data_lock:
+         lock_wait_metric.observe((time.perf_counter_ns() - lock_requested) / 1e9)
+
+         keys_held = bytearray(16)
+         for key, velocity in enumerate(self.keys):
+            if velocity:
+               keys_held[key >> 3] |= (1 << (key & 7))
+         # for key, velocity in enumerate(self.keys):
+
+         state.midi_state       = True
+         state.keys_held        = bytes(keys_held)
+         state.lowest_key_on    = self.lowest_key_on
+         state.max_key_velocity = self.max_key_velocity
+      # with self.midi_data_lock:
+
+      return state
+   # def get_cluster_state(self):
+
+
+   # }}}
+   # {{{ def follow_cluster_state(self, state):
+   def follow_cluster_state(self, state):
+      # Called by the cluster follower thread with each packet from the leader
+      lock_wait_metric = self.metric_midi_lock_wait.labels(threading.current_thread().name)
+
+      if state.frame_interval and state.frame_interval != self.frame_clock.frame_interval:
+         logging.debug("Adopting leader frame interval of %0.4f sec", state.frame_interval)
+         self.frame_clock.frame_interval = state.frame_interval
+      # if state.frame_interval and state.frame_interval != self.frame_clock.frame_interval:
+
+      if state.display_mode != self.display_mode or state.mode_epoch_frame != self.mode_epoch_frame:
+         logging.debug("Following leader into display mode %d at frame %d", state.display_mode, state.mode_epoch_frame)
+
+         lock_requested = time.perf_counter_ns()
+         with self.midi_data_lock:
+            lock_wait_metric.observe((time.perf_counter_ns() - lock_requested) / 1e9)
+            self.display_mode = state.display_mode
+         # with self.midi_data_lock:
+
+         self.__pending_mode_start = (state.mode_epoch_frame, state.mode_start_color)
+         self.display_mode_change_event.set()
+      # if state.display_mode != self.display_mode or state.mode_epoch_frame != self.mode_epoch_frame:
+
+      # The leader sends its keys with every packet, changed or not. Only take them on,
+      # and have the renderers recalculate, when they differ from the last packet's.
+      key_state = (bytes(state.keys_held), state.max_key_velocity)
+
+      if self.CLUSTER_FOLLOW_MIDI and state.midi_state and key_state != self.__last_cluster_key_state:
+         self.__last_cluster_key_state = key_state
+
+         # We only get which keys are held, so give them all the leader's top velocity
+         keys = [0] * self.NUM_KEYS
+         for key in range(0, self.NUM_KEYS):
+            if state.keys_held[key >> 3] & (1 << (key & 7)):
+               keys[key] = state.max_key_velocity
+         # for key in range(0, self.NUM_KEYS):
+
+         notes = [any(keys[note::self.NUM_NOTES]) for note in range(0, self.NUM_NOTES)]
+
+         lock_requested = time.perf_counter_ns()
+         with self.midi_data_lock:
+            lock_wait_metric.observe((time.perf_counter_ns() - lock_requested) / 1e9)
+
+            self.keys[:]  = keys
+            self.notes[:] = notes
+
+            self.update_key_stats()
+         # with self.midi_data_lock:
+      # if self.CLUSTER_FOLLOW_MIDI and state.midi_state and key_state != self.__last_cluster_key_state:
+   # def follow_cluster_state(self, state):
+
+
+   # }}}
+   # {{{ def apply_midi_message(self, data):
+   def apply_midi_message(self, data):
+      # Apply a MIDI message's data bytes now, as the MIDI readers do once it's due.
+      # For feeding in MIDI from elsewhere, e.g. a simulation.
+      self.__apply_midi_message(data, self.metric_midi_lock_wait.labels(threading.current_thread().name))
+   # def apply_midi_message(self, data):
+
+
+   # }}}
+   # {{{ def keep_outputs_alive(self):
+   def keep_outputs_alive(self):
+      # Called by the frame pump while no new frame has come in, so network fixtures still get their keep-alive
+      for output in self.outputs:
+         output.keep_alive()
+   # def keep_outputs_alive(self):
+
+
+   # }}}
+   # {{{ def wait_until_frame_or_woken(self, frame, stop_events = []):
+   def wait_until_frame_or_woken(self, frame, stop_events = []):
+      # Sleep until frame begins in a single wait, unless one of stop_events is set or
+      # a CC comes in first. While settings are still gliding towards their CCs, only
+      # sleep a frame, so they keep moving. Returns the frame we woke in. Only for the
+      # display manager's thread, as it clears wake_event.
+      frame_clock = self.frame_clock
+
+      if self.parameters.is_settling():
+         return frame_clock.wait_until_frame(min(frame_clock.current_frame() + 1, frame))
+
+      self.wake_event.clear()
+
+      # Catch anything that happened before the clear
+      if self.parameters.is_pending() or any([event.is_set() for event in stop_events]):
+         return frame_clock.current_frame()
+
+      timeout = (frame * frame_clock.frame_interval) - frame_clock.now()
+      if timeout > 0 and frame_clock.wait(self.wake_event, timeout):
+         return frame_clock.current_frame()
+
+      return frame_clock.wait_until_frame(frame)
+   # def wait_until_frame_or_woken(self, frame, stop_events = []):
+
+
+   # }}}
+   # {{{ def dump_profile(self):
+   def dump_profile(self):
+      path = self.PROFILER_TRACE_PATH % time.strftime('%Y%m%d-%H%M%S')
+
+      try:
+         return self.profiler.dump(path)
+      except (IOError, OSError) as e:
+         logging.error("Unable to write profile to %s: %s", path, e)
+      # except (IOError, OSError) as e:
+   # def dump_profile(self):
+
+
+   # }}}
+   # {{{ def cleanup(self):
+   def cleanup(self):
+      if self.render_process:
+         self.render_stop_event.set()
+         self.render_process.join()
+
+      if self.render_link:
+         self.render_link.close()
+
+      for output in self.outputs:
+         output.stop()
+
+      for interface_index, interface in self.__midi_interfaces.items():
+         if interface:
+            interface.close()
+      # for interface_index, interface in self.__midi_interfaces.items():
+
+      if self.midi_thru:
+         self.midi_thru.close()
+
+      if self.__pygame_midi:
+         self.__pygame_midi.quit()
+   # def cleanup(self):
+
+
+   # }}}
+
+
+   # Modifier methods
+   # {{{ def set_current_color(self, color):
+   def set_current_color(self, color):
+      self.set_current_color_rgb(color['red'], color['green'], color['blue'])
+   # def set_current_color(self, color):
+
+
+   # }}}
+   # {{{ def set_current_color_red(self, red):
+   def set_current_color_red(self, red):
+      self.set_current_color_rgb(red, self.current_color['green'], self.current_color['blue'])
+   # def set_current_color_red(self, red):
+
+
+   # }}}
+   # {{{ def set_current_color_green(self, green):
+   def set_current_color_green(self, green):
+      self.set_current_color_rgb(self.current_color['red'], green, self.current_color['blue'])
+   # def set_current_color_green(self, green):
+
+
+   # }}}
+   # {{{ def set_current_color_blue(self, blue):
+   def set_current_color_blue(self, blue):
+      self.set_current_color_rgb(self.current_color['red'], self.current_color['green'], blue)
+   # def set_current_color_blue(self, blue):
+
+
+   # }}}
+   # {{{ def set_current_color_rgb(self, red, green, blue):
+   def set_current_color_rgb(self, red, green, blue):
+      self.current_color = {'red': red, 'green': green, 'blue': blue}
+   # def set_current_color_rgb(self, red, green, blue):
+
+
+   # }}}
+
+
+   # Thread worker methods
+   # {{{ def run(self):
+   def run(self):
+      # Settings only the display manager's thread would trip over, checked while
+      # there's nothing to shut down
+      zones.check_settings(self)
+
+      threads = {}
+
+      # SIGUSR1 dumps the profile as a Chrome trace, SIGUSR2 turns profiling on or off
+      signal.signal(signal.SIGUSR1, lambda signum, frame: self.dump_profile())
+      signal.signal(signal.SIGUSR2, lambda signum, frame: self.profiler.toggle())
+
+      try:
+         # Get the lights going first; finding MIDI devices can take a while
+         if self.RENDER_PROCESS:
+            if self.CLUSTER_ROLE:
+               raise RuntimeError("Cluster sync can't be used with a separate render process")
+            if self.ZONES or self.LAYERS or self.DISPLAY_MANAGER__CROSSFADE_TIME:
+               raise RuntimeError("Zones, layers and crossfades can't be used with a separate render process")
+
+            from acrylic_guitar import render_process
+
+            logging.debug("Starting render process...")
+            self.render_link = render_process.RenderLink()
+            self.render_process, self.render_stop_event = render_process.start_render_process(self, self.render_link)
+
+            self.start_thread(threads, 'frame_pump', self.frame_pump)
+         else:
+            self.start_thread(threads, 'display_manager', self.display_manager)
+         # else:
+
+
+         if self.CLUSTER_ROLE:
+            from acrylic_guitar import cluster_sync
+
+            cluster_address = self.CLUSTER_ADDRESS if self.CLUSTER_ADDRESS else cluster_sync.CLUSTER_ADDRESS
+            cluster_port    = self.CLUSTER_PORT    if self.CLUSTER_PORT    else cluster_sync.CLUSTER_PORT
+
+            if self.CLUSTER_ROLE == 'leader':
+               self.cluster_leader = cluster_sync.ClusterLeader(
+                  self.get_cluster_state, self.frame_clock, cluster_address, cluster_port, self.CLUSTER_SYNC_INTERVAL
+               )
+               self.start_thread(threads, 'cluster_leader', self.cluster_leader.run)
+            elif self.CLUSTER_ROLE == 'follower':
+               self.cluster_follower = cluster_sync.ClusterFollower(self.follow_cluster_state, cluster_address, cluster_port)
+               self.frame_clock.time_source = self.cluster_follower.leader_time
+               self.start_thread(threads, 'cluster_follower', self.cluster_follower.run)
+            else:
+               raise RuntimeError("Unknown cluster role: '%s'" % self.CLUSTER_ROLE)
+            # else:
+         # if self.CLUSTER_ROLE:
+
+         if self.METRICS_PORT:
+            self.metrics_server = metrics.MetricsServer(self.metrics, self.METRICS_PORT, self.METRICS_ADDRESS)
+            self.start_thread(threads, 'metrics_server', self.metrics_server.run)
+         # if self.METRICS_PORT:
+
+         if self.STATE_EXPORT_PATH:
+            from acrylic_guitar import state_export
+
+            self.state_exporter = state_export.StateExporter(self, self.STATE_EXPORT_PATH, self.STATE_EXPORT_INTERVAL)
+            self.start_thread(threads, 'state_exporter', self.state_exporter.run)
+         # if self.STATE_EXPORT_PATH:
+
+
+         logging.debug("Identifying MIDI Interfaces...")
+         self.__init_midi()
+
+         try:
+            midi_interfaces = self.__identify_midi_interfaces()
+         except RuntimeError:
+            # Followers taking the leader's MIDI don't need a controller of their own
+            if not (self.cluster_follower and self.CLUSTER_FOLLOW_MIDI):
+               raise
+
+            logging.debug("No MIDI devices found, using the cluster leader's MIDI state")
+            midi_interfaces = []
+         # except RuntimeError:
+
+         if self.MIDI_THRU__OUTPUT:
+            from acrylic_guitar import midi_thru
+
+            self.midi_thru = midi_thru.MidiThru(self, self.__open_midi_output(self.MIDI_THRU__OUTPUT))
+
+            if self.MIDI_THRU__SEND_STATE:
+               self.start_thread(threads, 'midi_thru', self.midi_thru.run)
+         # if self.MIDI_THRU__OUTPUT:
+
+         for reader_number, interface in enumerate(midi_interfaces):
+            logging.debug("Starting MIDI Reader %d on interface %d..." % (reader_number, interface))
+            self.start_thread(threads, "midi_reader__%d" % (reader_number), self.midi_reader, interface)
+         # for reader_number, interface in enumerate(midi_interfaces):
+
+
+         # Wait for child threads
+         while True:
+            time.sleep(1)
+
+      except RuntimeError as e:
+         logging.error("ERROR: %s", e)
+      except KeyboardInterrupt:
+         logging.debug("Caught Ctrl-C, shutting down")
+      # except KeyboardInterrupt:
+
+      # The lights may already be on, so shut down properly whichever way we got here
+      for thread_name in threads:
+         logging.debug('Asking thread %s to exit', threads[thread_name]['thread'].name)
+         threads[thread_name]['stopper'].set()
+         threads[thread_name]['thread'].join()
+      # for thread_name in threads:
+
+      self.cleanup()
+   # def run(self):
+
+
+   # }}}
+   # {{{ def start_thread(self, threads, thread_name, target, *args):
+   def start_thread(self, threads, thread_name, target, *args):
+      # Start a worker that takes a stop event as its last argument
+      threads[thread_name] = {}
+      threads[thread_name]['stopper'] = frame_clock.WakeEvent(self.wake_event)
+      threads[thread_name]['thread']  = threading.Thread(name=thread_name, target=target, args=args + (threads[thread_name]['stopper'],))
+      threads[thread_name]['thread'].daemon = True
+      threads[thread_name]['thread'].start()
+   # def start_thread(self, threads, thread_name, target, *args):
+
+
+   # }}}
+   # {{{ def midi_reader(self, interface_index, stop_event):
+   def midi_reader(self, interface_index, stop_event):
+      self.__midi_interfaces[interface_index] = 0
+      self.__open_midi_interface(interface_index)
+
+      if not self.__midi_interfaces[interface_index]:
+         raise RuntimeError("MIDI interface is not open")
+
+      # Look up this reader's metric series once, rather than per message
+      message_metrics = {
+         MidiMessageType.note          : self.metric_midi_messages.labels(interface_index, 'note'),
+         MidiMessageType.control_change: self.metric_midi_messages.labels(interface_index, 'control_change'),
+         MidiMessageType.program_change: self.metric_midi_messages.labels(interface_index, 'program_change'),
+      }
+      other_message_metric = self.metric_midi_messages.labels(interface_index, 'other')
+      batch_size_metric    = self.metric_midi_batch_size.labels(interface_index)
+      lock_wait_metric     = self.metric_midi_lock_wait.labels(threading.current_thread().name)
+
+      latency_metric = self.metric_midi_latency.labels(interface_index)
+      late_metric    = self.metric_midi_late_events.labels(interface_index)
+      drift_metric   = self.metric_midi_clock_drift.labels(interface_index)
+
+      # Map this interface's timestamps onto our clock, and hold events back until
+      # they're due at the target latency
+      midi_clock  = midi_timing.MidiClock(self.__pygame_midi.time, self.MIDI_READER__CLOCK_SAMPLE_INTERVAL)
+      event_queue = midi_timing.MidiEventQueue(midi_clock, self.MIDI_READER__TARGET_LATENCY)
+
+      # Passing MIDI on needs polling often enough for the next device not to notice
+      midi_thru     = self.midi_thru
+      poll_interval = min(self.MIDI_READER__INTERVAL, self.MIDI_THRU__POLL_INTERVAL) if midi_thru else self.MIDI_READER__INTERVAL
+
+      while(not stop_event.is_set()):
+         if midi_clock.sample():
+            drift_metric.set(midi_clock.get_drift())
+
+         if self.__midi_interfaces[interface_index].poll():
+            messages = self.__midi_interfaces[interface_index].read(self.MIDI_READER__BATCH_SIZE)
+
+            # Before anything else, so thru doesn't wait on the lights
+            if midi_thru:
+               midi_thru.forward(messages)
+
+            batch_size_metric.observe(len(messages))
+
+            now = time.monotonic()
+
+            for message in messages:
+               # Leave formatting to logging, so it's skipped when debug output is off
+               logging.debug("MSG: %s", message)
+
+               message_metrics.get(message[0][0], other_message_metric).inc()
+
+               if not event_queue.push(message, now):
+                  late_metric.inc()
+            # for message in messages:
+         # if self.__midi_interfaces[interface_index].poll():
+
+         # Apply whatever's due, and note how long after being played it was
+         event = event_queue.pop_due(time.monotonic())
+         while event:
+            self.__apply_midi_message(event[2], lock_wait_metric)
+
+            latency_metric.observe(time.monotonic() - event[1])
+
+            event = event_queue.pop_due(time.monotonic())
+         # while event:
+
+         # Slow the polling down to a reasonable rate, waking early for the next event due
+         time.sleep(event_queue.get_sleep_time(time.monotonic(), poll_interval))
+      # while(not stop_event.is_set()):
+
+      applied = sum(latency_metric.counts)
+      if applied:
+         logging.debug(
+            "MIDI interface %d: %d events applied %0.1f ms after being played on average, %d late, clock drift %0.1f ppm",
+            interface_index, applied, 1000.0 * latency_metric.sum / applied, late_metric.value, midi_clock.get_drift()
+         )
+      # if applied:
+
+      logging.debug("Asked to stop, returning...")
+      return
+   # def midi_reader(self, interface_index, stop_event):
+
+
+   # }}}
+   # {{{ def frame_pump(self, stop_event):
+   def frame_pump(self, stop_event):
+      # With RENDER_PROCESS, copies frames from the render process to the outputs
+      self.__init_display()
+
+      logging.debug("Started Frame Pump")
+
+      last_sequence = 0
+
+      while(not stop_event.is_set()):
+         # Only brightness applies here; the render process has its own settings
+         self.parameters.update(time.monotonic())
+
+         frame = self.render_link.read_frame(last_sequence)
+
+         if frame:
+            last_sequence = frame[0]
+            self.display_color_rgb(frame[2], frame[3], frame[4])
+         else:
+            self.keep_outputs_alive()
+         # else:
+
+         time.sleep(self.RENDER_PROCESS__POLL_INTERVAL)
+      # while(not stop_event.is_set()):
+
+      logging.debug("Asked to stop, returning...")
+      return
+   # def frame_pump(self, stop_event):
+
+
+   # }}}
+   # {{{ def display_manager(self, stop_event):
+   def display_manager(self, stop_event):
+      # Every display mode is rendered by the zone scheduler, on the configured zones
+      # or on one zone covering the whole guitar
+      self.zone_scheduler = zones.ZoneScheduler(self, zones.create_zones(self))
+
+      logging.debug("Started Display Manager")
+
+      self.zone_scheduler.run(stop_event)
+   # def display_manager(self, stop_event):
+
+
+   # }}}
+
+
+   # Private methods
+   # {{{ def __identify_midi_interfaces(self):
+   def __identify_midi_interfaces(self):
+      interfaces = []
+
+      for i in range(0, self.__pygame_midi.get_count()):
+         interface = self.__pygame_midi.get_device_info(i)
+
+         # If this isn't an input, we're not interested
+         if interface[2] != 1:
+            continue
+
+         # If this is one of the system MIDI interfaces, ignore it
+         if interface[1] in self.MIDI_INTERFACES_TO_IGNORE:
+            continue
+
+         # We found an interface to open!
+         interfaces.append(i)
+
+      if not interfaces:
+         raise RuntimeError("No MIDI devices found!")
+
+      return interfaces
+   # def __identify_midi_interfaces(self):
+
+
+   # }}}
+   # {{{ def __apply_midi_message(self, data, lock_wait_metric):
+   def __apply_midi_message(self, data, lock_wait_metric):
+      # Update the key state or display mode for a MIDI message's data bytes
+      profiling = self.profiler.enabled
+      if profiling: decode_start = time.perf_counter_ns()
+
+      if data[0] == MidiMessageType.note:
+         key_number   = constrain(data[1], 0, len(self.keys) - 1)
+         key_velocity = constrain(data[2], 0, self.MAX_VELOCITY)
+         note_number  = key_number % self.NUM_NOTES
+         note_on      = (key_velocity > 0)
+
+         logging.debug("NOTE: %s: %d (%d) - %d", 'ON' if note_on else 'off', key_number, note_number, key_velocity)
+
+         if note_on:
+            self.__change_keys(lock_wait_metric, self.key_state.note_on, key_number, key_velocity)
+         else:
+            self.__change_keys(lock_wait_metric, self.key_state.note_off, key_number)
+         # else:
+
+      elif data[0] == MidiMessageType.program_change:
+         logging.debug("PC: %d", data[1])
+
+         if data[1] in DisplayMode.get_modes():
+            logging.debug("   Setting new display mode")
+
+            lock_requested = time.perf_counter_ns()
+            with self.midi_data_lock:
+               lock_wait_metric.observe((time.perf_counter_ns() - lock_requested) / 1e9)
+               self.display_mode = data[1]
+
+               if self.render_link:
+                  self.render_link.publish_input(self, mode_changed = True)
+            # with self.midi_data_lock:
+
+            self.display_mode_change_event.set()
+         # if data[1] in DisplayMode.get_modes():
+      elif data[0] == MidiMessageType.control_change:
+         logging.debug("CC: %d", data[2])
+
+         # Pedals hold keys on. CCs mapped to parameters only set their targets, for
+         # the render loop to pick up. Color sent by another guitar's MIDI thru isn't
+         # a display mode either, but any others can still pick one.
+         if data[1] == self.MIDI_READER__SUSTAIN_CC:
+            self.__change_keys(lock_wait_metric, self.key_state.set_sustain, data[2])
+         elif data[1] == self.MIDI_READER__SOSTENUTO_CC:
+            self.__change_keys(lock_wait_metric, self.key_state.set_sostenuto, data[2])
+         elif data[1] in self.MIDI_THRU__COLOR_CCS:
+            pass
+         elif not self.parameters.set_cc(data[1], data[2]) and data[2] in DisplayMode.get_modes():
+            logging.debug("   Setting new display mode")
+
+            lock_requested = time.perf_counter_ns()
+            with self.midi_data_lock:
+               lock_wait_metric.observe((time.perf_counter_ns() - lock_requested) / 1e9)
+               self.display_mode = data[2]
+
+               if self.render_link:
+                  self.render_link.publish_input(self, mode_changed = True)
+            # with self.midi_data_lock:
+
+            self.display_mode_change_event.set()
+         # elif not self.parameters.set_cc(data[1], data[2]) and data[2] in DisplayMode.get_modes():
+      # if
+
+      if profiling: self.profiler.record(profiler.STAGE_MIDI_DECODE, decode_start, time.perf_counter_ns())
+   # def __apply_midi_message(self, data, lock_wait_metric):
+
+
+   # }}}
+   # {{{ def __change_keys(self, lock_wait_metric, change, *args):
+   def __change_keys(self, lock_wait_metric, change, *args):
+      # Apply a key or pedal change to the key state, and only if any keys start or
+      # stop sounding, recalculate the key stats and let the renderers know. When
+      # following a cluster leader's MIDI, our own keys don't count.
+      if self.cluster_follower and self.CLUSTER_FOLLOW_MIDI:
+         return
+
+      lock_requested = time.perf_counter_ns()
+      with self.midi_data_lock:
+         lock_acquired = time.perf_counter_ns()
+         lock_wait_metric.observe((lock_acquired - lock_requested) / 1e9)
+         if self.profiler.enabled: self.profiler.record(profiler.STAGE_LOCK_WAIT, lock_requested, lock_acquired)
+
+         if not change(*args):
+            return
+
+         self.update_key_stats()
+
+         if self.render_link:
+            self.render_link.publish_input(self, notes_changed = True)
+      # with self.midi_data_lock:
+   # def __change_keys(self, lock_wait_metric, change, *args):
+
+
+   # }}}
+   # {{{ def __open_midi_interface(self, interface_index):
+   def __open_midi_interface(self, interface_index):
+      interface = self.__pygame_midi.get_device_info(interface_index)
+
+      if not interface:
+         raise RuntimeError("MIDI device %d not found!".format(interface_index))
+
+      # If this isn't an input, we're not interested
+      if interface[2] != 1:
+         return False
+
+      # If this is one of the system MIDI interfaces, ignore it
+      if interface[1] in self.MIDI_INTERFACES_TO_IGNORE:
+         return False
+
+      # We found an interface to open!
+      logging.debug("Opening MIDI device %d (%s):" % (interface_index, interface[1]))
+      self.__midi_interfaces[interface_index] = self.__pygame_midi.Input(interface_index, 100)
+
+      return True
+   # def __open_midi_interface(self, interface_index):
+
+
+   # }}}
+   # {{{ def __open_midi_output(self, device_name):
+   def __open_midi_output(self, device_name):
+      for i in range(0, self.__pygame_midi.get_count()):
+         interface = self.__pygame_midi.get_device_info(i)
+
+         # If this isn't an output, we're not interested
+         if interface[3] != 1:
+            continue
+
+         name = interface[1].decode() if isinstance(interface[1], bytes) else interface[1]
+         if name != device_name:
+            continue
+
+         # No latency, so messages go out as they're written rather than by timestamp
+         logging.debug("Opening MIDI output %d (%s) for MIDI thru" % (i, name))
+         return self.__pygame_midi.Output(i, 0)
+      # for i in range(0, self.__pygame_midi.get_count()):
+
+      raise RuntimeError("MIDI output '%s' not found!" % device_name)
+   # def __open_midi_output(self, device_name):
+
+
+   # }}}
+
+
+   # Class methods
+   # {{{ def scale_color_brightness(cls, color, scale = 1.0):
+   @classmethod
+   def scale_color_brightness(cls, color, scale = 1.0):
+      scale = constrain(scale, 0.0, 1.0)
+
+      color['red']   = constrain((color['red']   * scale), 0.0, 100.0)
+      color['green'] = constrain((color['green'] * scale), 0.0, 100.0)
+      color['blue']  = constrain((color['blue']  * scale), 0.0, 100.0)
+
+      return(color)
+   # def scale_color_brightness(cls, color, scale = 1.0):
+
+
+   # }}}
+# class AcrylicGuitar:
+
+
+# }}}
+
+# {{{ def constrain(n, minn, maxn):
+def constrain(n, minn, maxn):
+   # Swap min and max if they're inverted
+   if minn > maxn:
+      temp = maxn
+      maxn = minn
+      minn = temp
+
+   if n < minn:
+      return minn
+   elif n > maxn:
+      return maxn
+   else:
+      return n
+# def constrain(n, minn, maxn):
+
+
+# }}}
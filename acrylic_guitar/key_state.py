@@ -0,0 +1,176 @@
+#!/usr/bin/python
+
+
+
+# Pedal CC values from this up are pedal down
+PEDAL_DOWN = 64
+
+
+
+# {{{ class KeyState:
+class KeyState:
+   # Which keys are sounding, with the sustain and sostenuto pedals taken into account,
+   # kept up to date in the guitar's keys (velocity while sounding, else 0) and notes.
+   # Key sets are int bitmasks, bit n for key n:
+   #
+   #    held      : keys physically down
+   #    sustained : keys let go of while the sustain pedal was down
+   #    sostenuto : keys down when the sostenuto pedal went down
+   #
+   # A key sounds while it's in any of them. Letting go of a key a pedal is holding
+   # changes nothing, so the display modes see no change until the pedal comes up,
+   # and then every key it was holding stops in one go. Call with midi_data_lock held.
+
+
+   # {{{ def __init__(self, keys, notes):
+   def __init__(self, keys, notes):
+      self.keys  = keys
+      self.notes = notes
+
+      self.held      = 0
+      self.sustained = 0
+      self.sostenuto = 0
+
+      self.sustain_down   = False
+      self.sostenuto_down = False
+
+      # Every key playing each note, in any octave
+      self.__note_masks = []
+      for note in range(0, len(notes)):
+         mask = 0
+         for key in range(note, len(keys), len(notes)):
+            mask |= (1 << key)
+
+         self.__note_masks.append(mask)
+      # for note in range(0, len(notes)):
+   # def __init__(self, keys, notes):
+
+
+   # }}}
+   # {{{ def get_sounding(self):
+   def get_sounding(self):
+      return self.held | self.sustained | self.sostenuto
+   # def get_sounding(self):
+
+
+   # }}}
+   # {{{ def note_on(self, key, velocity):
+   def note_on(self, key, velocity):
+      # Returns whether the keys changed
+      self.held |= (1 << key)
+
+      if self.keys[key] == velocity:
+         return False
+
+      self.keys[key] = velocity
+      self.__update_notes(1 << key)
+
+      return True
+   # def note_on(self, key, velocity):
+
+
+   # }}}
+   # {{{ def note_off(self, key):
+   def note_off(self, key):
+      # Returns whether the keys changed, which they don't while a pedal holds the key
+      bit = 1 << key
+
+      self.held &= ~bit
+
+      if self.sustain_down:
+         self.sustained |= bit
+
+      if (self.sustained | self.sostenuto) & bit or not self.keys[key]:
+         return False
+
+      self.keys[key] = 0
+      self.__update_notes(bit)
+
+      return True
+   # def note_off(self, key):
+
+
+   # }}}
+   # {{{ def set_sustain(self, value):
+   def set_sustain(self, value):
+      # Takes the pedal's CC value. Returns whether the keys changed.
+      down = value >= PEDAL_DOWN
+
+      # Half-pedalling sends a stream of values; only crossing over matters
+      if down == self.sustain_down:
+         return False
+
+      self.sustain_down = down
+      if down:
+         return False
+
+      released       = self.sustained & ~(self.held | self.sostenuto)
+      self.sustained = 0
+
+      return self.__release(released)
+   # def set_sustain(self, value):
+
+
+   # }}}
+   # {{{ def set_sostenuto(self, value):
+   def set_sostenuto(self, value):
+      # Takes the pedal's CC value. Returns whether the keys changed.
+      down = value >= PEDAL_DOWN
+
+      if down == self.sostenuto_down:
+         return False
+
+      self.sostenuto_down = down
+      if down:
+         # Only the keys down now are held over
+         self.sostenuto = self.held
+         return False
+      # if down:
+
+      released       = self.sostenuto & ~(self.held | self.sustained)
+      self.sostenuto = 0
+
+      return self.__release(released)
+   # def set_sostenuto(self, value):
+
+
+   # }}}
+   # {{{ def __release(self, released):
+   def __release(self, released):
+      # Stop every key in the released mask at once, visiting only those keys
+      if not released:
+         return False
+
+      keys    = self.keys
+      pending = released
+      while pending:
+         lowest   = pending & -pending
+         pending ^= lowest
+
+         keys[lowest.bit_length() - 1] = 0
+      # while pending:
+
+      self.__update_notes(released)
+
+      return True
+   # def __release(self, released):
+
+
+   # }}}
+   # {{{ def __update_notes(self, changed):
+   def __update_notes(self, changed):
+      # A note is on while any of its keys is sounding
+      sounding = self.get_sounding()
+
+      for note, mask in enumerate(self.__note_masks):
+         if changed & mask:
+            self.notes[note] = bool(sounding & mask)
+      # for note, mask in enumerate(self.__note_masks):
+   # def __update_notes(self, changed):
+
+
+   # }}}
+# class KeyState:
+
+
+# }}}
@@ -0,0 +1,363 @@
+#!/usr/bin/python
+
+
+import bisect
+import logging
+import threading
+
+
+
+# Bucket upper bounds (sec) for the timing histograms: 10us to 100ms
+TIMING_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+# Bucket upper bounds (sec) for MIDI event latency: 1ms to 250ms
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.0075, 0.01, 0.0125, 0.015, 0.0175, 0.02, 0.0225, 0.025, 0.03, 0.04, 0.05, 0.075, 0.1, 0.25)
+
+# Bucket upper bounds for MIDI read batch sizes
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+
+
+
+# Recording is meant to stay on all the time, so it's kept to a bare attribute
+# update: no locks, no allocation. That's only safe while each series is written
+# by a single thread, so series touched by several threads (e.g. one per MIDI
+# reader) get a label per thread. The exporter only reads, and may catch a
+# histogram mid-update, which is harmless.
+
+
+# {{{ class Metric:
+class Metric:
+   # A family of series sharing a name, one per combination of label values
+
+
+   # {{{ def __init__(self, name, help_text, label_names = (), label_values = ()):
+   def __init__(self, name, help_text, label_names = (), label_values = ()):
+      self.name         = name
+      self.help_text    = help_text
+      self.label_names  = tuple(label_names)
+      self.label_values = tuple(label_values)
+
+      self.__children      = {}
+      self.__children_lock = threading.Lock()
+   # def __init__(self, name, help_text, label_names = (), label_values = ()):
+
+
+   # }}}
+   # {{{ def labels(self, *label_values):
+   def labels(self, *label_values):
+      # Callers should hold on to the child rather than look it up per sample
+      label_values = tuple([str(value) for value in label_values])
+
+      if len(label_values) != len(self.label_names):
+         raise RuntimeError("Metric %s takes labels %s" % (self.name, self.label_names))
+
+      with self.__children_lock:
+         if label_values not in self.__children:
+            self.__children[label_values] = self._new_child(label_values)
+
+         return self.__children[label_values]
+      # with self.__children_lock:
+   # def labels(self, *label_values):
+
+
+   # }}}
+   # {{{ def get_series(self):
+   def get_series(self):
+      # Unlabelled metrics are their own (only) series
+      if not self.label_names:
+         return [self]
+
+      with self.__children_lock:
+         return [self.__children[key] for key in sorted(self.__children)]
+   # def get_series(self):
+
+
+   # }}}
+   # {{{ def render(self):
+   def render(self):
+      lines = [
+         '# HELP %s %s' % (self.name, self.help_text),
+         '# TYPE %s %s' % (self.name, self.TYPE),
+      ]
+
+      for series in self.get_series():
+         series._render_samples(lines)
+
+      return lines
+   # def render(self):
+
+
+   # }}}
+   # {{{ def _format_labels(self, extra = ()):
+   def _format_labels(self, extra = ()):
+      pairs = list(zip(self.label_names, self.label_values)) + list(extra)
+      if not pairs:
+         return ''
+
+      return '{' + ','.join(['%s="%s"' % (name, value) for name, value in pairs]) + '}'
+   # def _format_labels(self, extra = ()):
+
+
+   # }}}
+# class Metric:
+
+
+# }}}
+# {{{ class Counter(Metric):
+class Counter(Metric):
+   TYPE = 'counter'
+
+
+   # {{{ def __init__(self, name, help_text, label_names = (), label_values = ()):
+   def __init__(self, name, help_text, label_names = (), label_values = ()):
+      Metric.__init__(self, name, help_text, label_names, label_values)
+      self.value = 0
+   # def __init__(self, name, help_text, label_names = (), label_values = ()):
+
+
+   # }}}
+   # {{{ def inc(self, amount = 1):
+   def inc(self, amount = 1):
+      self.value += amount
+   # def inc(self, amount = 1):
+
+
+   # }}}
+   # {{{ def _new_child(self, label_values):
+   def _new_child(self, label_values):
+      return Counter(self.name, self.help_text, self.label_names, label_values)
+   # def _new_child(self, label_values):
+
+
+   # }}}
+   # {{{ def _render_samples(self, lines):
+   def _render_samples(self, lines):
+      lines.append('%s%s %s' % (self.name, self._format_labels(), repr(float(self.value))))
+   # def _render_samples(self, lines):
+
+
+   # }}}
+# class Counter(Metric):
+
+
+# }}}
+# {{{ class Gauge(Metric):
+class Gauge(Metric):
+   TYPE = 'gauge'
+
+
+   # {{{ def __init__(self, name, help_text, label_names = (), label_values = ()):
+   def __init__(self, name, help_text, label_names = (), label_values = ()):
+      Metric.__init__(self, name, help_text, label_names, label_values)
+      self.value = 0
+   # def __init__(self, name, help_text, label_names = (), label_values = ()):
+
+
+   # }}}
+   # {{{ def set(self, value):
+   def set(self, value):
+      self.value = value
+   # def set(self, value):
+
+
+   # }}}
+   # {{{ def _new_child(self, label_values):
+   def _new_child(self, label_values):
+      return Gauge(self.name, self.help_text, self.label_names, label_values)
+   # def _new_child(self, label_values):
+
+
+   # }}}
+   # {{{ def _render_samples(self, lines):
+   def _render_samples(self, lines):
+      lines.append('%s%s %s' % (self.name, self._format_labels(), repr(float(self.value))))
+   # def _render_samples(self, lines):
+
+
+   # }}}
+# class Gauge(Metric):
+
+
+# }}}
+# {{{ class Histogram(Metric):
+class Histogram(Metric):
+   # Fixed buckets, counted non-cumulatively on the hot path and summed up at export
+   TYPE = 'histogram'
+
+
+   # {{{ def __init__(self, name, help_text, buckets, label_names = (), label_values = ()):
+   def __init__(self, name, help_text, buckets, label_names = (), label_values = ()):
+      Metric.__init__(self, name, help_text, label_names, label_values)
+
+      self.buckets = tuple(sorted(buckets))
+
+      # One slot per bucket, plus one for +Inf
+      self.counts = [0] * (len(self.buckets) + 1)
+      self.sum    = 0.0
+   # def __init__(self, name, help_text, buckets, label_names = (), label_values = ()):
+
+
+   # }}}
+   # {{{ def observe(self, value):
+   def observe(self, value):
+      self.counts[bisect.bisect_left(self.buckets, value)] += 1
+      self.sum += value
+   # def observe(self, value):
+
+
+   # }}}
+   # {{{ def _new_child(self, label_values):
+   def _new_child(self, label_values):
+      return Histogram(self.name, self.help_text, self.buckets, self.label_names, label_values)
+   # def _new_child(self, label_values):
+
+
+   # }}}
+   # {{{ def _render_samples(self, lines):
+   def _render_samples(self, lines):
+      counts = list(self.counts)
+      total  = 0
+
+      for bound, count in zip(self.buckets + ('+Inf',), counts):
+         total += count
+         lines.append('%s_bucket%s %d' % (self.name, self._format_labels([('le', bound)]), total))
+      # for bound, count in zip(self.buckets + ('+Inf',), counts):
+
+      lines.append('%s_sum%s %s' % (self.name, self._format_labels(), repr(self.sum)))
+      lines.append('%s_count%s %d' % (self.name, self._format_labels(), total))
+   # def _render_samples(self, lines):
+
+
+   # }}}
+# class Histogram(Metric):
+
+
+# }}}
+# {{{ class MetricsRegistry:
+class MetricsRegistry:
+
+
+   # {{{ def __init__(self):
+   def __init__(self):
+      self.__metrics = []
+   # def __init__(self):
+
+
+   # }}}
+   # {{{ def counter(self, name, help_text, label_names = ()):
+   def counter(self, name, help_text, label_names = ()):
+      return self.register(Counter(name, help_text, label_names))
+   # def counter(self, name, help_text, label_names = ()):
+
+
+   # }}}
+   # {{{ def gauge(self, name, help_text, label_names = ()):
+   def gauge(self, name, help_text, label_names = ()):
+      return self.register(Gauge(name, help_text, label_names))
+   # def gauge(self, name, help_text, label_names = ()):
+
+
+   # }}}
+   # {{{ def histogram(self, name, help_text, buckets, label_names = ()):
+   def histogram(self, name, help_text, buckets, label_names = ()):
+      return self.register(Histogram(name, help_text, buckets, label_names))
+   # def histogram(self, name, help_text, buckets, label_names = ()):
+
+
+   # }}}
+   # {{{ def register(self, metric):
+   def register(self, metric):
+      self.__metrics.append(metric)
+      return metric
+   # def register(self, metric):
+
+
+   # }}}
+   # {{{ def render(self):
+   def render(self):
+      # Prometheus text exposition format, version 0.0.4
+      lines = []
+      for metric in self.__metrics:
+         lines.extend(metric.render())
+
+      return '\n'.join(lines) + '\n'
+   # def render(self):
+
+
+   # }}}
+# class MetricsRegistry:
+
+
+# }}}
+# {{{ class MetricsServer:
+class MetricsServer:
+   # Serves a registry at /metrics from its own thread
+
+
+   # {{{ def __init__(self, registry, port, address = ''):
+   def __init__(self, registry, port, address = ''):
+      self.registry = registry
+      self.port     = port
+      self.address  = address
+   # def __init__(self, registry, port, address = ''):
+
+
+   # }}}
+   # {{{ def run(self, stop_event):
+   def run(self, stop_event):
+      # Only pay for importing the HTTP server when metrics are actually served
+      from http.server import HTTPServer, BaseHTTPRequestHandler
+
+      registry = self.registry
+
+      # {{{ class MetricsHandler(BaseHTTPRequestHandler):
+      class MetricsHandler(BaseHTTPRequestHandler):
+         # {{{ def do_GET(self):
+         def do_GET(self):
+            if self.path.split('?')[0] not in ['/', '/metrics']:
+               self.send_error(404)
+               return
+
+            body = registry.render().encode('utf-8')
+
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+         # def do_GET(self):
+
+
+         # }}}
+         # {{{ def log_message(self, format, *args):
+         def log_message(self, format, *args):
+            # Scrapes every few seconds would drown out everything else
+            pass
+         # def log_message(self, format, *args):
+
+
+         # }}}
+      # class MetricsHandler(BaseHTTPRequestHandler):
+
+
+      # }}}
+
+      server = HTTPServer((self.address, self.port), MetricsHandler)
+      server.timeout = 0.5
+
+      logging.debug("Serving metrics on port %d", server.server_address[1])
+
+      try:
+         while not stop_event.is_set():
+            server.handle_request()
+      finally:
+         server.server_close()
+      # finally:
+   # def run(self, stop_event):
+
+
+   # }}}
+# class MetricsServer:
+
+
+# }}}
@@ -0,0 +1,156 @@
+#!/usr/bin/python
+
+
+import time
+import logging
+import threading
+
+from acrylic_guitar import state_export
+
+
+
+# Status bytes, before the channel is added
+PROGRAM_CHANGE = 0xc0
+CONTROL_CHANGE = 0xb0
+
+# SysEx carrying the color at 14 bits a channel: non-commercial manufacturer ID, 'AG',
+# then message type 1, the display mode, and each channel as two 7-bit bytes
+SYSEX_START        = 0xf0
+SYSEX_END          = 0xf7
+SYSEX_HEADER       = [SYSEX_START, 0x7d, 0x41, 0x47, 0x01]
+SYSEX_COLOR_SCALE  = 0x3fff
+
+# Most messages pygame.midi.Output.write() takes in one go
+MAX_WRITE_BATCH = 1024
+
+
+
+# {{{ class MidiThru:
+class MidiThru:
+   # Lets the guitar sit in a MIDI chain. The MIDI readers hand every batch they read
+   # to forward() before doing anything else with it, which passes it on in one
+   # write() to a pygame.midi.Output opened with no latency, so it goes out straight
+   # away. With MIDI_THRU__SEND_STATE, run() also sends the display mode as a program
+   # change and the color as CCs and SysEx whenever they change, for other devices
+   # and guitars to follow. PortMidi streams aren't thread-safe, so writes are locked.
+
+
+   # {{{ def __init__(self, guitar, output):
+   def __init__(self, guitar, output):
+      self.guitar = guitar
+      self.output = output
+
+      self.__write_lock = threading.Lock()
+
+      self.__messages_metric = guitar.metric_midi_thru_messages
+      self.__write_metric    = guitar.metric_midi_thru_write_time
+
+      # What was last sent, so only changes go out
+      self.shown_color       = state_export.ShownColor(guitar)
+      self.__sent_mode       = None
+      self.__sent_ccs        = [None, None, None]
+      self.__sent_sysex      = None
+   # def __init__(self, guitar, output):
+
+
+   # }}}
+   # {{{ def forward(self, messages):
+   def forward(self, messages):
+      # Pass on messages as read from a pygame.midi.Input, timestamps and all
+      write_started = time.perf_counter()
+
+      with self.__write_lock:
+         if len(messages) <= MAX_WRITE_BATCH:
+            self.output.write(messages)
+         else:
+            for start in range(0, len(messages), MAX_WRITE_BATCH):
+               self.output.write(messages[start:start + MAX_WRITE_BATCH])
+         # else:
+      # with self.__write_lock:
+
+      self.__write_metric.observe(time.perf_counter() - write_started)
+      self.__messages_metric.labels('thru').inc(len(messages))
+   # def forward(self, messages):
+
+
+   # }}}
+   # {{{ def run(self, stop_event):
+   def run(self, stop_event):
+      # Sends the guitar's state as it changes, when MIDI_THRU__SEND_STATE is on
+      guitar = self.guitar
+
+      logging.debug("Sending state to MIDI every %0.3f sec", guitar.MIDI_THRU__STATE_INTERVAL)
+
+      while not stop_event.wait(guitar.MIDI_THRU__STATE_INTERVAL):
+         self.send_state()
+
+      logging.debug("Asked to stop, returning...")
+   # def run(self, stop_event):
+
+
+   # }}}
+   # {{{ def send_state(self):
+   def send_state(self):
+      guitar   = self.guitar
+      channel  = (guitar.MIDI_THRU__STATE_CHANNEL - 1) & 0x0f
+      messages = []
+
+      display_mode = guitar.display_mode
+      if display_mode != self.__sent_mode:
+         self.__sent_mode = display_mode
+         messages.append([[PROGRAM_CHANGE | channel, display_mode & 0x7f, 0, 0], 0])
+      # if display_mode != self.__sent_mode:
+
+      color = self.shown_color.get()
+
+      # A CC per channel, at 7 bits
+      for index, controller in enumerate(guitar.MIDI_THRU__COLOR_CCS):
+         value = int(round(color[index] * 127 / 100.0))
+
+         if value != self.__sent_ccs[index]:
+            self.__sent_ccs[index] = value
+            messages.append([[CONTROL_CHANGE | channel, controller, value, 0], 0])
+         # if value != self.__sent_ccs[index]:
+      # for index, controller in enumerate(guitar.MIDI_THRU__COLOR_CCS):
+
+      # And all of it at 14 bits, for anything that wants the detail
+      sysex = list(SYSEX_HEADER)
+      sysex.append(display_mode & 0x7f)
+      for value in color:
+         value = int(round(value * SYSEX_COLOR_SCALE / 100.0))
+         sysex.extend([(value >> 7) & 0x7f, value & 0x7f])
+      # for value in color:
+      sysex.append(SYSEX_END)
+
+      if sysex == self.__sent_sysex:
+         sysex = None
+      else:
+         self.__sent_sysex = sysex
+
+      if not (messages or sysex):
+         return
+
+      with self.__write_lock:
+         if messages:
+            self.output.write(messages)
+         if sysex:
+            self.output.write_sys_ex(0, sysex)
+      # with self.__write_lock:
+
+      self.__messages_metric.labels('state').inc(len(messages) + (1 if sysex else 0))
+   # def send_state(self):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      with self.__write_lock:
+         self.output.close()
+   # def close(self):
+
+
+   # }}}
+# class MidiThru:
+
+
+# }}}
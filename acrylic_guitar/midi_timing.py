@@ -0,0 +1,167 @@
+#!/usr/bin/python
+
+
+import time
+import collections
+
+
+
+# pygame.midi stamps each event with PortMidi's clock: milliseconds since
+# pygame.midi.init(), on a timer that can drift from ours. MidiClock works out how
+# to turn those timestamps into time.monotonic() seconds, and MidiEventQueue holds
+# events back so each one is applied a constant time after it was played, however
+# long it sat in PortMidi's buffer or how late the reader woke up.
+
+
+# Most the PortMidi timer is taken to drift from ours. Real crystals are well inside
+# this; it keeps millisecond rounding in the first few samples from skewing the fit.
+MAX_DRIFT = 0.0005
+
+
+
+# {{{ class MidiClock:
+class MidiClock:
+   # Fits local time = intercept + slope * MIDI time over the most recent pairs of
+   # readings of both clocks, so the slope follows drift between them
+
+
+   # {{{ def __init__(self, midi_time, sample_interval = 0.5, window = 64, time_source = None):
+   def __init__(self, midi_time, sample_interval = 0.5, window = 64, time_source = None):
+      self.midi_time       = midi_time
+      self.sample_interval = sample_interval
+      self.time_source     = time_source if time_source else time.monotonic
+
+      self.samples          = collections.deque(maxlen=window)
+      self.next_sample_time = 0.0
+
+      self.intercept = 0.0
+      self.slope     = 1.0
+   # def __init__(self, midi_time, sample_interval = 0.5, window = 64, time_source = None):
+
+
+   # }}}
+   # {{{ def sample(self):
+   def sample(self):
+      # Read both clocks, if it's been long enough since the last time. Call regularly.
+      before = self.time_source()
+      if before < self.next_sample_time:
+         return False
+
+      midi_now = self.midi_time()
+      after    = self.time_source()
+
+      self.next_sample_time = after + self.sample_interval
+
+      # The MIDI time was read somewhere between the two
+      self.samples.append((midi_now / 1000.0, (before + after) / 2.0))
+      self.__fit()
+
+      return True
+   # def sample(self):
+
+
+   # }}}
+   # {{{ def to_local(self, timestamp):
+   def to_local(self, timestamp):
+      # A pygame.midi timestamp (ms) as time.monotonic() seconds
+      return self.intercept + (self.slope * (timestamp / 1000.0))
+   # def to_local(self, timestamp):
+
+
+   # }}}
+   # {{{ def get_drift(self):
+   def get_drift(self):
+      # How much faster our clock runs than the MIDI one, in parts per million
+      return (self.slope - 1.0) * 1e6
+   # def get_drift(self):
+
+
+   # }}}
+   # {{{ def __fit(self):
+   def __fit(self):
+      # Least squares, around the means to keep the sums small
+      count      = len(self.samples)
+      midi_mean  = sum([midi for midi, local in self.samples]) / count
+      local_mean = sum([local for midi, local in self.samples]) / count
+
+      covariance = 0.0
+      variance   = 0.0
+      for midi, local in self.samples:
+         covariance += (midi - midi_mean) * (local - local_mean)
+         variance   += (midi - midi_mean) * (midi - midi_mean)
+      # for midi, local in self.samples:
+
+      slope = (covariance / variance) if variance > 0 else 1.0
+
+      self.slope     = min(max(slope, 1.0 - MAX_DRIFT), 1.0 + MAX_DRIFT)
+      self.intercept = local_mean - (self.slope * midi_mean)
+   # def __fit(self):
+
+
+   # }}}
+# class MidiClock:
+
+
+# }}}
+# {{{ class MidiEventQueue:
+class MidiEventQueue:
+   # MIDI messages waiting to be applied target_latency seconds after they were played.
+   # A target of zero applies each one as soon as it's read, as before.
+
+
+   # {{{ def __init__(self, midi_clock, target_latency):
+   def __init__(self, midi_clock, target_latency):
+      self.midi_clock     = midi_clock
+      self.target_latency = target_latency
+
+      # (due time, note time, message data), in the order they were read
+      self.events = collections.deque()
+   # def __init__(self, midi_clock, target_latency):
+
+
+   # }}}
+   # {{{ def push(self, message, now):
+   def push(self, message, now):
+      # Queue a message as read from pygame.midi ([data, timestamp]). Returns whether
+      # it's still in time to be applied at the target latency.
+      note_time = self.midi_clock.to_local(message[1])
+
+      # An event can't have been played after we read it, whatever the fit says
+      if note_time > now:
+         note_time = now
+
+      due_time = note_time + self.target_latency
+
+      self.events.append((due_time, note_time, message[0]))
+
+      return due_time >= now
+   # def push(self, message, now):
+
+
+   # }}}
+   # {{{ def pop_due(self, now):
+   def pop_due(self, now):
+      # The oldest event if it's due, or None
+      if self.events and self.events[0][0] <= now:
+         return self.events.popleft()
+
+      return None
+   # def pop_due(self, now):
+
+
+   # }}}
+   # {{{ def get_sleep_time(self, now, interval):
+   def get_sleep_time(self, now, interval):
+      # How long to sleep: the polling interval, or less if an event falls due sooner
+      if self.events:
+         return max(min(interval, self.events[0][0] - now), 0.0)
+
+      return interval
+   # def get_sleep_time(self, now, interval):
+
+
+   # }}}
+# class MidiEventQueue:
+
+
+# }}}
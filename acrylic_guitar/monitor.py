@@ -0,0 +1,128 @@
+#!/usr/bin/python
+
+
+import sys
+import json
+import time
+import argparse
+
+from acrylic_guitar import state_export
+
+
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# A guitar that hasn't written its state for this long (sec) is shown as stalled
+STALE_AGE = 1.0
+
+
+
+# {{{ def get_mode_names():
+def get_mode_names():
+   # Display mode numbers to names, e.g. 1: 'random_glow'
+   from acrylic_guitar.guitar import DisplayMode
+
+   return dict([(value, name) for name, value in vars(DisplayMode).items() if isinstance(value, int)])
+# def get_mode_names():
+
+
+# }}}
+# {{{ def format_state(state, mode_names):
+def format_state(state, mode_names):
+   if not state['running']:
+      status = 'stopped'
+   elif state['age'] > STALE_AGE:
+      status = 'stalled %0.1fs' % state['age']
+   else:
+      status = 'running'
+   # else:
+
+   lowest_note = NOTE_NAMES[state['lowest_note_on']] if state['lowest_note_on'] >= 0 else '-'
+   keys_held   = ' '.join([str(key) for key in state['keys_held']]) if state['keys_held'] else '-'
+
+   return "%-8s mode %d %-26s color %5.1f/%5.1f/%5.1f  lowest %-2s vel %3d  keys %-12s  frame %d  %4.0f fps  dropped %d  degrade %d" % (
+      status, state['display_mode'], '(%s)' % mode_names.get(state['display_mode'], '?'),
+      state['red'], state['green'], state['blue'],
+      lowest_note, state['max_key_velocity'], keys_held,
+      state['frame'], state['frame_rate'], state['frames_dropped'], state['degrade_level'],
+   )
+# def format_state(state, mode_names):
+
+
+# }}}
+# {{{ def get_argument_parser():
+def get_argument_parser():
+   parser = argparse.ArgumentParser(prog='acrylic-guitar-monitor', description='Show what a running acrylic guitar is doing, from its state file.')
+
+   parser.add_argument('path',
+      help="State file the guitar publishes to (its --state-file)")
+   parser.add_argument('-i', '--interval', type=float, default=0.1,
+      help="Seconds between updates (default: 0.1)")
+   parser.add_argument('--once', action='store_true',
+      help="Show the state once and exit")
+   parser.add_argument('--json', action='store_true',
+      help="Print each update as a line of JSON, for feeding to other tools")
+
+   return parser
+# def get_argument_parser():
+
+
+# }}}
+# {{{ def main(argv = None):
+def main(argv = None):
+   options = get_argument_parser().parse_args(argv)
+
+   try:
+      reader = state_export.StateReader(options.path)
+   except (OSError, RuntimeError) as e:
+      sys.stderr.write("ERROR: %s\n" % e)
+      return 1
+   # except (OSError, RuntimeError) as e:
+
+   mode_names = get_mode_names()
+   rewrite    = sys.stdout.isatty() and not (options.once or options.json)
+
+   try:
+      while True:
+         state = reader.read()
+
+         if state:
+            if options.json:
+               del state['magic']
+               line = json.dumps(state)
+            else:
+               line = format_state(state, mode_names)
+            # else:
+
+            # On a terminal, keep rewriting the one line
+            if rewrite:
+               sys.stdout.write('\r\x1b[K' + line)
+            else:
+               sys.stdout.write(line + '\n')
+
+            sys.stdout.flush()
+         # if state:
+
+         if options.once:
+            break
+
+         time.sleep(options.interval)
+      # while True:
+   except KeyboardInterrupt:
+      pass
+   # except KeyboardInterrupt:
+
+   if rewrite:
+      sys.stdout.write('\n')
+
+   reader.close()
+
+   return 0
+# def main(argv = None):
+
+
+# }}}
+
+
+if __name__ == '__main__':
+   sys.exit(main())
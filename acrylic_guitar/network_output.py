@@ -0,0 +1,331 @@
+#!/usr/bin/python
+
+
+import time
+import uuid
+import socket
+import struct
+import logging
+
+
+
+# Standard UDP ports for each protocol
+ARTNET_PORT = 6454
+SACN_PORT   = 5568
+
+# Number of DMX channels in a full universe
+DMX_UNIVERSE_SIZE = 512
+
+
+
+# {{{ class NetworkOutput:
+class NetworkOutput:
+   # Drives DMX fixtures over UDP. Every universe gets one packet buffer, allocated
+   # up front, whose DMX slots are updated in place. Channel updates made during a
+   # frame are coalesced, and send_frame() transmits each universe at most once:
+   # when something changed, or when the keep-alive interval has passed.
+
+
+   # {{{ def __init__(self, universes, host = None, port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE):
+   def __init__(self, universes, host = None, port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE):
+      if not universes:
+         raise RuntimeError("At least one universe is required for network output")
+
+      if channels_per_universe < 1 or channels_per_universe > DMX_UNIVERSE_SIZE:
+         raise RuntimeError("Invalid number of channels per universe: %d" % channels_per_universe)
+
+      self.host                  = host
+      self.port                  = port if port else self.DEFAULT_PORT
+      self.keep_alive_interval   = keep_alive_interval
+      self.channels_per_universe = channels_per_universe
+
+      self.universes = list(universes)
+
+      self.packets_sent = 0
+      self.frames_sent  = 0
+
+
+      # Preallocate a packet per universe, and keep a view onto its DMX data so
+      # channel updates write straight into the buffer we hand to sendto()
+      self.__packets      = {}
+      self.__data         = {}
+      self.__destinations = {}
+      self.__last_sent    = {}
+      self.__sequence     = {}
+
+      for universe in self.universes:
+         packet = self._build_packet(universe)
+
+         self.__packets[universe]      = packet
+         self.__data[universe]         = memoryview(packet)[self.DATA_OFFSET:self.DATA_OFFSET + self.channels_per_universe]
+         self.__destinations[universe] = (self._get_destination_host(universe), self.port)
+         self.__last_sent[universe]    = None
+         self.__sequence[universe]     = 0
+      # for universe in self.universes:
+
+      # Start with everything dirty so the first frame goes out
+      self.__dirty = set(self.universes)
+
+
+      self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+      self.__socket.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+   # def __init__(self, universes, host = None, port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE):
+
+
+   # }}}
+
+
+   # Action Methods
+   # {{{ def set_channels(self, universe, start_channel, values):
+   def set_channels(self, universe, start_channel, values):
+      # Channels are numbered from 1, as on the fixtures
+      data    = self.__data[universe]
+      changed = False
+
+      index = start_channel - 1
+      for value in values:
+         if data[index] != value:
+            data[index] = value
+            changed     = True
+         # if data[index] != value:
+
+         index += 1
+      # for value in values:
+
+      if changed:
+         self.__dirty.add(universe)
+   # def set_channels(self, universe, start_channel, values):
+
+
+   # }}}
+   # {{{ def send_frame(self, now = None):
+   def send_frame(self, now = None):
+      # Send each universe that changed since the last frame, plus any that are due
+      # a keep-alive. Returns the number of datagrams sent.
+      if now is None:
+         now = time.monotonic()
+
+      sent = 0
+
+      for universe in self.universes:
+         last_sent = self.__last_sent[universe]
+
+         if universe not in self.__dirty and last_sent is not None and (now - last_sent) < self.keep_alive_interval:
+            continue
+
+         self.__sequence[universe] = self._next_sequence(self.__sequence[universe])
+
+         packet = self.__packets[universe]
+         packet[self.SEQUENCE_OFFSET] = self.__sequence[universe]
+
+         try:
+            self.__socket.sendto(packet, self.__destinations[universe])
+         except OSError as e:
+            # A dropped datagram shouldn't take down the display thread
+            logging.debug("Unable to send universe %d: %s", universe, e)
+            continue
+         # except OSError as e:
+
+         self.__last_sent[universe] = now
+         sent += 1
+      # for universe in self.universes:
+
+      self.__dirty.clear()
+
+      if sent:
+         self.packets_sent += sent
+         self.frames_sent  += 1
+
+      return sent
+   # def send_frame(self, now = None):
+
+
+   # }}}
+   # {{{ def blackout(self):
+   def blackout(self):
+      for universe in self.universes:
+         data = self.__data[universe]
+         data[:] = bytes(len(data))
+         self.__dirty.add(universe)
+      # for universe in self.universes:
+
+      self.send_frame()
+   # def blackout(self):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      self.__socket.close()
+   # def close(self):
+
+
+   # }}}
+
+
+   # Protocol methods, overridden by each subclass
+   # {{{ def _build_packet(self, universe):
+   def _build_packet(self, universe):
+      raise NotImplementedError()
+   # def _build_packet(self, universe):
+
+
+   # }}}
+   # {{{ def _get_destination_host(self, universe):
+   def _get_destination_host(self, universe):
+      return self.host
+   # def _get_destination_host(self, universe):
+
+
+   # }}}
+   # {{{ def _next_sequence(self, sequence):
+   def _next_sequence(self, sequence):
+      return (sequence + 1) & 0xff
+   # def _next_sequence(self, sequence):
+
+
+   # }}}
+# class NetworkOutput:
+
+
+# }}}
+# {{{ class ArtNetOutput(NetworkOutput):
+class ArtNetOutput(NetworkOutput):
+   # ArtDmx packets: http://art-net.org.uk/
+   DEFAULT_PORT = ARTNET_PORT
+
+   HEADER          = b'Art-Net\x00'
+   OPCODE_DMX      = 0x5000
+   PROTOCOL_VER    = 14
+
+   SEQUENCE_OFFSET = 12
+   DATA_OFFSET     = 18
+
+
+   # {{{ def __init__(self, universes, host = '255.255.255.255', port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE):
+   def __init__(self, universes, host = '255.255.255.255', port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE):
+      # ArtDmx payloads must have an even length
+      channels_per_universe += (channels_per_universe % 2)
+
+      NetworkOutput.__init__(self, universes, host, port, keep_alive_interval, channels_per_universe)
+   # def __init__(self, universes, host = '255.255.255.255', port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE):
+
+
+   # }}}
+   # {{{ def _build_packet(self, universe):
+   def _build_packet(self, universe):
+      packet = bytearray(self.DATA_OFFSET + self.channels_per_universe)
+
+      struct.pack_into('<8sH', packet, 0, self.HEADER, self.OPCODE_DMX)
+      struct.pack_into('>H', packet, 10, self.PROTOCOL_VER)
+
+      # Sequence (12) and physical port (13) stay zero until sent; the 15-bit
+      # port-address is split into SubUni (low byte) and Net (high 7 bits)
+      packet[14] = universe & 0xff
+      packet[15] = (universe >> 8) & 0x7f
+
+      struct.pack_into('>H', packet, 16, self.channels_per_universe)
+
+      return packet
+   # def _build_packet(self, universe):
+
+
+   # }}}
+   # {{{ def _next_sequence(self, sequence):
+   def _next_sequence(self, sequence):
+      # Zero means "sequencing disabled" in Art-Net, so wrap from 255 to 1
+      return (sequence % 255) + 1
+   # def _next_sequence(self, sequence):
+
+
+   # }}}
+# class ArtNetOutput(NetworkOutput):
+
+
+# }}}
+# {{{ class SacnOutput(NetworkOutput):
+class SacnOutput(NetworkOutput):
+   # E1.31 (Streaming ACN) data packets: ANSI E1.31-2016
+   DEFAULT_PORT = SACN_PORT
+
+   ACN_PACKET_IDENTIFIER = b'ASC-E1.17\x00\x00\x00'
+   VECTOR_ROOT_E131_DATA = 0x00000004
+   VECTOR_E131_DATA      = 0x00000002
+   VECTOR_DMP_SET        = 0x02
+
+   SEQUENCE_OFFSET = 111
+   DATA_OFFSET     = 126
+
+
+   # {{{ def __init__(self, universes, host = None, port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE, source_name = 'acrylic-guitar', priority = 100):
+   def __init__(self, universes, host = None, port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE, source_name = 'acrylic-guitar', priority = 100):
+      self.source_name = source_name
+      self.priority    = priority
+      self.cid         = uuid.uuid4().bytes
+
+      for universe in universes:
+         if universe < 1 or universe > 63999:
+            raise RuntimeError("Invalid sACN universe: %d" % universe)
+      # for universe in universes:
+
+      NetworkOutput.__init__(self, universes, host, port, keep_alive_interval, channels_per_universe)
+   # def __init__(self, universes, host = None, port = None, keep_alive_interval = 1.0, channels_per_universe = DMX_UNIVERSE_SIZE, source_name = 'acrylic-guitar', priority = 100):
+
+
+   # }}}
+   # {{{ def _build_packet(self, universe):
+   def _build_packet(self, universe):
+      length = self.DATA_OFFSET + self.channels_per_universe
+      packet = bytearray(length)
+
+      # Root layer
+      struct.pack_into('>HH12sHI16s', packet, 0,
+         0x0010, 0x0000, self.ACN_PACKET_IDENTIFIER,
+         0x7000 | (length - 16), self.VECTOR_ROOT_E131_DATA, self.cid
+      )
+
+      # Framing layer (the sequence number at 111 is filled in as we send)
+      struct.pack_into('>HI64sBHBBH', packet, 38,
+         0x7000 | (length - 38), self.VECTOR_E131_DATA,
+         self.source_name.encode('utf-8')[:63], self.priority, 0, 0, 0, universe
+      )
+
+      # DMP layer, with a zero start code ahead of the channel data
+      struct.pack_into('>HBBHHHB', packet, 115,
+         0x7000 | (length - 115), self.VECTOR_DMP_SET, 0xa1,
+         0x0000, 0x0001, self.channels_per_universe + 1, 0x00
+      )
+
+      return packet
+   # def _build_packet(self, universe):
+
+
+   # }}}
+   # {{{ def _get_destination_host(self, universe):
+   def _get_destination_host(self, universe):
+      # With no host configured, use the universe's standard multicast group
+      if self.host:
+         return self.host
+
+      return '239.255.%d.%d' % ((universe >> 8) & 0xff, universe & 0xff)
+   # def _get_destination_host(self, universe):
+
+
+   # }}}
+# class SacnOutput(NetworkOutput):
+
+
+# }}}
+
+# {{{ def create_network_output(protocol, universes, host = None, port = None, keep_alive_interval = 1.0):
+def create_network_output(protocol, universes, host = None, port = None, keep_alive_interval = 1.0):
+   if protocol == 'artnet':
+      return ArtNetOutput(universes, host if host else '255.255.255.255', port, keep_alive_interval)
+   elif protocol == 'sacn':
+      return SacnOutput(universes, host, port, keep_alive_interval)
+   else:
+      raise RuntimeError("Unknown network output protocol: '%s'" % protocol)
+# def create_network_output(protocol, universes, host = None, port = None, keep_alive_interval = 1.0):
+
+
+# }}}
@@ -0,0 +1,201 @@
+#!/usr/bin/python
+
+
+import math
+import threading
+
+from acrylic_guitar import fixed_point
+
+
+# Settings the fixed-point path reads as integer fractions of fixed_point.SCALE_ONE,
+# and the attribute each one's integer is kept in next to the setting
+FIXED_POINT_SCALES = {
+   'DISPLAY_MANAGER__BRIGHTNESS': 'brightness_fixed',
+}
+
+
+
+# {{{ class Parameter:
+class Parameter:
+   # A setting driven by a MIDI CC: where it is, and where the CC last put it
+   __slots__ = ('name', 'fixed_name', 'value', 'target', 'tolerance')
+
+
+   # {{{ def __init__(self, name, value, tolerance):
+   def __init__(self, name, value, tolerance):
+      self.name       = name
+      self.fixed_name = FIXED_POINT_SCALES.get(name)
+      self.value      = float(value)
+      self.target     = float(value)
+      self.tolerance  = tolerance
+   # def __init__(self, name, value, tolerance):
+
+
+   # }}}
+# class Parameter:
+
+
+# }}}
+# {{{ class ParameterBus:
+class ParameterBus:
+   # Lets knobs and wheels adjust the guitar's settings live. guitar.CC_PARAMETERS
+   # maps CC numbers to (setting, value at 0, value at 127). MIDI readers only store
+   # each CC's latest value as its parameter's target, however many arrive; once a
+   # frame, the render loop moves each parameter towards its target with one-pole
+   # smoothing and sets it on the guitar. Modes keep reading settings as attributes,
+   # with no locking, and a burst of CCs costs one update per frame. Settings in
+   # FIXED_POINT_SCALES also get their integer scale set alongside, so the fixed-point
+   # path never converts them per frame.
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      self.guitar = guitar
+
+      # Bumped by every CC that lands on a parameter
+      self.version = 0
+
+      # Parameters that have had a CC, in the order they first did
+      self.parameters = []
+      self.__by_name  = {}
+      self.__add_lock = threading.Lock()
+
+      self.__seen_version = 0
+      self.__settling     = False
+      self.__last_update  = 0.0
+
+      self.update_fixed_scales()
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def set_cc(self, controller, value):
+   def set_cc(self, controller, value):
+      # Called by the MIDI readers. Returns whether the CC is mapped to a parameter.
+      mapping = self.guitar.CC_PARAMETERS.get(controller)
+      if mapping is None:
+         return False
+
+      name, low, high = mapping
+
+      parameter = self.__by_name.get(name)
+      if parameter is None:
+         parameter = self.__add_parameter(name, low, high)
+
+      parameter.target = low + ((high - low) * (value / 127.0))
+      self.version    += 1
+
+      # Modes sitting on a color sleep until something wakes them
+      self.guitar.wake_event.set()
+
+      return True
+   # def set_cc(self, controller, value):
+
+
+   # }}}
+   # {{{ def is_pending(self):
+   def is_pending(self):
+      # Whether a CC has come in since the last update()
+      return self.version != self.__seen_version
+   # def is_pending(self):
+
+
+   # }}}
+   # {{{ def is_settling(self):
+   def is_settling(self):
+      # Whether any setting is still gliding towards its CC, and needs an update() every frame
+      return self.__settling
+   # def is_settling(self):
+
+
+   # }}}
+   # {{{ def update(self, now):
+   def update(self, now):
+      # Called by the render loop once a frame, with the time in seconds. Returns
+      # whether any setting changed.
+      if self.version == self.__seen_version and not self.__settling:
+         return False
+
+      self.__seen_version = self.version
+
+      # Coming from rest, start moving on the next frame rather than jump the whole gap
+      if not self.__settling:
+         self.__last_update = now
+
+      elapsed            = now - self.__last_update
+      self.__last_update = now
+
+      smoothing_time = self.guitar.CC_PARAMETERS__SMOOTHING_TIME
+      step           = (1.0 - math.exp(-elapsed / smoothing_time)) if smoothing_time > 0 else 1.0
+
+      guitar   = self.guitar
+      changed  = False
+      settling = False
+
+      for parameter in self.parameters:
+         gap = parameter.target - parameter.value
+         if gap == 0.0:
+            continue
+
+         if abs(gap) <= parameter.tolerance:
+            parameter.value = parameter.target
+         else:
+            parameter.value += gap * step
+            settling         = True
+         # else:
+
+         setattr(guitar, parameter.name, parameter.value)
+         if parameter.fixed_name:
+            setattr(guitar, parameter.fixed_name, get_fixed_scale(parameter.value))
+
+         changed = True
+      # for parameter in self.parameters:
+
+      self.__settling = settling
+
+      return changed
+   # def update(self, now):
+
+
+   # }}}
+   # {{{ def update_fixed_scales(self):
+   def update_fixed_scales(self):
+      # Work out the integer scales from the settings as they stand, e.g. once they've
+      # been configured. CCs keep them up to date after that.
+      guitar = self.guitar
+
+      for name, fixed_name in FIXED_POINT_SCALES.items():
+         setattr(guitar, fixed_name, get_fixed_scale(getattr(guitar, name)))
+   # def update_fixed_scales(self):
+
+
+   # }}}
+   # {{{ def __add_parameter(self, name, low, high):
+   def __add_parameter(self, name, low, high):
+      # Start from the setting's current value, so the first CC glides from there
+      with self.__add_lock:
+         if name not in self.__by_name:
+            parameter = Parameter(name, getattr(self.guitar, name), abs(high - low) / 1000.0)
+
+            self.__by_name[name] = parameter
+            self.parameters.append(parameter)
+         # if name not in self.__by_name:
+
+         return self.__by_name[name]
+      # with self.__add_lock:
+   # def __add_parameter(self, name, low, high):
+
+
+   # }}}
+# class ParameterBus:
+
+
+# }}}
+# {{{ def get_fixed_scale(value):
+def get_fixed_scale(value):
+   # A scale (0.0-1.0) as an integer fraction of fixed_point.SCALE_ONE
+   return int((value * fixed_point.SCALE_ONE) + 0.5)
+# def get_fixed_scale(value):
+
+
+# }}}
@@ -0,0 +1,181 @@
+#!/usr/bin/python
+
+
+import array
+import random
+import logging
+import threading
+
+
+
+# How many picks a color sequence holds before it starts over. A power of two, so
+# the cursor wraps with a mask.
+SEQUENCE_LENGTH = 4096
+
+
+
+# {{{ class ColorSequence:
+class ColorSequence:
+   # A random order to go through a palette in, worked out up front: one palette index
+   # a byte, with no color following itself, including when the sequence wraps. Each
+   # pick is an index into the array and one into the palette.
+
+
+   # {{{ def __init__(self, palette, rng, length = SEQUENCE_LENGTH):
+   def __init__(self, palette, rng, length = SEQUENCE_LENGTH):
+      if not palette:
+         raise RuntimeError("A color sequence needs at least one color")
+      if len(palette) > 256:
+         raise RuntimeError("Too many colors for a color sequence: %d" % len(palette))
+      if length & (length - 1):
+         raise RuntimeError("Color sequence length must be a power of two: %d" % length)
+
+      self.palette = tuple(palette)
+      self.indexes = array.array('B', get_no_repeat_indexes(len(palette), length, rng))
+
+      self.__mask   = length - 1
+      self.__cursor = -1
+   # def __init__(self, palette, rng, length = SEQUENCE_LENGTH):
+
+
+   # }}}
+   # {{{ def next(self, avoid = None):
+   def next(self, avoid = None):
+      # The next color. avoid skips one more if it's that, e.g. the color already
+      # showing when a mode starts; the one after is always different.
+      self.__cursor = (self.__cursor + 1) & self.__mask
+      color = self.palette[self.indexes[self.__cursor]]
+
+      if color == avoid and len(self.palette) > 1:
+         self.__cursor = (self.__cursor + 1) & self.__mask
+         color = self.palette[self.indexes[self.__cursor]]
+      # if color == avoid and len(self.palette) > 1:
+
+      return color
+   # def next(self, avoid = None):
+
+
+   # }}}
+# class ColorSequence:
+
+
+# }}}
+# {{{ class PatternGenerator:
+class PatternGenerator:
+   # Hands the random modes their randomness: a separate random.Random stream per
+   # name, each seeded from PATTERN_SEED and its name, so a mode's picks don't depend
+   # on what other modes have drawn, and the same seed gives the same run. With no
+   # seed, one is picked on first use and logged, so a run can be repeated.
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      self.guitar = guitar
+      self.seed   = None
+
+      self.__streams   = {}
+      self.__sequences = {}
+      self.__lock      = threading.Lock()
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def get_rng(self, name):
+   def get_rng(self, name):
+      with self.__lock:
+         rng = self.__streams.get(name)
+
+         if rng is None:
+            rng = random.Random('%d:%s' % (self.__get_seed(), name))
+            self.__streams[name] = rng
+         # if rng is None:
+
+         return rng
+      # with self.__lock:
+   # def get_rng(self, name):
+
+
+   # }}}
+   # {{{ def get_color_sequence(self, name, palette):
+   def get_color_sequence(self, name, palette):
+      # The named sequence through palette. Modes that stop and start again carry on
+      # where they left off, rather than repeat the same colors.
+      key = (name, tuple(palette))
+
+      sequence = self.__sequences.get(key)
+      if sequence is None:
+         sequence = ColorSequence(palette, self.get_rng('%s:%r' % key))
+
+         with self.__lock:
+            sequence = self.__sequences.setdefault(key, sequence)
+      # if sequence is None:
+
+      return sequence
+   # def get_color_sequence(self, name, palette):
+
+
+   # }}}
+   # {{{ def reset(self):
+   def reset(self):
+      # Start every stream and sequence over, from PATTERN_SEED as it is now
+      with self.__lock:
+         self.seed = None
+         self.__streams.clear()
+         self.__sequences.clear()
+      # with self.__lock:
+   # def reset(self):
+
+
+   # }}}
+   # {{{ def __get_seed(self):
+   def __get_seed(self):
+      # Call with the lock held
+      if self.seed is None:
+         self.seed = self.guitar.PATTERN_SEED
+
+         if self.seed is None:
+            self.seed = random.SystemRandom().randrange(1 << 32)
+            logging.debug("Random pattern seed is %d; set PATTERN_SEED (--seed) to repeat this run", self.seed)
+         # if self.seed is None:
+      # if self.seed is None:
+
+      return self.seed
+   # def __get_seed(self):
+
+
+   # }}}
+# class PatternGenerator:
+
+
+# }}}
+# {{{ def get_no_repeat_indexes(count, length, rng):
+def get_no_repeat_indexes(count, length, rng):
+   # length indexes below count, none the same as the one before, nor the last the
+   # same as the first. Draws from the count - 1 others rather than retrying.
+   if count == 1:
+      return [0] * length
+
+   indexes  = [rng.randrange(count)]
+   previous = indexes[0]
+
+   for position in range(1, length):
+      index = rng.randrange(count - 1)
+      if index >= previous:
+         index += 1
+
+      indexes.append(index)
+      previous = index
+   # for position in range(1, length):
+
+   # Wrapping round has to change color too. With two colors they just alternate,
+   # and an even length already ends on the other one.
+   if indexes[-1] == indexes[0]:
+      others = [index for index in range(count) if index != indexes[0] and index != indexes[-2]]
+      indexes[-1] = rng.choice(others)
+   # if indexes[-1] == indexes[0]:
+
+   return indexes
+# def get_no_repeat_indexes(count, length, rng):
+
+
+# }}}
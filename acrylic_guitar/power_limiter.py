@@ -0,0 +1,131 @@
+#!/usr/bin/python
+
+
+import math
+
+
+
+# Pixel buffers at least this long are summed with numpy, when it's installed
+NUMPY_MIN_PIXELS = 256
+
+_numpy = None
+
+
+
+# {{{ class PowerLimiter:
+class PowerLimiter:
+   # Keeps the LEDs within the supply's current. Each frame's current is estimated
+   # from its duty cycles: every LED draws POWER_LIMITER__CHANNEL_CURRENT per channel
+   # at full duty, in proportion below that. Frames that would go over
+   # POWER_LIMITER__BUDGET are scaled down to fit straight away; once they fit again,
+   # the scale eases back up over POWER_LIMITER__RELEASE_TIME, so the brightness
+   # doesn't pump as bright and dark frames alternate.
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      self.guitar = guitar
+
+      # What frames are being scaled by, and whether they're being limited
+      self.scale    = 1.0
+      self.limiting = False
+
+      self.__last_update = None
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def get_current(self, red, green, blue, pixels = 1):
+   def get_current(self, red, green, blue, pixels = 1):
+      # Amps drawn by pixels LEDs showing one color, in duty cycle percentages
+      red_current, green_current, blue_current = self.guitar.POWER_LIMITER__CHANNEL_CURRENT
+
+      return pixels * ((red * red_current) + (green * green_current) + (blue * blue_current)) / 100.0
+   # def get_current(self, red, green, blue, pixels = 1):
+
+
+   # }}}
+   # {{{ def get_buffer_current(self, buffer, pixels = 1):
+   def get_buffer_current(self, buffer, pixels = 1):
+      # Amps drawn by a buffer of interleaved red, green and blue percentages, one
+      # triple per LED (or per group of pixels LEDs). Sums each channel in one pass
+      # with slicing, or with numpy for long buffers.
+      red_current, green_current, blue_current = self.guitar.POWER_LIMITER__CHANNEL_CURRENT
+
+      if len(buffer) >= NUMPY_MIN_PIXELS * 3 and get_numpy():
+         channels = _numpy.asarray(buffer, dtype=_numpy.float64).reshape(-1, 3).sum(axis=0)
+
+         return pixels * float(channels.dot((red_current, green_current, blue_current))) / 100.0
+      # if len(buffer) >= NUMPY_MIN_PIXELS * 3 and get_numpy():
+
+      return pixels * ((sum(buffer[0::3]) * red_current) + (sum(buffer[1::3]) * green_current) + (sum(buffer[2::3]) * blue_current)) / 100.0
+   # def get_buffer_current(self, buffer, pixels = 1):
+
+
+   # }}}
+   # {{{ def limit(self, current, now):
+   def limit(self, current, now):
+      # Returns what to scale a frame that would draw current amps by, at time now (sec)
+      guitar = self.guitar
+      budget = guitar.POWER_LIMITER__BUDGET
+
+      guitar.metric_power_current.set(current)
+
+      target = (budget / current) if current > budget else 1.0
+
+      elapsed            = (now - self.__last_update) if self.__last_update is not None else 0.0
+      self.__last_update = now
+
+      if target <= self.scale:
+         # Over budget: dim right away
+         scale = target
+      else:
+         release_time = guitar.POWER_LIMITER__RELEASE_TIME
+         step         = (1.0 - math.exp(-elapsed / release_time)) if release_time > 0 else 1.0
+
+         scale = self.scale + ((target - self.scale) * step)
+
+         # Close enough to settle
+         if target - scale < 0.001:
+            scale = target
+      # else:
+
+      if scale != self.scale:
+         limiting = scale < 1.0
+
+         if limiting and not self.limiting:
+            guitar.metric_power_limiter_activations.inc()
+
+         self.scale    = scale
+         self.limiting = limiting
+
+         guitar.metric_power_limiter_scale.set(scale)
+      # if scale != self.scale:
+
+      return scale
+   # def limit(self, current, now):
+
+
+   # }}}
+# class PowerLimiter:
+
+
+# }}}
+# {{{ def get_numpy():
+def get_numpy():
+   # numpy, or None when it isn't installed. Only imported the first time a long buffer comes along.
+   global _numpy
+
+   if _numpy is None:
+      try:
+         import numpy
+         _numpy = numpy
+      except ImportError:
+         _numpy = False
+   # if _numpy is None:
+
+   return _numpy
+# def get_numpy():
+
+
+# }}}
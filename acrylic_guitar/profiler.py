@@ -0,0 +1,135 @@
+#!/usr/bin/python
+
+
+import os
+import array
+import logging
+import threading
+
+
+
+# Stages we time, as recorded in the ring. Names are what the trace viewer shows.
+STAGE_MIDI_DECODE  = 0
+STAGE_LOCK_WAIT    = 1
+STAGE_COLOR_MATH   = 2
+STAGE_OUTPUT_WRITE = 3
+STAGE_FRAME_SLEEP  = 4
+
+STAGE_NAMES = ['midi_decode', 'lock_wait', 'color_math', 'output_write', 'frame_sleep']
+
+
+
+# {{{ class Profiler:
+class Profiler:
+   # Records perf_counter_ns spans for each hot-path stage into a preallocated
+   # ring, overwriting the oldest once full, and dumps them as Chrome trace JSON
+   # (load it in about://tracing or Perfetto).
+   #
+   # Call sites guard with "if profiler.enabled:" before taking timestamps, so
+   # turning profiling off costs one attribute check per span.
+
+
+   # {{{ def __init__(self, capacity = 65536, enabled = False):
+   def __init__(self, capacity = 65536, enabled = False):
+      self.capacity = capacity
+      self.enabled  = enabled
+
+      # One slot per span, in parallel arrays so nothing is allocated per sample
+      self.__starts  = array.array('q', [0]) * capacity
+      self.__ends    = array.array('q', [0]) * capacity
+      self.__stages  = array.array('B', [0]) * capacity
+      self.__threads = array.array('Q', [0]) * capacity
+
+      # Total spans ever recorded; the next slot is this modulo capacity
+      self.__count = 0
+   # def __init__(self, capacity = 65536, enabled = False):
+
+
+   # }}}
+   # {{{ def record(self, stage, start_ns, end_ns):
+   def record(self, stage, start_ns, end_ns):
+      # Spans from different threads can race for a slot; losing one to another
+      # is fine for a profile, and cheaper than a lock
+      index = self.__count % self.capacity
+      self.__count += 1
+
+      self.__starts[index]  = start_ns
+      self.__ends[index]    = end_ns
+      self.__stages[index]  = stage
+      self.__threads[index] = threading.get_ident()
+   # def record(self, stage, start_ns, end_ns):
+
+
+   # }}}
+   # {{{ def toggle(self):
+   def toggle(self):
+      self.enabled = not self.enabled
+      logging.debug("Profiling %s", 'enabled' if self.enabled else 'disabled')
+   # def toggle(self):
+
+
+   # }}}
+   # {{{ def clear(self):
+   def clear(self):
+      self.__count = 0
+   # def clear(self):
+
+
+   # }}}
+   # {{{ def get_chrome_trace(self):
+   def get_chrome_trace(self):
+      # Oldest span first, as complete ('X') events in microseconds
+      count  = min(self.__count, self.capacity)
+      first  = self.__count - count
+      pid    = os.getpid()
+      events = []
+
+      thread_names = {}
+      for thread in threading.enumerate():
+         thread_names[thread.ident] = thread.name
+
+      for position in range(first, first + count):
+         index = position % self.capacity
+         tid   = self.__threads[index]
+
+         events.append({
+            'name': STAGE_NAMES[self.__stages[index]],
+            'ph'  : 'X',
+            'ts'  : self.__starts[index] / 1000.0,
+            'dur' : (self.__ends[index] - self.__starts[index]) / 1000.0,
+            'pid' : pid,
+            'tid' : tid,
+         })
+      # for position in range(first, first + count):
+
+      for tid in set([event['tid'] for event in events]):
+         events.append({
+            'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid,
+            'args': {'name': thread_names.get(tid, str(tid))},
+         })
+      # for tid in set([event['tid'] for event in events]):
+
+      return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+   # def get_chrome_trace(self):
+
+
+   # }}}
+   # {{{ def dump(self, path):
+   def dump(self, path):
+      import json
+
+      trace = self.get_chrome_trace()
+
+      with open(path, 'w') as trace_file:
+         json.dump(trace, trace_file)
+
+      logging.debug("Wrote %d profile spans to %s", len(trace['traceEvents']), path)
+      return path
+   # def dump(self, path):
+
+
+   # }}}
+# class Profiler:
+
+
+# }}}
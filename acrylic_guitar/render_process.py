@@ -0,0 +1,290 @@
+#!/usr/bin/python
+
+
+import time
+import struct
+import logging
+import threading
+import multiprocessing
+
+from multiprocessing import shared_memory
+
+
+
+# Input block, written by the MIDI process: sequence, mode changes, note changes,
+# display mode, lowest note (-1 for none), lowest key (-1 for none), max velocity,
+# then one velocity per key
+INPUT_FORMAT = struct.Struct('<IIIBbhB')
+INPUT_KEYS   = 128
+
+# Output block, written by the renderer: sequence, frame count, red, green, blue
+OUTPUT_FORMAT = struct.Struct('<IIddd')
+
+INPUT_OFFSET       = 0
+INPUT_KEYS_OFFSET  = INPUT_OFFSET + INPUT_FORMAT.size
+OUTPUT_OFFSET      = 64 * ((INPUT_KEYS_OFFSET + INPUT_KEYS + 63) // 64)
+SHARED_MEMORY_SIZE = OUTPUT_OFFSET + OUTPUT_FORMAT.size
+
+SEQUENCE_FORMAT = struct.Struct('<I')
+
+
+
+# {{{ class RenderLink:
+class RenderLink:
+   # The shared memory between the MIDI/output process and the render process.
+   # Each block has a single writer and is guarded by a seqlock: the writer makes
+   # the sequence odd, writes, then makes it even again, and readers retry if the
+   # sequence was odd or changed under them. Nothing is pickled or locked per frame.
+
+
+   # {{{ def __init__(self, name = None):
+   def __init__(self, name = None):
+      # With no name, create a new block; otherwise attach to the named one
+      self.owner = name is None
+
+      if self.owner:
+         self.shared_memory = shared_memory.SharedMemory(create=True, size=SHARED_MEMORY_SIZE)
+         self.shared_memory.buf[:SHARED_MEMORY_SIZE] = bytes(SHARED_MEMORY_SIZE)
+      else:
+         self.shared_memory = shared_memory.SharedMemory(name=name)
+      # else:
+
+      self.name = self.shared_memory.name
+      self.buf  = self.shared_memory.buf
+
+      # Writer-side counters
+      self.__input_sequence  = 0
+      self.__output_sequence = 0
+      self.__mode_changes    = 0
+      self.__note_changes    = 0
+      self.__frames          = 0
+   # def __init__(self, name = None):
+
+
+   # }}}
+   # {{{ def publish_input(self, guitar, mode_changed = False, notes_changed = False):
+   def publish_input(self, guitar, mode_changed = False, notes_changed = False):
+      # Call with guitar.midi_data_lock held, which keeps this block single-writer
+      if mode_changed:
+         self.__mode_changes += 1
+      if notes_changed:
+         self.__note_changes += 1
+
+      buf = self.buf
+
+      self.__input_sequence += 1
+      SEQUENCE_FORMAT.pack_into(buf, INPUT_OFFSET, self.__input_sequence & 0xffffffff)
+
+      INPUT_FORMAT.pack_into(buf, INPUT_OFFSET,
+         self.__input_sequence & 0xffffffff, self.__mode_changes, self.__note_changes,
+         guitar.display_mode,
+         -1 if guitar.lowest_note_on is None else guitar.lowest_note_on,
+         -1 if guitar.lowest_key_on  is None else guitar.lowest_key_on,
+         guitar.max_key_velocity,
+      )
+      buf[INPUT_KEYS_OFFSET:INPUT_KEYS_OFFSET + len(guitar.keys)] = bytes(guitar.keys)
+
+      self.__input_sequence += 1
+      SEQUENCE_FORMAT.pack_into(buf, INPUT_OFFSET, self.__input_sequence & 0xffffffff)
+   # def publish_input(self, guitar, mode_changed = False, notes_changed = False):
+
+
+   # }}}
+   # {{{ def read_input(self, last_sequence):
+   def read_input(self, last_sequence):
+      # Returns (sequence, fields, keys), or None if nothing changed since last_sequence
+      buf = self.buf
+
+      while True:
+         sequence = SEQUENCE_FORMAT.unpack_from(buf, INPUT_OFFSET)[0]
+         if sequence == last_sequence:
+            return None
+
+         if sequence & 1:
+            continue
+
+         fields = INPUT_FORMAT.unpack_from(buf, INPUT_OFFSET)
+         keys   = bytes(buf[INPUT_KEYS_OFFSET:INPUT_KEYS_OFFSET + INPUT_KEYS])
+
+         if SEQUENCE_FORMAT.unpack_from(buf, INPUT_OFFSET)[0] == sequence:
+            return (sequence, fields, keys)
+      # while True:
+   # def read_input(self, last_sequence):
+
+
+   # }}}
+   # {{{ def publish_frame(self, red, green, blue):
+   def publish_frame(self, red, green, blue):
+      buf = self.buf
+
+      self.__frames          += 1
+      self.__output_sequence += 1
+      SEQUENCE_FORMAT.pack_into(buf, OUTPUT_OFFSET, self.__output_sequence & 0xffffffff)
+
+      OUTPUT_FORMAT.pack_into(buf, OUTPUT_OFFSET, self.__output_sequence & 0xffffffff, self.__frames & 0xffffffff, red, green, blue)
+
+      self.__output_sequence += 1
+      SEQUENCE_FORMAT.pack_into(buf, OUTPUT_OFFSET, self.__output_sequence & 0xffffffff)
+   # def publish_frame(self, red, green, blue):
+
+
+   # }}}
+   # {{{ def read_frame(self, last_sequence):
+   def read_frame(self, last_sequence):
+      # Returns (sequence, frame, red, green, blue), or None if there's no new frame
+      buf = self.buf
+
+      while True:
+         sequence = SEQUENCE_FORMAT.unpack_from(buf, OUTPUT_OFFSET)[0]
+         if sequence == last_sequence:
+            return None
+
+         if sequence & 1:
+            continue
+
+         frame = OUTPUT_FORMAT.unpack_from(buf, OUTPUT_OFFSET)
+
+         if SEQUENCE_FORMAT.unpack_from(buf, OUTPUT_OFFSET)[0] == sequence:
+            return frame
+      # while True:
+   # def read_frame(self, last_sequence):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      self.buf = None
+      self.shared_memory.close()
+
+      if self.owner:
+         self.shared_memory.unlink()
+   # def close(self):
+
+
+   # }}}
+# class RenderLink:
+
+
+# }}}
+
+# {{{ def get_render_config(guitar):
+def get_render_config(guitar):
+   # The settings the renderer needs, taken once at startup: all the upper-case
+   # attributes, plus the mode and color we're starting with
+   config = dict([(name, value) for name, value in vars(guitar).items() if name.isupper()])
+
+   config['display_mode']  = guitar.display_mode
+   config['current_color'] = guitar.current_color
+
+   config['log_level'] = logging.getLogger().getEffectiveLevel()
+
+   return config
+# def get_render_config(guitar):
+
+
+# }}}
+# {{{ def start_render_process(guitar, link):
+def start_render_process(guitar, link):
+   # Spawn rather than fork: the parent already has threads running. Returns the
+   # process and the event that asks it to stop.
+   context    = multiprocessing.get_context('spawn')
+   stop_event = context.Event()
+
+   process = context.Process(name='renderer', target=render_main, args=(get_render_config(guitar), link.name, stop_event))
+   process.daemon = True
+   process.start()
+
+   return (process, stop_event)
+# def start_render_process(guitar, link):
+
+
+# }}}
+# {{{ def render_main(config, link_name, stop_event):
+def render_main(config, link_name, stop_event):
+   # Runs in the render process: the mode engine and color maths, fed from the
+   # input block and writing frames to the output block
+   from acrylic_guitar import frame_clock
+   from acrylic_guitar.guitar import AcrylicGuitar
+
+   config = dict(config)
+   logging.basicConfig(level=config.pop('log_level'), format='(renderer %(threadName)-15s) %(message)s',)
+
+   link = RenderLink(link_name)
+
+   ag = AcrylicGuitar()
+   for name, value in config.items():
+      setattr(ag, name, value)
+
+   ag.OUTPUT_BACKENDS = ['shared_memory']
+   ag.render_link     = link
+
+   # The parent applies brightness and the power limit as it outputs our frames
+   ag.DISPLAY_MANAGER__BRIGHTNESS = 1.0
+   ag.POWER_LIMITER__BUDGET       = None
+
+   display_stop_event = frame_clock.WakeEvent(ag.wake_event)
+   display_manager    = threading.Thread(name='display_manager', target=ag.display_manager, args=(display_stop_event,))
+   display_manager.daemon = True
+   display_manager.start()
+
+   try:
+      follow_render_input(ag, link, stop_event)
+   except KeyboardInterrupt:
+      # The parent shares our Ctrl-C and will stop us properly
+      stop_event.wait()
+   finally:
+      display_stop_event.set()
+      ag.display_mode_change_event.set()
+      display_manager.join()
+
+      link.close()
+   # finally:
+# def render_main(config, link_name, stop_event):
+
+
+# }}}
+# {{{ def follow_render_input(ag, link, stop_event):
+def follow_render_input(ag, link, stop_event):
+   # Mirror the MIDI process's input state into the renderer's guitar, raising the
+   # same events its own MIDI readers would have
+   last_sequence     = 0
+   last_mode_changes = 0
+   last_note_changes = 0
+
+   while not stop_event.is_set():
+      snapshot = link.read_input(last_sequence)
+
+      if snapshot:
+         last_sequence, fields, keys = snapshot
+         sequence, mode_changes, note_changes, display_mode, lowest_note_on, lowest_key_on, max_key_velocity = fields
+
+         if note_changes != last_note_changes:
+            last_note_changes = note_changes
+
+            with ag.midi_data_lock:
+               for key in range(0, len(ag.keys)):
+                  ag.keys[key] = keys[key]
+
+               for note in range(0, ag.NUM_NOTES):
+                  ag.notes[note] = any(ag.keys[note::ag.NUM_NOTES])
+
+               ag.update_key_stats()
+            # with ag.midi_data_lock:
+         # if note_changes != last_note_changes:
+
+         if mode_changes != last_mode_changes:
+            last_mode_changes = mode_changes
+
+            with ag.midi_data_lock:
+               ag.display_mode = display_mode
+
+            ag.display_mode_change_event.set()
+         # if mode_changes != last_mode_changes:
+      # if snapshot:
+
+      time.sleep(ag.RENDER_PROCESS__POLL_INTERVAL)
+   # while not stop_event.is_set():
+# def follow_render_input(ag, link, stop_event):
+
+
+# }}}
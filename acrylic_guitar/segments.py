@@ -0,0 +1,79 @@
+#!/usr/bin/python
+
+
+from acrylic_guitar import color_space
+
+
+
+# {{{ class Segment:
+class Segment:
+   # A whole fade, for outputs that can play one on their own timing (DMA-driven PWM,
+   # a microcontroller bridge, a network node) rather than take a write every frame.
+   # Colors are RGB percentages before brightness; times are on the guitar's frame
+   # clock. The color is start_color until start_time, moves along the color space
+   # and easing curve until start_time + duration, then holds at end_color.
+   __slots__ = ('start_color', 'end_color', 'start_time', 'duration', 'color_space', 'easing', 'brightness', 'frame_interval')
+
+
+   # {{{ def __init__(self, start_color, end_color, start_time, duration, color_space = 'rgb', easing = 'linear', brightness = 1.0, frame_interval = 0.01):
+   def __init__(self, start_color, end_color, start_time, duration, color_space = 'rgb', easing = 'linear', brightness = 1.0, frame_interval = 0.01):
+      self.start_color    = tuple(start_color)
+      self.end_color      = tuple(end_color)
+      self.start_time     = start_time
+      self.duration       = duration
+      self.color_space    = color_space
+      self.easing         = easing
+      self.brightness     = brightness
+      self.frame_interval = frame_interval
+   # def __init__(self, start_color, end_color, start_time, duration, color_space = 'rgb', easing = 'linear', brightness = 1.0, frame_interval = 0.01):
+
+
+   # }}}
+   # {{{ def get_path(self, step = None):
+   def get_path(self, step = None):
+      # The fade's colors every step seconds (the frame interval by default), start to end,
+      # for outputs that would rather load a table than interpolate themselves
+      num_frames = max(1, int(round(self.duration / (step if step else self.frame_interval))))
+
+      return color_space.get_fade_path(self.start_color, self.end_color, num_frames, self.color_space, self.easing)
+   # def get_path(self, step = None):
+
+
+   # }}}
+   # {{{ def get_color(self, now):
+   def get_color(self, now):
+      # The color at the given time, before brightness
+      path  = self.get_path()
+      index = int((now - self.start_time) / self.frame_interval)
+
+      return path[min(max(index, 0), len(path) - 1)]
+   # def get_color(self, now):
+
+
+   # }}}
+   # {{{ def get_output_color(self, now):
+   def get_output_color(self, now):
+      # The color to show at the given time, with brightness applied
+      red, green, blue = self.get_color(now)
+      brightness       = self.brightness
+
+      return (red * brightness, green * brightness, blue * brightness)
+   # def get_output_color(self, now):
+
+
+   # }}}
+   # {{{ def with_brightness(self, brightness):
+   def with_brightness(self, brightness):
+      # The same fade on the same timeline at another brightness, to replace this one mid-fade
+      return Segment(
+         self.start_color, self.end_color, self.start_time, self.duration,
+         self.color_space, self.easing, brightness, self.frame_interval
+      )
+   # def with_brightness(self, brightness):
+
+
+   # }}}
+# class Segment:
+
+
+# }}}
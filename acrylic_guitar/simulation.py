@@ -0,0 +1,185 @@
+#!/usr/bin/python
+
+
+import heapq
+
+from acrylic_guitar import frame_clock
+from acrylic_guitar.guitar import MidiMessageType
+
+
+
+# Least a sleep moves simulated time on, so a sleep that rounds to nothing can't
+# leave a wait_until_frame() loop spinning
+MIN_SLEEP = 1e-9
+
+
+
+# {{{ class SimulatedTime:
+class SimulatedTime:
+   # A clock that only moves when something sleeps or waits on it, and then jumps
+   # straight to the time it would have woken. Actions scheduled with at() run as
+   # their time is passed, in time order, and a wait() returns as soon as one sets
+   # its event. Minutes of display modes go by in as long as it takes to work out
+   # their frames, and every run of the same actions gives the same frames. Only
+   # for use from a single thread.
+
+
+   # {{{ def __init__(self, start = 0.0):
+   def __init__(self, start = 0.0):
+      self.now = start
+
+      # (time, order scheduled, callback, args)
+      self.__actions = []
+      self.__order   = 0
+   # def __init__(self, start = 0.0):
+
+
+   # }}}
+   # {{{ def __call__(self):
+   def __call__(self):
+      return self.now
+   # def __call__(self):
+
+
+   # }}}
+   # {{{ def at(self, when, callback, *args):
+   def at(self, when, callback, *args):
+      # Call callback(*args) once simulated time reaches when (sec)
+      self.__order += 1
+      heapq.heappush(self.__actions, (when, self.__order, callback, args))
+   # def at(self, when, callback, *args):
+
+
+   # }}}
+   # {{{ def sleep(self, seconds):
+   def sleep(self, seconds):
+      self.__advance(self.now + max(seconds, MIN_SLEEP), None)
+   # def sleep(self, seconds):
+
+
+   # }}}
+   # {{{ def wait(self, event, timeout):
+   def wait(self, event, timeout):
+      if not event.is_set():
+         self.__advance(self.now + max(timeout, MIN_SLEEP), event)
+
+      return event.is_set()
+   # def wait(self, event, timeout):
+
+
+   # }}}
+   # {{{ def attach(self, frame_clock):
+   def attach(self, frame_clock):
+      # Have a frame_clock.FrameClock tell the time, sleep and wait on this clock
+      frame_clock.time_source    = self
+      frame_clock.sleep          = self.sleep
+      frame_clock.wait_for_event = self.wait
+   # def attach(self, frame_clock):
+
+
+   # }}}
+   # {{{ def __advance(self, target, event):
+   def __advance(self, target, event):
+      # Move on to target, running the actions due on the way, and stopping at the
+      # first that sets event
+      actions = self.__actions
+
+      while actions and actions[0][0] <= target:
+         when, order, callback, args = heapq.heappop(actions)
+
+         self.now = max(self.now, when)
+         callback(*args)
+
+         if event is not None and event.is_set():
+            return
+      # while actions and actions[0][0] <= target:
+
+      self.now = target
+   # def __advance(self, target, event):
+
+
+   # }}}
+# class SimulatedTime:
+
+
+# }}}
+# {{{ class Simulation:
+class Simulation:
+   # Runs a guitar's display modes on simulated time, on the calling thread, with its
+   # frames going to a recording output. Script the MIDI and mode changes with at(),
+   # play_at() and set_mode_at(), then run() for as long as you like and look over
+   # the frames it returns. Random modes are seeded, so runs repeat exactly.
+
+
+   # {{{ def __init__(self, guitar, start = 0.0, seed = 0):
+   def __init__(self, guitar, start = 0.0, seed = 0):
+      self.guitar = guitar
+      self.start  = start
+      self.time   = SimulatedTime(start)
+
+      self.time.attach(guitar.frame_clock)
+
+      guitar.OUTPUT_BACKENDS = ['recorder']
+      if guitar.PATTERN_SEED is None:
+         guitar.PATTERN_SEED = seed
+
+      self.stop_event = frame_clock.WakeEvent(guitar.wake_event)
+   # def __init__(self, guitar, start = 0.0, seed = 0):
+
+
+   # }}}
+   # {{{ def at(self, seconds, callback, *args):
+   def at(self, seconds, callback, *args):
+      # Call callback(*args) seconds into the simulation
+      self.time.at(self.start + seconds, callback, *args)
+   # def at(self, seconds, callback, *args):
+
+
+   # }}}
+   # {{{ def play_at(self, seconds, key, velocity):
+   def play_at(self, seconds, key, velocity):
+      # A note on, or with velocity 0 a note off, as if read from MIDI
+      self.at(seconds, self.guitar.apply_midi_message, [MidiMessageType.note, key, velocity])
+   # def play_at(self, seconds, key, velocity):
+
+
+   # }}}
+   # {{{ def set_mode_at(self, seconds, display_mode):
+   def set_mode_at(self, seconds, display_mode):
+      self.at(seconds, self.guitar.apply_midi_message, [MidiMessageType.program_change, display_mode])
+   # def set_mode_at(self, seconds, display_mode):
+
+
+   # }}}
+   # {{{ def run(self, duration):
+   def run(self, duration):
+      # Run the display modes until duration (sec) into the simulation, and return the
+      # frames written as (frame, red, green, blue)
+      self.stop_event.clear()
+      self.at(duration, self.stop_event.set)
+
+      self.guitar.display_manager(self.stop_event)
+
+      return self.get_frames()
+   # def run(self, duration):
+
+
+   # }}}
+   # {{{ def get_frames(self):
+   def get_frames(self):
+      # The frames written to the recording outputs, one output after another
+      frames = []
+      for output in self.guitar.outputs:
+         if hasattr(output, 'frames'):
+            frames.extend(output.frames)
+      # for output in self.guitar.outputs:
+
+      return frames
+   # def get_frames(self):
+
+
+   # }}}
+# class Simulation:
+
+
+# }}}
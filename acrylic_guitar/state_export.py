@@ -0,0 +1,278 @@
+#!/usr/bin/python
+
+
+import os
+import mmap
+import time
+import struct
+import logging
+
+from acrylic_guitar import fixed_point
+
+
+
+# The state file, written by the guitar: sequence, magic, layout version, whether the
+# guitar's running, display mode, lowest note (-1 for none), lowest key (-1 for none),
+# max velocity, red, green, blue, key state version, frame, frames dropped, frame rate,
+# degrade level, when it was written (time.monotonic()), then a bit per key held
+STATE_FORMAT = struct.Struct('<I4sHBBbhBfffIqQfBd')
+STATE_KEYS   = 128
+
+STATE_MAGIC          = b'AGST'
+STATE_LAYOUT_VERSION = 1
+
+KEYS_OFFSET = STATE_FORMAT.size
+STATE_SIZE  = KEYS_OFFSET + (STATE_KEYS // 8)
+
+SEQUENCE_FORMAT = struct.Struct('<I')
+
+# How many times a reader retries a read torn by the writer before giving up for now
+READ_RETRIES = 1000
+
+FIELDS = (
+   'sequence', 'magic', 'layout_version', 'running', 'display_mode', 'lowest_note_on', 'lowest_key_on', 'max_key_velocity',
+   'red', 'green', 'blue', 'key_state_version', 'frame', 'frames_dropped', 'frame_rate', 'degrade_level', 'updated',
+)
+
+
+
+# {{{ class ShownColor:
+class ShownColor:
+   # Works out the color being shown, before brightness, from outside the render loop.
+   # Fixed-point fades only update current_color_fixed, and segment fades only update
+   # current_color at the end, so whichever of the two changed last is the one showing.
+
+
+   # {{{ def __init__(self, guitar):
+   def __init__(self, guitar):
+      self.guitar = guitar
+
+      self.__color      = (0.0, 0.0, 0.0)
+      self.__last_color = None
+      self.__last_fixed = None
+   # def __init__(self, guitar):
+
+
+   # }}}
+   # {{{ def get(self):
+   def get(self):
+      # Returns (red, green, blue) percentages
+      guitar = self.guitar
+
+      segment = guitar.current_segment
+      if segment is not None:
+         return segment.get_color(guitar.frame_clock.now())
+
+      current_color = guitar.current_color
+      color         = (current_color['red'], current_color['green'], current_color['blue'])
+      fixed_color   = tuple(guitar.current_color_fixed)
+
+      if fixed_color != self.__last_fixed:
+         self.__last_fixed = fixed_color
+         self.__color      = (fixed_point.to_percent(fixed_color[0]), fixed_point.to_percent(fixed_color[1]), fixed_point.to_percent(fixed_color[2]))
+      # if fixed_color != self.__last_fixed:
+
+      if color != self.__last_color:
+         self.__last_color = color
+         self.__color      = color
+      # if color != self.__last_color:
+
+      return self.__color
+   # def get(self):
+
+
+   # }}}
+# class ShownColor:
+
+
+# }}}
+# {{{ class StateExporter:
+class StateExporter:
+   # Publishes what the guitar is doing into a small memory-mapped file, for dashboards
+   # and monitors to read at whatever rate they like. Runs in a thread of its own and
+   # only reads the guitar's attributes, so the MIDI readers and renderers do nothing
+   # extra. The file has a single writer and is guarded by a seqlock, as with the
+   # render process: the sequence is odd while it's being written.
+
+
+   # {{{ def __init__(self, guitar, path, interval):
+   def __init__(self, guitar, path, interval):
+      self.guitar   = guitar
+      self.path     = path
+      self.interval = interval
+
+      # Replace whatever an earlier run left
+      with open(path, 'w+b') as state_file:
+         state_file.write(bytes(STATE_SIZE))
+         state_file.flush()
+
+         self.mmap = mmap.mmap(state_file.fileno(), STATE_SIZE)
+      # with open(path, 'w+b') as state_file:
+
+      self.__sequence = 0
+
+      # The keys only need packing again when they change
+      self.__key_state_version = None
+      self.__keys_held         = bytearray(STATE_KEYS // 8)
+
+      self.shown_color = ShownColor(guitar)
+
+      # Readers can open the file as soon as it exists
+      self.publish()
+   # def __init__(self, guitar, path, interval):
+
+
+   # }}}
+   # {{{ def run(self, stop_event):
+   def run(self, stop_event):
+      logging.debug("Publishing state to %s every %0.3f sec", self.path, self.interval)
+
+      while not stop_event.wait(self.interval):
+         self.publish()
+
+      self.publish(running=False)
+      self.close()
+
+      logging.debug("Asked to stop, returning...")
+   # def run(self, stop_event):
+
+
+   # }}}
+   # {{{ def publish(self, running = True):
+   def publish(self, running = True):
+      guitar = self.guitar
+      buf    = self.mmap
+
+      key_state_version = guitar.key_state_version
+      if key_state_version != self.__key_state_version:
+         self.__key_state_version = key_state_version
+         self.__pack_keys()
+      # if key_state_version != self.__key_state_version:
+
+      red, green, blue = self.shown_color.get()
+
+      lowest_note_on = guitar.lowest_note_on
+      lowest_key_on  = guitar.lowest_key_on
+
+      self.__sequence += 1
+      SEQUENCE_FORMAT.pack_into(buf, 0, self.__sequence & 0xffffffff)
+
+      STATE_FORMAT.pack_into(buf, 0,
+         self.__sequence & 0xffffffff, STATE_MAGIC, STATE_LAYOUT_VERSION, 1 if running else 0,
+         guitar.display_mode,
+         -1 if lowest_note_on is None else lowest_note_on,
+         -1 if lowest_key_on  is None else lowest_key_on,
+         guitar.max_key_velocity,
+         red, green, blue,
+         key_state_version & 0xffffffff,
+         guitar.frame_clock.current_frame(),
+         int(guitar.metric_frames_dropped.value),
+         guitar.metric_frame_rate.value,
+         guitar.frame_rate.degrade_level,
+         time.monotonic(),
+      )
+      buf[KEYS_OFFSET:STATE_SIZE] = self.__keys_held
+
+      self.__sequence += 1
+      SEQUENCE_FORMAT.pack_into(buf, 0, self.__sequence & 0xffffffff)
+   # def publish(self, running = True):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      # The file stays, so readers can see the guitar stopped
+      self.mmap.close()
+   # def close(self):
+
+
+   # }}}
+   # {{{ def __pack_keys(self):
+   def __pack_keys(self):
+      keys_held = self.__keys_held
+
+      for index in range(len(keys_held)):
+         keys_held[index] = 0
+
+      for key, velocity in enumerate(self.guitar.keys[:STATE_KEYS]):
+         if velocity:
+            keys_held[key >> 3] |= (1 << (key & 7))
+      # for key, velocity in enumerate(self.guitar.keys[:STATE_KEYS]):
+   # def __pack_keys(self):
+
+
+   # }}}
+# class StateExporter:
+
+
+# }}}
+# {{{ class StateReader:
+class StateReader:
+   # Reads the state file from another process. Reading never blocks or signals the
+   # guitar; a read that overlaps a write is simply retried.
+
+
+   # {{{ def __init__(self, path):
+   def __init__(self, path):
+      with open(path, 'rb') as state_file:
+         if os.fstat(state_file.fileno()).st_size < STATE_SIZE:
+            raise RuntimeError("Not an acrylic-guitar state file: '%s'" % path)
+
+         self.mmap = mmap.mmap(state_file.fileno(), STATE_SIZE, access=mmap.ACCESS_READ)
+      # with open(path, 'rb') as state_file:
+
+      magic, layout_version = STATE_FORMAT.unpack_from(self.mmap, 0)[1:3]
+
+      if magic != STATE_MAGIC:
+         raise RuntimeError("Not an acrylic-guitar state file: '%s'" % path)
+      if layout_version != STATE_LAYOUT_VERSION:
+         raise RuntimeError("Unsupported state file layout version: %d" % layout_version)
+   # def __init__(self, path):
+
+
+   # }}}
+   # {{{ def read(self, last_sequence = None):
+   def read(self, last_sequence = None):
+      # Returns the state as a dict, with 'keys_held' a list of the keys held, or None if
+      # nothing changed since last_sequence (or the writer kept getting in the way)
+      buf = self.mmap
+
+      for attempt in range(READ_RETRIES):
+         sequence = SEQUENCE_FORMAT.unpack_from(buf, 0)[0]
+         if sequence == last_sequence:
+            return None
+
+         if sequence & 1:
+            continue
+
+         fields    = STATE_FORMAT.unpack_from(buf, 0)
+         keys_held = bytes(buf[KEYS_OFFSET:STATE_SIZE])
+
+         if SEQUENCE_FORMAT.unpack_from(buf, 0)[0] == sequence:
+            state = dict(zip(FIELDS, fields))
+
+            state['keys_held'] = [
+               (index << 3) + bit for index, byte in enumerate(keys_held) if byte for bit in range(8) if byte & (1 << bit)
+            ]
+            state['age']       = time.monotonic() - state['updated']
+
+            return state
+         # if SEQUENCE_FORMAT.unpack_from(buf, 0)[0] == sequence:
+      # for attempt in range(READ_RETRIES):
+
+      return None
+   # def read(self, last_sequence = None):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      self.mmap.close()
+   # def close(self):
+
+
+   # }}}
+# class StateReader:
+
+
+# }}}
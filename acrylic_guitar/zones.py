@@ -0,0 +1,1276 @@
+#!/usr/bin/python
+
+
+import time
+import array
+import logging
+import threading
+
+from acrylic_guitar import backends
+from acrylic_guitar import profiler
+from acrylic_guitar import segments
+from acrylic_guitar import frame_rate
+from acrylic_guitar import color_space
+from acrylic_guitar import fixed_point
+from acrylic_guitar import parameters
+
+
+
+# Colors for each note in the lowest-note modes, from C up
+NOTE_COLOR_NAMES = ['blue', 'orange', 'cyan', 'yellow', 'red', 'magenta', 'blue', 'pink', 'red', 'green', 'orange', 'pink']
+
+# Colors the glow modes cycle through
+GLOW_CYCLE_COLOR_NAMES = ['red', 'yellow', 'green', 'cyan', 'blue', 'magenta']
+
+
+
+# {{{ class Zone:
+class Zone:
+   # A part of the guitar (body, neck, headstock...) with its own outputs and a
+   # stack of layers, each running a display mode. Backends are created with the
+   # zone in place of the guitar: any upper-case settings given for the zone
+   # override the guitar's, and everything else is read from the guitar.
+
+
+   # {{{ def __init__(self, guitar, name, backends = None, settings = {}):
+   def __init__(self, guitar, name, backends = None, settings = {}):
+      self.guitar = guitar
+      self.name   = name
+
+      self.backends = backends if backends else list(guitar.OUTPUT_BACKENDS)
+
+      for setting_name, value in settings.items():
+         setattr(self, setting_name, value)
+
+      # A brightness of the zone's own needs its own integer scale for the fixed-point path
+      for setting_name, fixed_name in parameters.FIXED_POINT_SCALES.items():
+         if setting_name in settings:
+            setattr(self, fixed_name, parameters.get_fixed_scale(settings[setting_name]))
+      # for setting_name, fixed_name in parameters.FIXED_POINT_SCALES.items():
+
+      self.outputs = []
+
+      # The bottom layer, then the ones blended over it in order
+      self.layers   = []
+      self.overlays = []
+
+      # Whether to render just the bottom layer, with no crossfades, while overloaded
+      self.simplified = False
+
+      # What the layers composite to, reused every frame
+      self.frame_buffer = array.array('d', [0.0, 0.0, 0.0])
+
+      # Whether the frame is just the bottom layer's color, with nothing blended over it
+      # or crossfading. Only then can it go out as a segment or on the fixed-point path.
+      self.direct = True
+
+      # Whether the frame is the bottom layer's fixed-point color, which frame_buffer doesn't follow
+      self.fixed = False
+
+      # Whether every output can play a fade itself, and the segment they're playing
+      self.supports_segments = False
+      self.segment           = None
+
+      # Earliest frame one of the layers needs rendering on, or None to wait for input
+      self.next_change_frame = None
+   # def __init__(self, guitar, name, backends = None, settings = {}):
+
+
+   # }}}
+   # {{{ def __getattr__(self, name):
+   def __getattr__(self, name):
+      # Only called for attributes the zone doesn't have itself
+      if name == 'guitar':
+         raise AttributeError(name)
+
+      return getattr(self.guitar, name)
+   # def __getattr__(self, name):
+
+
+   # }}}
+   # {{{ def add_layer(self, display_mode = None, palette = None, keys = None, blend = 'alpha', opacity = 1.0, settings = {}):
+   def add_layer(self, display_mode = None, palette = None, keys = None, blend = 'alpha', opacity = 1.0, settings = {}):
+      layer = Layer(self, display_mode, palette, keys, blend, opacity, settings)
+
+      self.layers.append(layer)
+      self.overlays = self.layers[1:]
+
+      return layer
+   # def add_layer(self, display_mode = None, palette = None, keys = None, blend = 'alpha', opacity = 1.0, settings = {}):
+
+
+   # }}}
+   # {{{ def replace_layer(self, old_layer, new_layer):
+   def replace_layer(self, old_layer, new_layer):
+      self.layers[self.layers.index(old_layer)] = new_layer
+      self.overlays = self.layers[1:]
+   # def replace_layer(self, old_layer, new_layer):
+
+
+   # }}}
+   # {{{ def start_outputs(self):
+   def start_outputs(self):
+      color = {'red': self.frame_buffer[0], 'green': self.frame_buffer[1], 'blue': self.frame_buffer[2]}
+
+      for backend_name in self.backends:
+         logging.debug("Starting %s output for zone %s...", backend_name, self.name)
+
+         output = backends.create_backend(backend_name, self)
+         output.start(color)
+
+         self.outputs.append(output)
+      # for backend_name in self.backends:
+
+      self.supports_segments = bool(self.outputs)
+      for output in self.outputs:
+         if not output.SUPPORTS_SEGMENTS:
+            self.supports_segments = False
+      # for output in self.outputs:
+   # def start_outputs(self):
+
+
+   # }}}
+   # {{{ def update_key_stats(self, keys):
+   def update_key_stats(self, keys):
+      for layer in self.layers:
+         layer.update_key_stats(keys)
+
+         if layer.outgoing is not None:
+            layer.outgoing.update_key_stats(keys)
+      # for layer in self.layers:
+   # def update_key_stats(self, keys):
+
+
+   # }}}
+   # {{{ def render(self, frame):
+   def render(self, frame):
+      # Step every layer, and composite them into frame_buffer if any changed.
+      # Returns whether the frame changed.
+      changed    = False
+      simplified = self.simplified
+      base       = self.layers[0]
+
+      self.direct = (simplified or not self.overlays) and base.outgoing is None and base.opacity == 1.0
+
+      next_change_frame = None
+
+      for layer in self.layers:
+         if layer.render(frame):
+            changed = True
+
+         change_frame = layer.next_change_frame
+         if change_frame is not None and (next_change_frame is None or change_frame < next_change_frame):
+            next_change_frame = change_frame
+
+         if simplified:
+            break
+      # for layer in self.layers:
+
+      self.next_change_frame = next_change_frame
+
+      if not changed:
+         return False
+
+      # The fixed-point path's colors go straight out as they are
+      self.fixed = self.direct and base.fixed
+      if self.fixed:
+         return True
+
+      frame_buffer = self.frame_buffer
+      color        = base.output
+      opacity      = base.opacity
+
+      frame_buffer[0] = color[0] * opacity
+      frame_buffer[1] = color[1] * opacity
+      frame_buffer[2] = color[2] * opacity
+
+      if not simplified:
+         for layer in self.overlays:
+            layer.blend_function(frame_buffer, layer.output, layer.opacity)
+      # if not simplified:
+
+      return True
+   # def render(self, frame):
+
+
+   # }}}
+   # {{{ def play_segment(self, segment):
+   def play_segment(self, segment):
+      # Hand a fade of the bottom layer's to the outputs to play themselves
+      guitar    = self.guitar
+      profiling = guitar.profiler.enabled
+      if profiling: span_start = time.perf_counter_ns()
+
+      # The power limit dims the whole segment enough for its brightest frame
+      output_segment = segment
+      if guitar.POWER_LIMITER__BUDGET:
+         limiter = guitar.power_limiter
+         pixels  = self.POWER_LIMITER__PIXELS * len(self.outputs)
+         current = max([limiter.get_current(red, green, blue, pixels) for red, green, blue in segment.get_path()]) * segment.brightness
+         scale   = limiter.limit(current, guitar.frame_clock.now())
+
+         if scale != 1.0:
+            output_segment = segment.with_brightness(segment.brightness * scale)
+      # if guitar.POWER_LIMITER__BUDGET:
+
+      for output in self.outputs:
+         output.play_segment(output_segment)
+
+      self.segment = segment
+      guitar.metric_fade_segments.inc()
+
+      if profiling: guitar.profiler.record(profiler.STAGE_OUTPUT_WRITE, span_start, time.perf_counter_ns())
+   # def play_segment(self, segment):
+
+
+   # }}}
+   # {{{ def stop_segment(self, now):
+   def stop_segment(self, now):
+      # Have the outputs hold where the segment got to. Returns that color.
+      for output in self.outputs:
+         output.stop_segment(now)
+
+      color        = self.segment.get_color(now)
+      self.segment = None
+
+      return color
+   # def stop_segment(self, now):
+
+
+   # }}}
+# class Zone:
+
+
+# }}}
+# {{{ class Layer:
+class Layer:
+   # One display mode running within a zone, with its own palette and range of
+   # keys, and how it blends onto the layers below. Settings not found here are
+   # read from the zone.
+
+
+   # {{{ def __init__(self, zone, display_mode = None, palette = None, keys = None, blend = 'alpha', opacity = 1.0, settings = {}):
+   def __init__(self, zone, display_mode = None, palette = None, keys = None, blend = 'alpha', opacity = 1.0, settings = {}):
+      self.zone = zone
+
+      self.settings = settings
+      for setting_name, value in settings.items():
+         setattr(self, setting_name, value)
+
+      # None follows the guitar's display mode, so program changes apply to this layer
+      self.display_mode = display_mode
+
+      # Color names to use in place of the mode's usual ones, or None
+      self.palette = palette
+
+      # Lowest and highest key (inclusive) this layer's note modes respond to
+      self.key_range = keys
+      self.key_low, self.key_high = keys if keys else (0, zone.NUM_KEYS - 1)
+
+      if blend not in BLEND_MODES:
+         raise RuntimeError("Unknown blend mode: '%s'" % blend)
+
+      self.blend          = blend
+      self.blend_function = BLEND_MODES[blend]
+      self.opacity        = float(opacity)
+
+      # Render state: the color the mode is showing, the frame being rendered, where
+      # the next fade starts, and the generator producing the mode's frames
+      self.color      = array.array('d', [0.0, 0.0, 0.0])
+      self.frame      = 0
+      self.fade_frame = None
+      self.renderer   = None
+
+      # Set by the renderer during a step: whether it changed the color, and the frame
+      # it next needs rendering on if it's sitting still until then
+      self.changed           = False
+      self.next_change_frame = None
+
+      # The color on the fixed-point path, and whether that's the one showing. color
+      # catches up when the fade ends, or each frame while it needs blending.
+      self.color_fixed = fixed_point.new_color()
+      self.fixed       = False
+
+      # What gets composited: color, or mixed_color while crossfading from the
+      # layer this one replaced
+      self.output         = self.color
+      self.mixed_color    = array.array('d', [0.0, 0.0, 0.0])
+      self.outgoing       = None
+      self.mix_frame      = 0
+      self.num_mix_frames = 0
+
+      # Key stats for this layer's range of keys, updated by the scheduler
+      self.max_key_velocity = 0
+      self.lowest_note_on   = None
+      self.note_changed     = False
+   # def __init__(self, zone, display_mode = None, palette = None, keys = None, blend = 'alpha', opacity = 1.0, settings = {}):
+
+
+   # }}}
+   # {{{ def __getattr__(self, name):
+   def __getattr__(self, name):
+      # Only called for attributes the layer doesn't have itself
+      if name == 'zone':
+         raise AttributeError(name)
+
+      return getattr(self.zone, name)
+   # def __getattr__(self, name):
+
+
+   # }}}
+   # {{{ def start_mode(self, display_mode, epoch_frame, num_mix_frames = 0, start_color = None):
+   def start_mode(self, display_mode, epoch_frame, num_mix_frames = 0, start_color = None):
+      # Start rendering a display mode from epoch_frame, from start_color if given. If
+      # we're already rendering one, the new mode goes on a new layer that takes this
+      # one's place in the zone, starting from its color and crossfading from it over
+      # num_mix_frames.
+      if self.renderer is None:
+         if start_color is not None:
+            self.color[0], self.color[1], self.color[2] = start_color
+
+         self.fade_frame = epoch_frame
+         self.renderer   = get_renderer(self, display_mode)
+         return self
+      # if self.renderer is None:
+
+      # Take our color back from the outputs if they're playing our fade, or from the fixed-point path
+      zone = self.zone
+      if zone.segment is not None and zone.layers[0] is self:
+         self.color[0], self.color[1], self.color[2] = zone.stop_segment(zone.guitar.frame_clock.now())
+      elif self.fixed:
+         self.update_color_from_fixed()
+      # elif self.fixed:
+
+      layer = Layer(zone, self.display_mode, self.palette, self.key_range, self.blend, self.opacity, self.settings)
+      layer.color[:]         = self.output
+      layer.max_key_velocity = self.max_key_velocity
+      layer.lowest_note_on   = self.lowest_note_on
+      layer.start_mode(display_mode, epoch_frame, 0, start_color)
+
+      if num_mix_frames:
+         # Only two modes at once: if we were still crossfading, the older one goes now
+         self.outgoing = None
+         self.output   = self.color
+
+         layer.outgoing       = self
+         layer.output         = layer.mixed_color
+         layer.mix_frame      = epoch_frame
+         layer.num_mix_frames = num_mix_frames
+      # if num_mix_frames:
+
+      zone.replace_layer(self, layer)
+
+      return layer
+   # def start_mode(self, display_mode, epoch_frame, num_mix_frames = 0, start_color = None):
+
+
+   # }}}
+   # {{{ def update_key_stats(self, keys):
+   def update_key_stats(self, keys):
+      # Recalculate this layer's stats from a copy of the guitar's keys
+      layer_keys = keys[self.key_low:self.key_high + 1]
+
+      self.max_key_velocity = max(layer_keys) if layer_keys else 0
+
+      lowest_note_on = None
+      for key, velocity in enumerate(layer_keys):
+         if velocity:
+            lowest_note_on = (self.key_low + key) % self.zone.guitar.NUM_NOTES
+            break
+         # if velocity:
+      # for key, velocity in enumerate(layer_keys):
+
+      if lowest_note_on != self.lowest_note_on:
+         self.lowest_note_on = lowest_note_on
+         self.note_changed   = True
+      # if lowest_note_on != self.lowest_note_on:
+   # def update_key_stats(self, keys):
+
+
+   # }}}
+   # {{{ def render(self, frame):
+   def render(self, frame):
+      # Step the mode, and the one we're crossfading from. Returns whether output changed.
+      changed = self.step(frame)
+
+      outgoing = self.outgoing
+      if outgoing is None:
+         return changed
+
+      # Rather than run two modes while overloaded, finish the crossfade now
+      if self.zone.simplified:
+         self.outgoing = None
+         self.output   = self.color
+         return True
+      # if self.zone.simplified:
+
+      outgoing.step(frame)
+
+      progress = float(frame - self.mix_frame) / self.num_mix_frames
+
+      if progress >= 1.0:
+         self.outgoing = None
+         self.output   = self.color
+      else:
+         progress = max(progress, 0.0)
+
+         color       = self.color
+         old_color   = outgoing.output
+         mixed_color = self.mixed_color
+
+         mixed_color[0] = old_color[0] + ((color[0] - old_color[0]) * progress)
+         mixed_color[1] = old_color[1] + ((color[1] - old_color[1]) * progress)
+         mixed_color[2] = old_color[2] + ((color[2] - old_color[2]) * progress)
+      # else:
+
+      return True
+   # def render(self, frame):
+
+
+   # }}}
+   # {{{ def step(self, frame):
+   def step(self, frame):
+      # Run the mode for a frame. Returns whether it changed the color.
+      self.frame             = frame
+      self.changed           = False
+      self.next_change_frame = None
+
+      next(self.renderer)
+
+      # Blending works on percentages
+      if self.fixed and self.changed and not self.zone.direct:
+         self.update_color_from_fixed()
+
+      return self.changed
+   # def step(self, frame):
+
+
+   # }}}
+   # {{{ def update_color_from_fixed(self):
+   def update_color_from_fixed(self):
+      color       = self.color
+      color_fixed = self.color_fixed
+
+      color[0] = fixed_point.to_percent(color_fixed[0])
+      color[1] = fixed_point.to_percent(color_fixed[1])
+      color[2] = fixed_point.to_percent(color_fixed[2])
+   # def update_color_from_fixed(self):
+
+
+   # }}}
+   # {{{ def get_palette(self, default_color_names):
+   def get_palette(self, default_color_names):
+      # The layer's colors as (red, green, blue), or the mode's usual ones
+      colors = self.zone.guitar.colors
+
+      return [color_to_tuple(colors[name]) for name in (self.palette if self.palette else default_color_names)]
+   # def get_palette(self, default_color_names):
+
+
+   # }}}
+# class Layer:
+
+
+# }}}
+# {{{ class ZoneScheduler:
+class ZoneScheduler:
+   # Renders every zone from one frame loop. Each display mode is a generator that
+   # produces one frame per step, so a tick is a single pass over the zones: step
+   # each zone's layers, composite them, and write the result to the zone's outputs.
+   # A guitar with no zones configured is one zone running the guitar's display mode.
+   # When no layer is changing color, the loop sleeps in a single wait until the next
+   # frame one needs, or until input comes in.
+
+
+   # {{{ def __init__(self, guitar, zones):
+   def __init__(self, guitar, zones):
+      self.guitar = guitar
+      self.zones  = zones
+
+      self.simplified = False
+
+      # Earliest frame any zone needs rendering on, or None to wait for input
+      self.next_change_frame = None
+
+      self.__key_state_version = None
+      self.__limit_scale       = 1.0
+      self.__limit_scale_fixed = fixed_point.SCALE_ONE
+
+      # The guitar's settings are configured by now
+      guitar.parameters.update_fixed_scales()
+
+      # The scheduler's built on the thread that runs it
+      self.__lock_wait_metric = guitar.metric_midi_lock_wait.labels(threading.current_thread().name)
+   # def __init__(self, guitar, zones):
+
+
+   # }}}
+   # {{{ def start(self):
+   def start(self):
+      # Start every zone's outputs and display modes
+      guitar = self.guitar
+
+      for zone in self.zones:
+         zone.start_outputs()
+
+         # Let cleanup() stop them with the rest
+         guitar.outputs.extend(zone.outputs)
+      # for zone in self.zones:
+
+      # render_frame() updates this in place from the first zone
+      guitar.current_color = dict(guitar.current_color)
+
+      self.start_display_mode(True)
+   # def start(self):
+
+
+   # }}}
+   # {{{ def start_display_mode(self, all_layers = False):
+   def start_display_mode(self, all_layers = False):
+      # Restart the layers that follow the guitar's display mode, all on the guitar's
+      # mode epoch so a cluster follower's zones line up with the leader's
+      guitar    = self.guitar
+      following = guitar.start_display_mode()
+      guitar.metric_display_mode.set(guitar.display_mode)
+
+      logging.debug("Starting display mode %d", guitar.display_mode)
+
+      num_mix_frames = int(round(guitar.DISPLAY_MANAGER__CROSSFADE_TIME / guitar.frame_clock.frame_interval))
+
+      # A follower's layers start from the leader's color too, so its fades step through the same colors
+      start_color = color_to_tuple(guitar.mode_start_color) if following else None
+
+      for zone in self.zones:
+         for layer in list(zone.layers):
+            if layer.display_mode is None:
+               layer.start_mode(guitar.display_mode, guitar.mode_epoch_frame, num_mix_frames, start_color)
+            elif all_layers:
+               layer.start_mode(layer.display_mode, guitar.mode_epoch_frame)
+            # elif all_layers:
+         # for layer in list(zone.layers):
+      # for zone in self.zones:
+   # def start_display_mode(self, all_layers = False):
+
+
+   # }}}
+   # {{{ def update_key_stats(self):
+   def update_key_stats(self):
+      # Only redo the layers' key stats when the guitar's keys have changed
+      guitar = self.guitar
+
+      if guitar.key_state_version == self.__key_state_version:
+         return
+
+      # The event's only set with the lock held, so it can't be left set for keys we've already seen
+      lock_requested = time.perf_counter_ns()
+      with guitar.midi_data_lock:
+         self.__lock_wait_metric.observe((time.perf_counter_ns() - lock_requested) / 1e9)
+
+         guitar.key_change_event.clear()
+         self.__key_state_version = guitar.key_state_version
+         keys = list(guitar.keys)
+      # with guitar.midi_data_lock:
+
+      for zone in self.zones:
+         zone.update_key_stats(keys)
+   # def update_key_stats(self):
+
+
+   # }}}
+   # {{{ def render_frame(self, frame, rewrite = False):
+   def render_frame(self, frame, rewrite = False):
+      # Compute and output one frame for every zone. Returns whether any zone's output changed.
+      # rewrite outputs every zone's color whether it changed or not, e.g. for brightness.
+      self.update_key_stats()
+
+      guitar      = self.guitar
+      profiling   = guitar.profiler.enabled
+      any_changed = False
+      changed     = []
+
+      if profiling: span_start = time.perf_counter_ns()
+
+      next_change_frame = None
+
+      for zone in self.zones:
+         zone_changed = zone.render(frame)
+
+         changed.append(zone_changed)
+         if zone_changed:
+            any_changed = True
+
+         change_frame = zone.next_change_frame
+         if change_frame is not None and (next_change_frame is None or change_frame < next_change_frame):
+            next_change_frame = change_frame
+      # for zone in self.zones:
+
+      self.next_change_frame = next_change_frame
+
+      # The zones share a supply, so the power limit goes by all of them together
+      limit_scale = 1.0
+      if guitar.POWER_LIMITER__BUDGET:
+         limiter = guitar.power_limiter
+         current = 0.0
+         now     = guitar.frame_clock.now()
+
+         for zone in self.zones:
+            pixels = zone.POWER_LIMITER__PIXELS * len(zone.outputs)
+
+            if zone.segment is not None:
+               red, green, blue = zone.segment.get_color(now)
+            elif zone.fixed:
+               color_fixed      = zone.layers[0].color_fixed
+               red, green, blue = fixed_point.to_percent(color_fixed[0]), fixed_point.to_percent(color_fixed[1]), fixed_point.to_percent(color_fixed[2])
+            else:
+               red, green, blue = zone.frame_buffer
+            # else:
+
+            current += limiter.get_current(red, green, blue, pixels) * zone.DISPLAY_MANAGER__BRIGHTNESS
+         # for zone in self.zones:
+
+         limit_scale = limiter.limit(current, now)
+      # if guitar.POWER_LIMITER__BUDGET:
+
+      # A new limit has to be written out even where the colors haven't changed, and
+      # counts as a change, so the scheduler keeps rendering while the limit eases off
+      if limit_scale != self.__limit_scale:
+         self.__limit_scale       = limit_scale
+         self.__limit_scale_fixed = parameters.get_fixed_scale(limit_scale)
+         rewrite                  = True
+         any_changed              = True
+      # if limit_scale != self.__limit_scale:
+
+      if profiling:
+         span_end = time.perf_counter_ns()
+         guitar.profiler.record(profiler.STAGE_COLOR_MATH, span_start, span_end)
+      # if profiling:
+
+      for index, zone in enumerate(self.zones):
+         # Outputs playing a segment carry on by themselves, and it's resent for a new brightness
+         if zone.segment is not None:
+            continue
+
+         # Renderers and blends keep colors within 0-100, so there's nothing to constrain
+         if (changed[index] or rewrite) and zone.fixed:
+            color_fixed = zone.layers[0].color_fixed
+            red         = color_fixed[0]
+            green       = color_fixed[1]
+            blue        = color_fixed[2]
+
+            # Both scales are kept as integers, so there's no converting them here
+            fixed_scale = zone.brightness_fixed
+            if limit_scale != 1.0:
+               fixed_scale = (fixed_scale * self.__limit_scale_fixed) >> fixed_point.SCALE_SHIFT
+
+            if fixed_scale != fixed_point.SCALE_ONE:
+               red   = (red   * fixed_scale) >> fixed_point.SCALE_SHIFT
+               green = (green * fixed_scale) >> fixed_point.SCALE_SHIFT
+               blue  = (blue  * fixed_scale) >> fixed_point.SCALE_SHIFT
+            # if fixed_scale != fixed_point.SCALE_ONE:
+
+            for output in zone.outputs:
+               output.write_fixed(red, green, blue)
+         elif changed[index] or rewrite:
+            frame_buffer = zone.frame_buffer
+            scale        = zone.DISPLAY_MANAGER__BRIGHTNESS * limit_scale
+
+            if scale != 1.0:
+               for output in zone.outputs:
+                  output.write(frame_buffer[0] * scale, frame_buffer[1] * scale, frame_buffer[2] * scale)
+            else:
+               for output in zone.outputs:
+                  output.write(frame_buffer[0], frame_buffer[1], frame_buffer[2])
+            # else:
+         else:
+            for output in zone.outputs:
+               output.keep_alive()
+         # else:
+      # for index, zone in enumerate(self.zones):
+
+      if profiling: guitar.profiler.record(profiler.STAGE_OUTPUT_WRITE, span_end, time.perf_counter_ns())
+
+      # The first zone stands in for the guitar's color, e.g. for cluster followers and
+      # the state export, which read it from current_color_fixed on the fixed-point path
+      # and from current_segment while the outputs play a segment
+      zone = self.zones[0]
+      guitar.current_segment = zone.segment
+
+      if zone.fixed:
+         guitar.current_color_fixed[:] = zone.layers[0].color_fixed
+      else:
+         frame_buffer  = zone.frame_buffer
+         current_color = guitar.current_color
+
+         current_color['red']   = frame_buffer[0]
+         current_color['green'] = frame_buffer[1]
+         current_color['blue']  = frame_buffer[2]
+      # else:
+
+      return any_changed
+   # def render_frame(self, frame, rewrite = False):
+
+
+   # }}}
+   # {{{ def run(self, stop_event):
+   def run(self, stop_event):
+      guitar      = self.guitar
+      frame_clock = guitar.frame_clock
+      governor    = guitar.frame_rate
+
+      guitar.display_mode_change_event.clear()
+      self.start()
+
+      logging.debug("Started Zone Scheduler with %d zones", len(self.zones))
+
+      # Input the loop wakes for while no layer is changing color
+      stop_events = [stop_event, guitar.display_mode_change_event, guitar.key_change_event]
+
+      frame = frame_clock.current_frame()
+
+      while not stop_event.is_set():
+         if guitar.display_mode_change_event.is_set():
+            guitar.display_mode_change_event.clear()
+            self.start_display_mode()
+         # if guitar.display_mode_change_event.is_set():
+
+         simplified = governor.degrade_level >= frame_rate.DEGRADE_SIMPLIFY
+         if simplified != self.simplified:
+            self.simplified = simplified
+
+            for zone in self.zones:
+               zone.simplified = simplified
+         # if simplified != self.simplified:
+
+         render_started = time.perf_counter()
+
+         # A new brightness has to be written out even where the colors haven't changed
+         rewrite = guitar.parameters.update(frame_clock.now())
+
+         changed = self.render_frame(frame, rewrite) or rewrite
+         guitar.metric_frame_render_time.observe(time.perf_counter() - render_started)
+
+         profiling = guitar.profiler.enabled
+         if profiling: span_start = time.perf_counter_ns()
+
+         next_change_frame = self.next_change_frame
+
+         if changed:
+            # The frame rate decides which frame to render next, but never skips one a layer needs, e.g. a fade's last
+            next_frame = governor.get_next_frame(frame)
+            if next_change_frame is not None and next_change_frame < next_frame:
+               next_frame = max(next_change_frame, frame + 1)
+
+            frame = frame_clock.wait_until_frame(next_frame)
+            guitar.metric_frame_overshoot.observe(frame_clock.last_overshoot)
+            governor.record_wake(next_frame, frame)
+         else:
+            # Nothing's changing, e.g. a hold, a segment playing, or a mode waiting for a
+            # note, so sleep until a layer needs a frame, or an idle interval if none does
+            if next_change_frame is None:
+               next_change_frame = frame + max(1, int(round(governor.get_idle_interval() / frame_clock.frame_interval)))
+
+            frame = guitar.wait_until_frame_or_woken(next_change_frame, stop_events)
+         # else:
+
+         if profiling: guitar.profiler.record(profiler.STAGE_FRAME_SLEEP, span_start, time.perf_counter_ns())
+      # while not stop_event.is_set():
+
+      # Leave the outputs on the color they'd got to
+      now = frame_clock.now()
+      for zone in self.zones:
+         if zone.segment is not None:
+            zone.stop_segment(now)
+      # for zone in self.zones:
+
+      logging.debug("Asked to stop, returning...")
+   # def run(self, stop_event):
+
+
+   # }}}
+# class ZoneScheduler:
+
+
+# }}}
+
+# {{{ def create_zones(guitar):
+def create_zones(guitar):
+   # Build the zones described by guitar.ZONES, or a single zone with guitar.LAYERS
+   # on top if there are none
+   zone_configs = guitar.ZONES if guitar.ZONES else [{'name': 'main', 'layers': guitar.LAYERS}]
+
+   zones = []
+
+   for index, zone_config in enumerate(zone_configs):
+      settings = dict([(name, value) for name, value in zone_config.items() if name.isupper()])
+
+      # The status LED belongs to the first zone, unless a zone says otherwise
+      if index > 0 and 'PIN_LED' not in settings:
+         settings['PIN_LED'] = None
+
+      zone = Zone(guitar, zone_config.get('name', 'zone%d' % index), zone_config.get('backends'), settings)
+
+      zone.add_layer(zone_config.get('display_mode'), zone_config.get('palette'), zone_config.get('keys'))
+
+      for layer_config in zone_config.get('layers', []):
+         zone.add_layer(
+            layer_config.get('display_mode'),
+            layer_config.get('palette'),
+            layer_config.get('keys', zone_config.get('keys')),
+            layer_config.get('blend', 'alpha'),
+            layer_config.get('opacity', 1.0),
+            dict([(name, value) for name, value in layer_config.items() if name.isupper()]),
+         )
+      # for layer_config in zone_config.get('layers', []):
+
+      zones.append(zone)
+   # for index, zone_config in enumerate(zone_configs):
+
+   return zones
+# def create_zones(guitar):
+
+
+# }}}
+# {{{ def check_settings(guitar):
+def check_settings(guitar):
+   # Check the fade settings of every zone and layer create_zones() would build, with
+   # their overrides, so a typo stops the guitar at startup rather than the display
+   # manager's thread at the first fade
+   zone_configs = guitar.ZONES if guitar.ZONES else [{'name': 'main', 'layers': guitar.LAYERS}]
+
+   for zone_config in zone_configs:
+      zone_color_space = zone_config.get('DISPLAY_MANAGER__COLOR_SPACE', guitar.DISPLAY_MANAGER__COLOR_SPACE)
+      zone_easing      = zone_config.get('DISPLAY_MANAGER__EASING', guitar.DISPLAY_MANAGER__EASING)
+
+      color_space.check_fade_settings(zone_color_space, zone_easing)
+
+      for layer_config in zone_config.get('layers', []):
+         color_space.check_fade_settings(
+            layer_config.get('DISPLAY_MANAGER__COLOR_SPACE', zone_color_space),
+            layer_config.get('DISPLAY_MANAGER__EASING', zone_easing),
+         )
+      # for layer_config in zone_config.get('layers', []):
+   # for zone_config in zone_configs:
+# def check_settings(guitar):
+
+
+# }}}
+# {{{ def get_renderer(layer, display_mode):
+def get_renderer(layer, display_mode):
+   # The generator producing a layer's frames in the given display mode
+   from acrylic_guitar.guitar import DisplayMode
+
+   if   display_mode == DisplayMode.off:
+      return render_off(layer)
+   elif display_mode == DisplayMode.random_glow:
+      return render_glow_cycle(layer, False)
+   elif display_mode == DisplayMode.crazy_flash_jump:
+      return render_crazy_flash(layer, False)
+   elif display_mode == DisplayMode.glow_lowest_midi_key_on:
+      return render_glow_lowest_note(layer)
+   elif display_mode == DisplayMode.flash_lowest_midi_key_on:
+      return render_flash_lowest_note(layer)
+   elif display_mode == DisplayMode.crazy_flash_fade:
+      return render_crazy_flash(layer, True)
+   elif display_mode == DisplayMode.random_glow_midi_velocity:
+      return render_glow_cycle(layer, True)
+   else:
+      logging.debug("Unrecognized display mode (%d) set for zone %s.", display_mode, layer.name)
+      return render_off(layer)
+   # else:
+# def get_renderer(layer, display_mode):
+
+
+# }}}
+
+
+# Blend modes. Each blends a layer's color, at the given opacity, into the
+# colors below it in place. Colors are percentages, and stay within 0-100.
+# {{{ def blend_alpha(color, layer_color, opacity):
+def blend_alpha(color, layer_color, opacity):
+   color[0] += (layer_color[0] - color[0]) * opacity
+   color[1] += (layer_color[1] - color[1]) * opacity
+   color[2] += (layer_color[2] - color[2]) * opacity
+# def blend_alpha(color, layer_color, opacity):
+
+
+# }}}
+# {{{ def blend_add(color, layer_color, opacity):
+def blend_add(color, layer_color, opacity):
+   color[0] = min(color[0] + (layer_color[0] * opacity), 100.0)
+   color[1] = min(color[1] + (layer_color[1] * opacity), 100.0)
+   color[2] = min(color[2] + (layer_color[2] * opacity), 100.0)
+# def blend_add(color, layer_color, opacity):
+
+
+# }}}
+# {{{ def blend_multiply(color, layer_color, opacity):
+def blend_multiply(color, layer_color, opacity):
+   # At full opacity, a layer at 100% leaves the colors below as they are and 0% blacks them out
+   scale = opacity / 100.0
+
+   color[0] *= (1.0 - opacity) + (layer_color[0] * scale)
+   color[1] *= (1.0 - opacity) + (layer_color[1] * scale)
+   color[2] *= (1.0 - opacity) + (layer_color[2] * scale)
+# def blend_multiply(color, layer_color, opacity):
+
+
+# }}}
+# {{{ def blend_max(color, layer_color, opacity):
+def blend_max(color, layer_color, opacity):
+   color[0] = max(color[0], layer_color[0] * opacity)
+   color[1] = max(color[1], layer_color[1] * opacity)
+   color[2] = max(color[2], layer_color[2] * opacity)
+# def blend_max(color, layer_color, opacity):
+
+
+# }}}
+
+BLEND_MODES = {
+   'alpha'   : blend_alpha,
+   'add'     : blend_add,
+   'multiply': blend_multiply,
+   'max'     : blend_max,
+}
+
+
+# Renderers. Each is a generator stepped once per frame, with layer.frame set to the
+# frame being rendered. When it changes the color it writes it into layer.color, or
+# layer.color_fixed on the fixed-point path, and sets layer.changed. When it's sitting
+# still until some frame, it sets layer.next_change_frame before yielding, so the
+# scheduler can sleep until then; left at None, it sleeps until input comes in. Mode
+# changes replace the whole generator, so only note changes need checking.
+# {{{ def fade(layer, end_color, time_to_fade, scale_to_midi_velocity = False, stop_on_note_change = False):
+def fade(layer, end_color, time_to_fade, scale_to_midi_velocity = False, stop_on_note_change = False):
+   # Fade from the layer's color to end_color in time_to_fade seconds. Returns False
+   # if a note change interrupted it.
+   if time_to_fade == 0:
+      show(layer, end_color)
+      return True
+   # if time_to_fade == 0:
+
+   # Fades are scheduled on the frame clock instead of by counting frames. Each one
+   # starts on the frame where the previous one was due to end, so a slow frame
+   # skips ahead rather than stretching the fade, and guitars sharing a cluster
+   # clock step through the same colors on the same frames.
+   zone           = layer.zone
+   frame_interval = zone.guitar.frame_clock.frame_interval
+   start_color    = (layer.color[0], layer.color[1], layer.color[2])
+
+   start_frame = layer.fade_frame if layer.fade_frame is not None else layer.frame
+   num_frames  = max(1, int(round(time_to_fade / frame_interval)))
+   end_frame   = start_frame + num_frames
+
+   # Outputs that can play the whole fade themselves are sent it in one go. Velocity
+   # scaling follows the keys as they change, so those fades go frame by frame.
+   if layer.DISPLAY_MANAGER__SEGMENTS and not scale_to_midi_velocity and zone.direct and zone.supports_segments:
+      segment = segments.Segment(
+         start_color, end_color, start_frame * frame_interval, num_frames * frame_interval,
+         layer.DISPLAY_MANAGER__COLOR_SPACE, layer.DISPLAY_MANAGER__EASING, zone.DISPLAY_MANAGER__BRIGHTNESS, frame_interval
+      )
+
+      finished = yield from fade_segment(layer, segment, end_frame, stop_on_note_change)
+
+      # Otherwise the zone needs compositing again before the end, so carry on frame by frame
+      if finished is not None:
+         return finished
+   # if layer.DISPLAY_MANAGER__SEGMENTS and not scale_to_midi_velocity and zone.direct and zone.supports_segments:
+
+   # Overloaded guitars fall back to the cheaper fixed-point path too
+   if layer.DISPLAY_MANAGER__FIXED_POINT or zone.guitar.frame_rate.degrade_level >= frame_rate.DEGRADE_SIMPLIFY:
+      finished = yield from fade_fixed_point(layer, start_color, end_color, start_frame, num_frames, scale_to_midi_velocity, stop_on_note_change)
+      return finished
+   # if layer.DISPLAY_MANAGER__FIXED_POINT or zone.guitar.frame_rate.degrade_level >= frame_rate.DEGRADE_SIMPLIFY:
+
+   # Every frame's color, worked out up front in the layer's color space and easing
+   path         = color_space.get_fade_path(start_color, end_color, num_frames, layer.DISPLAY_MANAGER__COLOR_SPACE, layer.DISPLAY_MANAGER__EASING)
+   color        = layer.color
+   max_velocity = float(layer.MAX_VELOCITY)
+
+   while layer.frame < end_frame:
+      color[0], color[1], color[2] = path[max(layer.frame - start_frame, 0)]
+
+      if scale_to_midi_velocity:
+         scale = min(max(layer.max_key_velocity / max_velocity, 0.5), 1.0)
+
+         color[0] *= scale
+         color[1] *= scale
+         color[2] *= scale
+      # if scale_to_midi_velocity:
+
+      # The frame rate can skip frames, but not the last
+      layer.changed           = True
+      layer.next_change_frame = end_frame
+      yield
+
+      # The next fade starts from here
+      if stop_on_note_change and layer.note_changed:
+         layer.fade_frame = layer.frame
+         return False
+      # if stop_on_note_change and layer.note_changed:
+   # while layer.frame < end_frame:
+
+   # End exactly where we were headed. Whatever follows is rendered on this same frame.
+   color[0], color[1], color[2] = end_color
+   layer.changed    = True
+   layer.fade_frame = end_frame
+
+   return True
+# def fade(layer, end_color, time_to_fade, scale_to_midi_velocity = False, stop_on_note_change = False):
+
+
+# }}}
+# {{{ def fade_segment(layer, segment, end_frame, stop_on_note_change):
+def fade_segment(layer, segment, end_frame, stop_on_note_change):
+   # The rest of fade() when the zone's outputs play fades themselves. With the fade
+   # sent, nothing changes here until it ends, so the scheduler sleeps through it.
+   # Returns None, having stopped the segment, if the zone needs compositing again first.
+   zone = layer.zone
+   zone.play_segment(segment)
+
+   while layer.frame < end_frame:
+      layer.next_change_frame = end_frame
+      yield
+
+      # e.g. a crossfade into a new mode, which took back the color where the segment got to
+      if zone.segment is not segment or not zone.direct:
+         if zone.segment is segment:
+            layer.color[0], layer.color[1], layer.color[2] = zone.stop_segment(zone.guitar.frame_clock.now())
+
+         return None
+      # if zone.segment is not segment or not zone.direct:
+
+      # The outputs hold where they got to, and the next fade starts from there
+      if stop_on_note_change and layer.note_changed:
+         layer.color[0], layer.color[1], layer.color[2] = zone.stop_segment(zone.guitar.frame_clock.now())
+         layer.changed    = True
+         layer.fade_frame = layer.frame
+         return False
+      # if stop_on_note_change and layer.note_changed:
+
+      # A new brightness replaces the segment with the same one at that brightness
+      if zone.DISPLAY_MANAGER__BRIGHTNESS != segment.brightness:
+         segment = segment.with_brightness(zone.DISPLAY_MANAGER__BRIGHTNESS)
+         zone.play_segment(segment)
+      # if zone.DISPLAY_MANAGER__BRIGHTNESS != segment.brightness:
+   # while layer.frame < end_frame:
+
+   # The outputs land on the end color themselves, so there's nothing to write
+   zone.segment = None
+
+   layer.color[0], layer.color[1], layer.color[2] = segment.end_color
+   zone.frame_buffer[:] = layer.color
+   layer.fade_frame     = end_frame
+
+   return True
+# def fade_segment(layer, segment, end_frame, stop_on_note_change):
+
+
+# }}}
+# {{{ def fade_fixed_point(layer, start_color, end_color, start_frame, num_frames, scale_to_midi_velocity, stop_on_note_change):
+def fade_fixed_point(layer, start_color, end_color, start_frame, num_frames, scale_to_midi_velocity, stop_on_note_change):
+   # The rest of fade() on the fixed-point path. Each frame is a lookup into the fade's
+   # path and integer scaling into layer.color_fixed, with no floats.
+   end_frame    = start_frame + num_frames
+   end_fixed    = fixed_point.new_color(*end_color)
+   path         = fixed_point.get_fade_path(fixed_point.new_color(*start_color), end_fixed, num_frames, layer.DISPLAY_MANAGER__COLOR_SPACE, layer.DISPLAY_MANAGER__EASING)
+   color_fixed  = layer.color_fixed
+   scale_shift  = fixed_point.SCALE_SHIFT
+   max_velocity = layer.MAX_VELOCITY
+
+   layer.fixed = True
+
+   while layer.frame < end_frame:
+      index = max(layer.frame - start_frame, 0) * 3
+      red   = path[index]
+      green = path[index + 1]
+      blue  = path[index + 2]
+
+      if scale_to_midi_velocity:
+         scale = fixed_point.get_velocity_scale(layer.max_key_velocity, max_velocity)
+
+         red   = (red   * scale) >> scale_shift
+         green = (green * scale) >> scale_shift
+         blue  = (blue  * scale) >> scale_shift
+      # if scale_to_midi_velocity:
+
+      color_fixed[0] = red
+      color_fixed[1] = green
+      color_fixed[2] = blue
+
+      layer.changed           = True
+      layer.next_change_frame = end_frame
+      yield
+
+      # The next fade starts from here
+      if stop_on_note_change and layer.note_changed:
+         layer.update_color_from_fixed()
+         layer.fixed      = False
+         layer.fade_frame = layer.frame
+         return False
+      # if stop_on_note_change and layer.note_changed:
+   # while layer.frame < end_frame:
+
+   # color catches up, exactly on the end color as the fixed-point path has it
+   color_fixed[:] = end_fixed
+   layer.update_color_from_fixed()
+
+   layer.fixed      = False
+   layer.changed    = True
+   layer.fade_frame = end_frame
+
+   return True
+# def fade_fixed_point(layer, start_color, end_color, start_frame, num_frames, scale_to_midi_velocity, stop_on_note_change):
+
+
+# }}}
+# {{{ def hold(layer, time_to_hold):
+def hold(layer, time_to_hold):
+   # Keep the color for a while, on the same frame schedule as the fades
+   start_frame = layer.fade_frame if layer.fade_frame is not None else layer.frame
+   end_frame   = start_frame + max(1, int(round(time_to_hold / layer.zone.guitar.frame_clock.frame_interval)))
+
+   while layer.frame < end_frame:
+      layer.next_change_frame = end_frame
+      yield
+   # while layer.frame < end_frame:
+
+   layer.fade_frame = end_frame
+# def hold(layer, time_to_hold):
+
+
+# }}}
+# {{{ def show(layer, color):
+def show(layer, color):
+   # Jump straight to a color
+   layer.color[0], layer.color[1], layer.color[2] = color
+   layer.changed = True
+# def show(layer, color):
+
+
+# }}}
+# {{{ def wait_for_note_change(layer):
+def wait_for_note_change(layer):
+   # Sit on the color until the lowest note in the layer's keys changes
+   while not layer.note_changed:
+      yield
+# def wait_for_note_change(layer):
+
+
+# }}}
+# {{{ def render_off(layer):
+def render_off(layer):
+   yield from fade(layer, (0.0, 0.0, 0.0), layer.DISPLAY_MANAGER__FLASH_INTERVAL)
+
+   # Nothing changes until the mode does
+   while True:
+      yield
+# def render_off(layer):
+
+
+# }}}
+# {{{ def render_glow_cycle(layer, scale_to_midi_velocity):
+def render_glow_cycle(layer, scale_to_midi_velocity):
+   palette = layer.get_palette(GLOW_CYCLE_COLOR_NAMES)
+
+   while True:
+      for color in palette:
+         yield from fade(layer, color, layer.DISPLAY_MANAGER__GLOW_COLOR_SPEED, scale_to_midi_velocity)
+   # while True:
+# def render_glow_cycle(layer, scale_to_midi_velocity):
+
+
+# }}}
+# {{{ def render_crazy_flash(layer, fade_between_colors):
+def render_crazy_flash(layer, fade_between_colors):
+   palette = layer.get_palette([name for name in sorted(layer.zone.guitar.colors) if name != 'black'])
+   colors  = layer.zone.guitar.patterns.get_color_sequence('crazy_flash:%s' % layer.zone.name, palette)
+
+   while True:
+      # Random colors from a sequence that never repeats one, nor starts on the current color
+      color = colors.next(tuple(layer.color))
+
+      if fade_between_colors:
+         yield from fade(layer, color, layer.DISPLAY_MANAGER__FLASH_INTERVAL)
+      else:
+         show(layer, color)
+         yield from hold(layer, layer.DISPLAY_MANAGER__FLASH_INTERVAL)
+      # else:
+   # while True:
+# def render_crazy_flash(layer, fade_between_colors):
+
+
+# }}}
+# {{{ def render_glow_lowest_note(layer):
+def render_glow_lowest_note(layer):
+   palette      = layer.get_palette(NOTE_COLOR_NAMES)
+   fade_quickly = True
+
+   while True:
+      layer.note_changed = False
+
+      if layer.lowest_note_on is None:
+         color = (0.0, 0.0, 0.0)
+      else:
+         color = palette[layer.lowest_note_on % len(palette)]
+
+      min_color, max_color = get_glow_boundaries(color, layer.GLOW_COLOR_DIFFUSION)
+
+      # Fade quickly to the new color when we've just started or the note changed
+      time_to_fade = layer.DISPLAY_MANAGER__FLASH_INTERVAL if fade_quickly else layer.DISPLAY_MANAGER__GLOW_COLOR_SPEED
+      fade_quickly = True
+
+      if not (yield from fade(layer, min_color, time_to_fade, False, True)): continue
+      if not (yield from fade(layer, max_color, layer.DISPLAY_MANAGER__GLOW_COLOR_SPEED, False, True)): continue
+
+      fade_quickly = False
+   # while True:
+# def render_glow_lowest_note(layer):
+
+
+# }}}
+# {{{ def render_flash_lowest_note(layer):
+def render_flash_lowest_note(layer):
+   palette = layer.get_palette(NOTE_COLOR_NAMES)
+
+   while True:
+      layer.note_changed = False
+
+      if layer.lowest_note_on is None:
+         color = (0.0, 0.0, 0.0)
+      else:
+         color = palette[layer.lowest_note_on % len(palette)]
+
+      if not (yield from fade(layer, color, layer.DISPLAY_MANAGER__FLASH_INTERVAL, False, True)): continue
+      if not (yield from fade(layer, (0.0, 0.0, 0.0), layer.DISPLAY_MANAGER__FLASH_NOTE_DURATION, False, True)): continue
+
+      yield from wait_for_note_change(layer)
+
+      # We sat idle, so the next fade starts now rather than where the last one ended
+      layer.fade_frame = None
+   # while True:
+# def render_flash_lowest_note(layer):
+
+
+# }}}
+
+# {{{ def get_glow_boundaries(color, diffusion):
+def get_glow_boundaries(color, diffusion):
+   # The colors a glow swings between, diffusion (percent) either side of color. Black stays pure black.
+   if color == (0.0, 0.0, 0.0):
+      return (color, color)
+
+   min_color = (max(color[0] - diffusion, 0.0), max(color[1] - diffusion, 0.0), max(color[2] - diffusion, 0.0))
+   max_color = (min(color[0] + diffusion, 100.0), min(color[1] + diffusion, 100.0), min(color[2] + diffusion, 100.0))
+
+   return (min_color, max_color)
+# def get_glow_boundaries(color, diffusion):
+
+
+# }}}
+# {{{ def color_to_tuple(color):
+def color_to_tuple(color):
+   return (float(color['red']), float(color['green']), float(color['blue']))
+# def color_to_tuple(color):
+
+
+# }}}
@@ -0,0 +1,123 @@
+#!/usr/bin/python
+
+# Runs a cluster leader and several followers as separate processes on localhost.
+# Each follower's local clock is given its own offset and drift; once locked, it
+# reports how far its frame ticks land from the leader's frame boundaries. All
+# processes share the host's monotonic clock, so the error can be measured exactly.
+#
+#    ./bench_cluster_sync.py [followers] [seconds] [address]
+
+
+import sys
+import time
+import threading
+import multiprocessing
+
+from acrylic_guitar import frame_clock
+from acrylic_guitar import cluster_sync
+
+
+num_followers = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+duration      = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+address       = sys.argv[3] if len(sys.argv) > 3 else cluster_sync.CLUSTER_ADDRESS
+
+FRAME_INTERVAL = 0.01
+PORT           = cluster_sync.CLUSTER_PORT + 1
+
+
+# {{{ def run_leader(stop_event):
+def run_leader(stop_event):
+   clock = frame_clock.FrameClock(FRAME_INTERVAL)
+
+   # {{{ def get_state():
+   def get_state():
+      state = cluster_sync.ClusterState()
+      state.frame_interval = FRAME_INTERVAL
+      state.display_mode   = 1
+      return state
+   # def get_state():
+
+
+   # }}}
+
+   leader = cluster_sync.ClusterLeader(get_state, clock, address, PORT)
+   leader.run(stop_event)
+# def run_leader(stop_event):
+
+
+# }}}
+# {{{ def run_follower(number, results, stop_event):
+def run_follower(number, results, stop_event):
+   # Skew this follower's clock: seconds of offset and up to 200ppm of drift
+   offset = 3.0 * (number + 1)
+   drift  = 0.0002 * ((number % 3) - 1)
+   origin = time.monotonic()
+
+   # {{{ def local_clock():
+   def local_clock():
+      now = time.monotonic()
+      return now + offset + (now - origin) * drift
+   # def local_clock():
+
+
+   # }}}
+
+   follower = cluster_sync.ClusterFollower(lambda state: None, address, PORT, local_clock)
+   listener = threading.Thread(target=follower.run, args=(stop_event,))
+   listener.daemon = True
+   listener.start()
+
+   clock = frame_clock.FrameClock(FRAME_INTERVAL, follower.leader_time)
+
+   # Let the filter settle before measuring
+   while not follower.is_locked():
+      time.sleep(FRAME_INTERVAL)
+   time.sleep(1.0)
+
+   errors = []
+   end    = time.monotonic() + duration
+
+   while time.monotonic() < end:
+      frame = clock.wait_for_next_frame()
+      woke  = time.monotonic()
+
+      # The leader runs on the true monotonic clock, so this is the phase error
+      errors.append(woke - (frame * FRAME_INTERVAL))
+   # while time.monotonic() < end:
+
+   results.put((number, offset, drift, follower.packets_received, errors))
+# def run_follower(number, results, stop_event):
+
+
+# }}}
+
+
+stop_event = multiprocessing.Event()
+results    = multiprocessing.Queue()
+
+leader    = multiprocessing.Process(target=run_leader, args=(stop_event,))
+followers = [multiprocessing.Process(target=run_follower, args=(number, results, stop_event)) for number in range(num_followers)]
+
+leader.start()
+for follower in followers:
+   follower.start()
+
+try:
+   reports = sorted([results.get(timeout=duration + 30) for follower in followers])
+finally:
+   stop_event.set()
+
+   for process in followers + [leader]:
+      process.join()
+# finally:
+
+
+print("%d followers, %0.1f sec of %0.0f ms frames via %s" % (num_followers, duration, FRAME_INTERVAL * 1000, address))
+
+for number, offset, drift, packets, errors in reports:
+   errors.sort()
+   print("   follower %d (offset %+0.1f sec, drift %+d ppm, %d packets): %d frames, phase error median %0.3f ms, p99 %0.3f ms, max %0.3f ms" % (
+      number, offset, drift * 1e6, packets, len(errors),
+      errors[len(errors) // 2] * 1000, errors[int(len(errors) * 0.99)] * 1000, errors[-1] * 1000
+   ))
+# for number, offset, drift, packets, errors in reports:
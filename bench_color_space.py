@@ -0,0 +1,117 @@
+#!/usr/bin/python
+
+# Compares frames per second of a glow cycle fading in each color space and with
+# easing, against the per-frame RGB interpolation fades used before, and how long
+# working out a fade's path takes when it's not already cached.
+#
+#    ./bench_color_space.py [frames]
+
+
+import sys
+import time
+
+from acrylic_guitar import zones
+from acrylic_guitar import color_space
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+num_frames = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+
+# {{{ def lerp_fade(layer, end_color, time_to_fade):
+def lerp_fade(layer, end_color, time_to_fade):
+   # A fade as zones.fade() did it before: interpolating in RGB on every frame
+   color = layer.color
+   start_red, start_green, start_blue = color
+
+   red_delta   = end_color[0] - start_red
+   green_delta = end_color[1] - start_green
+   blue_delta  = end_color[2] - start_blue
+
+   start_frame = layer.fade_frame
+   num_frames  = max(1, int(round(time_to_fade / layer.zone.guitar.frame_clock.frame_interval)))
+   end_frame   = start_frame + num_frames
+
+   while layer.frame < end_frame:
+      progress = float(max(layer.frame - start_frame, 0)) / num_frames
+
+      color[0] = start_red   + (red_delta   * progress)
+      color[1] = start_green + (green_delta * progress)
+      color[2] = start_blue  + (blue_delta  * progress)
+
+      layer.changed = True
+      yield
+   # while layer.frame < end_frame:
+
+   color[0], color[1], color[2] = end_color
+   layer.changed    = True
+   layer.fade_frame = end_frame
+# def lerp_fade(layer, end_color, time_to_fade):
+
+
+# }}}
+# {{{ def lerp_glow_cycle(layer):
+def lerp_glow_cycle(layer):
+   palette = layer.get_palette(zones.GLOW_CYCLE_COLOR_NAMES)
+
+   while True:
+      for color in palette:
+         yield from lerp_fade(layer, color, layer.DISPLAY_MANAGER__GLOW_COLOR_SPEED)
+   # while True:
+# def lerp_glow_cycle(layer):
+
+
+# }}}
+# {{{ def measure(space, easing):
+def measure(space, easing):
+   # Frames per second stepping a glow cycle, or the old one if space is None
+   ag   = AcrylicGuitar()
+   zone = zones.Zone(ag, 'bench', ['null'])
+
+   layer = zone.add_layer(settings={'DISPLAY_MANAGER__COLOR_SPACE': space or 'rgb', 'DISPLAY_MANAGER__EASING': easing})
+   layer.fade_frame = 0
+
+   renderer = lerp_glow_cycle(layer) if space is None else zones.render_glow_cycle(layer, False)
+
+   start = time.perf_counter()
+
+   for frame in range(num_frames):
+      layer.frame = frame
+      next(renderer)
+   # for frame in range(num_frames):
+
+   return num_frames / (time.perf_counter() - start)
+# def measure(space, easing):
+
+
+# }}}
+# {{{ def measure_path(space, easing):
+def measure_path(space, easing):
+   # Milliseconds to work out a glow fade's path from scratch
+   num_fade_frames = int(round(1.5 / 0.01))
+   runs            = 50
+
+   start = time.perf_counter()
+
+   for run in range(runs):
+      color_space._path_cache.clear()
+      color_space.get_fade_path((100.0, 0.0, 0.0), (0.0, 0.0, 100.0), num_fade_frames, space, easing)
+   # for run in range(runs):
+
+   return (time.perf_counter() - start) / runs * 1000
+# def measure_path(space, easing):
+
+
+# }}}
+
+
+print("glow cycle, %d frames per run" % num_frames)
+print("   %-20s %14s %16s" % ('fade', 'frames/sec', 'path build (ms)'))
+print("   %-20s %14.0f %16s" % ('rgb, per frame (old)', measure(None, 'linear'), '-'))
+
+for easing in ['linear', 'ease_in_out']:
+   for space in color_space.COLOR_SPACES:
+      name = space if easing == 'linear' else '%s, %s' % (space, easing)
+      print("   %-20s %14.0f %16.3f" % (name, measure(space, easing), measure_path(space, easing)))
+   # for space in color_space.COLOR_SPACES:
+# for easing in ['linear', 'ease_in_out']:
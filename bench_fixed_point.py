@@ -0,0 +1,150 @@
+#!/usr/bin/python
+
+# Reports nanoseconds per frame for the display manager's fades on the float path
+# and the fixed-point path, rendering the random glow's frames one after another to
+# the null backend, so nothing sleeps. Then the same for just each path's per-frame
+# render work (the color step and the output write), without the layers, key stats
+# and metrics that both share.
+#
+#    ./bench_fixed_point.py [fades]
+
+
+import sys
+import time
+
+from acrylic_guitar import zones
+from acrylic_guitar import fixed_point
+from acrylic_guitar import color_space
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+
+
+num_fades = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+
+# {{{ def measure(fixed, space, scale_to_midi_velocity):
+def measure(fixed, space, scale_to_midi_velocity):
+   ag = AcrylicGuitar()
+   ag.OUTPUT_BACKENDS = ['null']
+   ag.DISPLAY_MANAGER__FIXED_POINT  = fixed
+   ag.DISPLAY_MANAGER__COLOR_SPACE = space
+   ag.display_mode = DisplayMode.random_glow_midi_velocity if scale_to_midi_velocity else DisplayMode.random_glow
+
+   with ag.midi_data_lock:
+      ag.keys[60] = 100
+      ag.update_key_stats()
+   # with ag.midi_data_lock:
+
+   # Start the outputs and the mode as the display manager would
+   scheduler = zones.ZoneScheduler(ag, zones.create_zones(ag))
+   scheduler.start()
+   output = ag.outputs[0]
+
+   first_frame = ag.mode_epoch_frame
+   num_frames  = num_fades * int(round(ag.DISPLAY_MANAGER__GLOW_COLOR_SPEED / ag.frame_clock.frame_interval))
+
+   start = time.perf_counter_ns()
+
+   for frame in range(first_frame, first_frame + num_frames):
+      scheduler.render_frame(frame)
+
+   elapsed = time.perf_counter_ns() - start
+
+   ag.cleanup()
+
+   return float(elapsed) / output.frames_written
+# def measure(fixed, space, scale_to_midi_velocity):
+
+
+# }}}
+# {{{ def measure_render(fixed, space, scale_to_midi_velocity):
+def measure_render(fixed, space, scale_to_midi_velocity):
+   # The body of each path's fade loop, minus the frame clock and metrics
+   ag = AcrylicGuitar()
+   ag.OUTPUT_BACKENDS = ['null']
+   ag.max_key_velocity = 100
+
+   scheduler = zones.ZoneScheduler(ag, zones.create_zones(ag))
+   scheduler.start()
+   output = ag.outputs[0]
+
+   num_frames = 150
+   runs       = num_fades * num_frames // 10
+
+   start_color = ag.colors['red']
+   end_color   = ag.colors['blue']
+
+   if fixed:
+      path = fixed_point.get_fade_path(
+         fixed_point.new_color(start_color['red'], start_color['green'], start_color['blue']),
+         fixed_point.new_color(end_color['red'], end_color['green'], end_color['blue']), num_frames, space
+      )
+      scale_shift = fixed_point.SCALE_SHIFT
+
+      start = time.perf_counter_ns()
+
+      for run in range(runs):
+         index = (run % num_frames) * 3
+         red   = path[index]
+         green = path[index + 1]
+         blue  = path[index + 2]
+
+         if scale_to_midi_velocity:
+            scale = fixed_point.get_velocity_scale(ag.max_key_velocity, ag.MAX_VELOCITY)
+
+            red   = (red   * scale) >> scale_shift
+            green = (green * scale) >> scale_shift
+            blue  = (blue  * scale) >> scale_shift
+         # if scale_to_midi_velocity:
+
+         output.write_fixed(red, green, blue)
+      # for run in range(runs):
+   else:
+      path = color_space.get_fade_path(
+         (start_color['red'], start_color['green'], start_color['blue']),
+         (end_color['red'], end_color['green'], end_color['blue']), num_frames, space
+      )
+
+      color = scheduler.zones[0].layers[0].color
+
+      start = time.perf_counter_ns()
+
+      for run in range(runs):
+         color[0], color[1], color[2] = path[run % num_frames]
+
+         if scale_to_midi_velocity:
+            scale = min(max(float(ag.max_key_velocity) / ag.MAX_VELOCITY, 0.5), 1.0)
+
+            color[0] *= scale
+            color[1] *= scale
+            color[2] *= scale
+         # if scale_to_midi_velocity:
+
+         output.write(color[0], color[1], color[2])
+      # for run in range(runs):
+   # else:
+
+   elapsed = time.perf_counter_ns() - start
+
+   ag.cleanup()
+
+   return float(elapsed) / runs
+# def measure_render(fixed, space, scale_to_midi_velocity):
+
+
+# }}}
+
+
+print("%d fades per run" % num_fades)
+print("      %-25s %12s %12s %8s" % ('fade', 'float ns', 'fixed ns', 'speedup'))
+
+for title, function in [('whole frame', measure), ('render work only', measure_render)]:
+   print("   %s" % title)
+
+   for space, scale_to_midi_velocity in [('rgb', False), ('rgb', True), ('oklch', False)]:
+      float_ns = function(False, space, scale_to_midi_velocity)
+      fixed_ns = function(True , space, scale_to_midi_velocity)
+
+      name = space + (', velocity scaled' if scale_to_midi_velocity else '')
+      print("      %-25s %12.0f %12.0f %7.2fx" % (name, float_ns, fixed_ns, float_ns / fixed_ns))
+   # for space, scale_to_midi_velocity in [...]:
+# for title, function in [...]:
@@ -0,0 +1,99 @@
+#!/usr/bin/python
+
+# Runs the display manager for a few seconds in each of: off (sitting on black), a
+# glow cycle with no notes, a glow cycle with a note held, and a glow cycle whose
+# output takes 15 ms a frame to write, with the adaptive frame rate on and off.
+# Reports frames written per second, CPU used, frames dropped to overruns, and the
+# degrade level it ended on.
+#
+#    ./bench_frame_rate.py [seconds]
+
+
+import sys
+import time
+import threading
+
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+
+SCENARIOS = [
+   ('off'           , DisplayMode.off        , False, False),
+   ('glow, no notes', DisplayMode.random_glow, False, False),
+   ('glow, note on' , DisplayMode.random_glow, True , False),
+   ('glow, overload', DisplayMode.random_glow, True , True ),
+]
+
+
+# {{{ def measure(display_mode, note_on, overloaded, adaptive):
+def measure(display_mode, note_on, overloaded, adaptive):
+   ag = AcrylicGuitar()
+   ag.OUTPUT_BACKENDS = ['null']
+   ag.DISPLAY_MANAGER__ADAPTIVE_FRAME_RATE = adaptive
+   ag.display_mode = display_mode
+
+   if note_on:
+      with ag.midi_data_lock:
+         ag.keys[48] = 100
+         ag.update_key_stats()
+      # with ag.midi_data_lock:
+   # if note_on:
+
+   stop_event = threading.Event()
+   thread     = threading.Thread(target=ag.display_manager, args=(stop_event,))
+   thread.start()
+
+   # Let it settle into the mode before measuring
+   time.sleep(0.5)
+
+   output = ag.outputs[0]
+
+   if overloaded:
+      write = output.write
+
+      # {{{ def slow_write(red, green, blue):
+      def slow_write(red, green, blue):
+         time.sleep(0.015)
+         write(red, green, blue)
+      # def slow_write(red, green, blue):
+
+
+      # }}}
+
+      output.write = slow_write
+   # if overloaded:
+
+   frames_written = output.frames_written
+   dropped        = ag.metric_frames_dropped.value
+   cpu_start      = time.process_time()
+   start          = time.perf_counter()
+
+   time.sleep(duration)
+
+   elapsed  = time.perf_counter() - start
+   cpu_used = time.process_time() - cpu_start
+   frames   = output.frames_written - frames_written
+   dropped  = ag.metric_frames_dropped.value - dropped
+
+   stop_event.set()
+   thread.join()
+   ag.cleanup()
+
+   return (frames / elapsed, 100.0 * cpu_used / elapsed, dropped / elapsed, ag.frame_rate.degrade_level)
+# def measure(display_mode, note_on, overloaded, adaptive):
+
+
+# }}}
+
+
+print("%0.1f sec per run" % duration)
+print("   %-16s %-9s %10s %8s %12s %8s" % ('scenario', 'rate', 'writes/s', 'CPU %', 'dropped/s', 'degrade'))
+
+for name, display_mode, note_on, overloaded in SCENARIOS:
+   for adaptive in [False, True]:
+      writes, cpu, dropped, degrade_level = measure(display_mode, note_on, overloaded, adaptive)
+
+      print("   %-16s %-9s %10.1f %7.1f%% %12.1f %8d" % (name, 'adaptive' if adaptive else 'fixed', writes, cpu, dropped, degrade_level))
+   # for adaptive in [False, True]:
+# for name, display_mode, note_on, overloaded in SCENARIOS:
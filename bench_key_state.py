@@ -0,0 +1,153 @@
+#!/usr/bin/python
+
+# Plays a pedalled passage into the guitar's MIDI handling: broken chords of short
+# notes, the sustain pedal changed every bar with some half-pedal wobble on CC 64,
+# and the sostenuto pedal holding a bass note over a few bars. Runs it with the
+# pedals followed and with them ignored, and reports how often the key stats were
+# recalculated, how often the lowest note changed, how much of the time nothing
+# looked held although notes were sounding, and the time per message. Then times
+# a pedal release letting go of many keys at once.
+#
+#    ./bench_key_state.py [bars]
+
+
+import sys
+import time
+import random
+
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+bars = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+BAR_LENGTH     = 2.0
+NOTES_PER_BAR  = 16
+SUSTAIN_CC     = 64
+SOSTENUTO_CC   = 66
+
+
+# {{{ def get_passage(seed = 1):
+def get_passage(seed = 1):
+   # (time, message data) in time order
+   rng     = random.Random(seed)
+   events  = []
+
+   for bar in range(bars):
+      start = bar * BAR_LENGTH
+
+      # Change pedal: up and straight back down at the start of each bar, wobbling a bit
+      events.append((start, [176, SUSTAIN_CC, 0]))
+      events.append((start + 0.05, [176, SUSTAIN_CC, 127]))
+      for wobble in range(4):
+         events.append((start + rng.uniform(0.1, BAR_LENGTH), [176, SUSTAIN_CC, rng.randrange(70, 128)]))
+
+      # A bass note held over four bars with the sostenuto pedal
+      if bar % 4 == 0:
+         bass = rng.randrange(28, 40)
+         events.append((start, [144, bass, 90]))
+         events.append((start + 0.01, [176, SOSTENUTO_CC, 127]))
+         events.append((start + 0.2, [144, bass, 0]))
+      elif bar % 4 == 3:
+         events.append((start + BAR_LENGTH - 0.01, [176, SOSTENUTO_CC, 0]))
+      # elif bar % 4 == 3:
+
+      root = rng.randrange(48, 60)
+      for step in range(NOTES_PER_BAR):
+         key      = root + [0, 4, 7, 12][step % 4] + (12 if step >= NOTES_PER_BAR // 2 else 0)
+         note_on  = start + 0.06 + (step * (BAR_LENGTH - 0.1) / NOTES_PER_BAR)
+
+         events.append((note_on, [144, key, rng.randrange(40, 120)]))
+         events.append((note_on + rng.uniform(0.03, 0.08), [144, key, 0]))
+      # for step in range(NOTES_PER_BAR):
+   # for bar in range(bars):
+
+   events.sort(key=lambda event: event[0])
+
+   return events
+# def get_passage(seed = 1):
+
+
+# }}}
+# {{{ def play(events, follow_pedals):
+def play(events, follow_pedals):
+   ag = AcrylicGuitar()
+   if not follow_pedals:
+      ag.MIDI_READER__SUSTAIN_CC   = None
+      ag.MIDI_READER__SOSTENUTO_CC = None
+      events = [event for event in events if event[1][0] != 176]
+   # if not follow_pedals:
+
+   apply_midi_message = ag._AcrylicGuitar__apply_midi_message
+   lock_wait_metric   = ag.metric_midi_lock_wait.labels('bench')
+
+   lowest_changes = 0
+   dark_time      = 0.0
+   last_time      = 0.0
+   elapsed        = 0
+
+   for event_time, data in events:
+      # Time with nothing held, weighed by how long it lasted
+      if not ag.max_key_velocity:
+         dark_time += event_time - last_time
+      last_time = event_time
+
+      lowest_note_on = ag.lowest_note_on
+
+      start = time.perf_counter_ns()
+      apply_midi_message(data, lock_wait_metric)
+      elapsed += time.perf_counter_ns() - start
+
+      if ag.lowest_note_on != lowest_note_on:
+         lowest_changes += 1
+   # for event_time, data in events:
+
+   return (len(events), ag.key_state_version, lowest_changes, 100.0 * dark_time / last_time, elapsed / len(events))
+# def play(events, follow_pedals):
+
+
+# }}}
+
+
+events = get_passage()
+
+print("%d bars, %d notes a bar" % (bars, NOTES_PER_BAR))
+print("   %-16s %10s %12s %14s %10s %10s" % ('pedals', 'messages', 'recalcs', 'lowest changes', 'dark %', 'ns/msg'))
+for name, follow_pedals in [('ignored', False), ('followed', True)]:
+   messages, recalcs, lowest_changes, dark, message_time = play(events, follow_pedals)
+
+   print("   %-16s %10d %12d %14d %10.1f %10.0f" % (name, messages, recalcs, lowest_changes, dark, message_time))
+# for name, follow_pedals in [('ignored', False), ('followed', True)]:
+print("")
+
+# Letting go of the sustain pedal over 60 keys, against zeroing each of them one at a time
+ag = AcrylicGuitar()
+lock_wait_metric = ag.metric_midi_lock_wait.labels('bench')
+apply_midi_message = ag._AcrylicGuitar__apply_midi_message
+
+release_time = 0
+single_time  = 0
+for repeat in range(200):
+   apply_midi_message([176, SUSTAIN_CC, 127], lock_wait_metric)
+   for key in range(30, 90):
+      apply_midi_message([144, key, 100], lock_wait_metric)
+      apply_midi_message([144, key, 0], lock_wait_metric)
+   # for key in range(30, 90):
+
+   start = time.perf_counter_ns()
+   apply_midi_message([176, SUSTAIN_CC, 0], lock_wait_metric)
+   release_time += time.perf_counter_ns() - start
+
+   ag.MIDI_READER__SUSTAIN_CC = None
+   for key in range(30, 90):
+      apply_midi_message([144, key, 100], lock_wait_metric)
+
+   start = time.perf_counter_ns()
+   for key in range(30, 90):
+      apply_midi_message([144, key, 0], lock_wait_metric)
+   single_time += time.perf_counter_ns() - start
+   ag.MIDI_READER__SUSTAIN_CC = SUSTAIN_CC
+# for repeat in range(200):
+
+print("stopping 60 keys")
+print("   %-32s %8.1f us" % ('one pedal release', release_time / 200 / 1000.0))
+print("   %-32s %8.1f us" % ('60 note offs', single_time / 200 / 1000.0))
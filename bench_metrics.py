@@ -0,0 +1,35 @@
+#!/usr/bin/python
+
+# Measures what it costs to record a sample, to check metrics can stay on all the
+# time, and shows the exported text for a handful of samples.
+#
+#    ./bench_metrics.py [samples]
+
+
+import sys
+import timeit
+
+from acrylic_guitar import metrics
+
+
+num_samples = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+
+registry  = metrics.MetricsRegistry()
+counter   = registry.counter('bench_events_total', 'Events counted', ('interface',)).labels(0)
+gauge     = registry.gauge('bench_mode', 'Current mode')
+histogram = registry.histogram('bench_wait_seconds', 'Waits observed', metrics.TIMING_BUCKETS)
+
+
+for name, statement in [
+   ('Counter.inc()'      , 'counter.inc()'),
+   ('Gauge.set()'        , 'gauge.set(3)'),
+   ('Histogram.observe()', 'histogram.observe(0.0003)'),
+]:
+   elapsed = min(timeit.repeat(statement, globals=globals(), number=num_samples, repeat=5))
+   print("%-20s %6.1f ns/sample" % (name, elapsed / num_samples * 1e9))
+# for name, statement in [...]:
+
+
+print("")
+print(registry.render())
@@ -0,0 +1,137 @@
+#!/usr/bin/python
+
+# Simulates the MIDI reader against a PortMidi clock that drifts from ours, with
+# notes arriving after a little USB delay and the reader oversleeping by a varying
+# amount (and now and then by a lot), then reports how long after each note was
+# played it was applied: applying notes as they're read, and holding them back to
+# a few target latencies by their timestamps.
+#
+#    ./bench_midi_latency.py [seconds]
+
+
+import sys
+import random
+
+from acrylic_guitar import midi_timing
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 300.0
+
+# The MIDI clock runs this much slower than ours, and started this long before
+MIDI_CLOCK_DRIFT  = 0.00008
+MIDI_CLOCK_OFFSET = 3.217
+
+
+# {{{ class SimulatedTime:
+class SimulatedTime:
+
+
+   # {{{ def __init__(self):
+   def __init__(self):
+      self.now = 1000.0
+   # def __init__(self):
+
+
+   # }}}
+   # {{{ def __call__(self):
+   def __call__(self):
+      return self.now
+   # def __call__(self):
+
+
+   # }}}
+   # {{{ def midi_time(self):
+   def midi_time(self):
+      return self.to_midi(self.now)
+   # def midi_time(self):
+
+
+   # }}}
+   # {{{ def to_midi(self, local):
+   def to_midi(self, local):
+      # PortMidi's clock, in whole milliseconds
+      return int((local - 1000.0 + MIDI_CLOCK_OFFSET) * (1.0 - MIDI_CLOCK_DRIFT) * 1000)
+   # def to_midi(self, local):
+
+
+   # }}}
+# class SimulatedTime:
+
+
+# }}}
+# {{{ def simulate(target_latency, interval, seed = 1):
+def simulate(target_latency, interval, seed = 1):
+   rng   = random.Random(seed)
+   clock = SimulatedTime()
+
+   midi_clock  = midi_timing.MidiClock(clock.midi_time, 0.5, time_source=clock)
+   event_queue = midi_timing.MidiEventQueue(midi_clock, target_latency)
+
+   # Notes played, as (time played, time it reaches PortMidi's buffer)
+   notes     = []
+   note_time = clock.now + 1.0
+   while note_time < clock.now + duration:
+      notes.append((note_time, note_time + rng.uniform(0.0005, 0.003)))
+      note_time += rng.uniform(0.03, 0.15)
+   # while note_time < clock.now + duration:
+
+   latencies = []
+   late      = 0
+   next_note = 0
+
+   while next_note < len(notes) or event_queue.events:
+      midi_clock.sample()
+
+      # Read everything that's arrived
+      while next_note < len(notes) and notes[next_note][1] <= clock.now:
+         played = notes[next_note][0]
+         if not event_queue.push([[0x90, 60, 100, 0], clock.to_midi(played)], clock.now):
+            late += 1
+
+         # Remember when it was really played, to measure against
+         event_queue.events[-1] = event_queue.events[-1][:2] + (played,)
+         next_note += 1
+      # while next_note < len(notes) and notes[next_note][1] <= clock.now:
+
+      event = event_queue.pop_due(clock.now)
+      while event:
+         latencies.append(clock.now - event[2])
+         event = event_queue.pop_due(clock.now)
+      # while event:
+
+      # Work, then sleep, then oversleep: usually a little, once in a while by 15 ms
+      clock.now += 0.0002
+      clock.now += event_queue.get_sleep_time(clock.now, interval)
+      clock.now += rng.uniform(0.0001, 0.002) + (0.015 if rng.random() < 0.01 else 0.0)
+   # while next_note < len(notes) or event_queue.events:
+
+   return (latencies, late, midi_clock.get_drift())
+# def simulate(target_latency, interval, seed = 1):
+
+
+# }}}
+
+
+interval = AcrylicGuitar().MIDI_READER__INTERVAL
+
+print("%0.0f sec of notes, %0.0f ms polling, MIDI clock %0.0f ppm slow" % (duration, interval * 1000, MIDI_CLOCK_DRIFT * 1e6))
+print("   %-16s %8s %8s %8s %8s %8s %7s %11s" % ('target', 'mean ms', 'std ms', 'p50 ms', 'p99 ms', 'max ms', 'late %', 'drift ppm'))
+
+for target_latency in [0.0, 0.01, 0.02, 0.03]:
+   latencies, late, drift = simulate(target_latency, interval)
+   latencies.sort()
+
+   count = len(latencies)
+   mean  = sum(latencies) / count
+   std   = (sum([(latency - mean) ** 2 for latency in latencies]) / count) ** 0.5
+
+   # With no target, every event counts as late
+   name     = '%0.0f ms' % (target_latency * 1000) if target_latency else 'none (as read)'
+   late_pct = '%6.2f%%' % (100.0 * late / count) if target_latency else '-'
+
+   print("   %-16s %8.2f %8.2f %8.2f %8.2f %8.2f %7s %11.1f" % (
+      name, mean * 1000, std * 1000, latencies[count // 2] * 1000, latencies[int(count * 0.99)] * 1000, latencies[-1] * 1000,
+      late_pct, drift
+   ))
+# for target_latency in [0.0, 0.01, 0.02, 0.03]:
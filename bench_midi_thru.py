@@ -0,0 +1,245 @@
+#!/usr/bin/python
+
+# Loops MIDI through the reader in-process: a player thread plays notes into a fake
+# pygame.midi input at random intervals, the MIDI reader runs as it would on a guitar
+# with MIDI thru on, and a fake output notes when each note is passed on. Reports
+# how long after being played the notes went out, and the CPU the reader used,
+# polling at the reader's own interval and with the thru poll cap, next to no thru
+# at all. Then times sending the guitar's state.
+#
+#    ./bench_midi_thru.py [seconds]
+
+
+import sys
+import time
+import random
+import threading
+import collections
+
+from acrylic_guitar import midi_thru
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+
+
+# {{{ class FakeMidi:
+class FakeMidi:
+   # Enough of pygame.midi for the reader: one input to play into and one output
+
+
+   # {{{ def __init__(self):
+   def __init__(self):
+      self.started = time.monotonic()
+      self.input   = FakeInput()
+      self.output  = FakeOutput()
+   # def __init__(self):
+
+
+   # }}}
+   # {{{ def get_count(self):
+   def get_count(self):
+      return 2
+   # def get_count(self):
+
+
+   # }}}
+   # {{{ def get_device_info(self, i):
+   def get_device_info(self, i):
+      return [(b'ALSA', b'Keyboard', 1, 0, 0), (b'ALSA', b'Thru', 0, 1, 0)][i]
+   # def get_device_info(self, i):
+
+
+   # }}}
+   # {{{ def Input(self, i, buffer_size):
+   def Input(self, i, buffer_size):
+      return self.input
+   # def Input(self, i, buffer_size):
+
+
+   # }}}
+   # {{{ def Output(self, i, latency):
+   def Output(self, i, latency):
+      return self.output
+   # def Output(self, i, latency):
+
+
+   # }}}
+   # {{{ def time(self):
+   def time(self):
+      return int((time.monotonic() - self.started) * 1000)
+   # def time(self):
+
+
+   # }}}
+# class FakeMidi:
+
+
+# }}}
+# {{{ class FakeInput:
+class FakeInput:
+
+
+   # {{{ def __init__(self):
+   def __init__(self):
+      self.messages = collections.deque()
+   # def __init__(self):
+
+
+   # }}}
+   # {{{ def poll(self):
+   def poll(self):
+      return bool(self.messages)
+   # def poll(self):
+
+
+   # }}}
+   # {{{ def read(self, count):
+   def read(self, count):
+      messages = []
+      while self.messages and len(messages) < count:
+         messages.append(self.messages.popleft())
+
+      return messages
+   # def read(self, count):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      pass
+   # def close(self):
+
+
+   # }}}
+# class FakeInput:
+
+
+# }}}
+# {{{ class FakeOutput:
+class FakeOutput:
+   # Knows when each message was played, and notes how long it took to get here
+
+
+   # {{{ def __init__(self):
+   def __init__(self):
+      self.played    = {}
+      self.latencies = []
+      self.sysex     = 0
+   # def __init__(self):
+
+
+   # }}}
+   # {{{ def write(self, messages):
+   def write(self, messages):
+      now = time.perf_counter()
+
+      for message in messages:
+         played = self.played.pop(id(message), None)
+         if played is not None:
+            self.latencies.append(now - played)
+      # for message in messages:
+   # def write(self, messages):
+
+
+   # }}}
+   # {{{ def write_sys_ex(self, when, message):
+   def write_sys_ex(self, when, message):
+      self.sysex += 1
+   # def write_sys_ex(self, when, message):
+
+
+   # }}}
+   # {{{ def close(self):
+   def close(self):
+      pass
+   # def close(self):
+
+
+   # }}}
+# class FakeOutput:
+
+
+# }}}
+# {{{ def measure(thru, poll_interval):
+def measure(thru, poll_interval):
+   fake_midi = FakeMidi()
+
+   ag = AcrylicGuitar()
+   ag._AcrylicGuitar__pygame_midi = fake_midi
+   ag.MIDI_THRU__POLL_INTERVAL    = poll_interval
+
+   if thru:
+      ag.midi_thru = midi_thru.MidiThru(ag, fake_midi.output)
+
+   stop_event = threading.Event()
+   reader     = threading.Thread(target=ag.midi_reader, args=(0, stop_event))
+
+   cpu_start = time.process_time()
+   reader.start()
+
+   # Play, waiting a random 5 to 50 ms between notes
+   rng = random.Random(1)
+   end = time.perf_counter() + duration
+   while time.perf_counter() < end:
+      message = [[0x90, rng.randrange(36, 84), rng.randrange(1, 128), 0], fake_midi.time()]
+
+      fake_midi.output.played[id(message)] = time.perf_counter()
+      fake_midi.input.messages.append(message)
+
+      time.sleep(rng.uniform(0.005, 0.05))
+   # while time.perf_counter() < end:
+
+   stop_event.set()
+   reader.join()
+
+   return (sorted(fake_midi.output.latencies), 100.0 * (time.process_time() - cpu_start) / duration)
+# def measure(thru, poll_interval):
+
+
+# }}}
+
+
+interval = AcrylicGuitar().MIDI_READER__INTERVAL
+cap      = AcrylicGuitar().MIDI_THRU__POLL_INTERVAL
+
+print("%0.0f sec of notes, looped through the MIDI reader" % duration)
+print("   %-24s %8s %8s %8s %8s %8s" % ('polling', 'notes', 'mean ms', 'p99 ms', 'max ms', 'CPU %'))
+
+for name, thru, poll_interval in [
+   ('no thru', False, cap),
+   ('thru, %0.0f ms' % (interval * 1000), True, interval),
+   ('thru, %0.1f ms cap' % (cap * 1000), True, cap),
+]:
+   latencies, cpu = measure(thru, poll_interval)
+
+   if latencies:
+      count = len(latencies)
+      print("   %-24s %8d %8.3f %8.3f %8.3f %8.1f" % (
+         name, count, 1000 * sum(latencies) / count, 1000 * latencies[int(count * 0.99)], 1000 * latencies[-1], cpu
+      ))
+   else:
+      print("   %-24s %8s %8s %8s %8s %8.1f" % (name, '-', '-', '-', '-', cpu))
+# for name, thru, poll_interval in [...]:
+print("")
+
+# Sending state: a changing color sends CCs and SysEx, a steady one nothing
+ag     = AcrylicGuitar()
+output = FakeOutput()
+thru   = midi_thru.MidiThru(ag, output)
+
+start = time.perf_counter_ns()
+for step in range(10000):
+   ag.set_current_color_rgb(step % 100, 50.0, 100 - (step % 100))
+   thru.send_state()
+changing_time = (time.perf_counter_ns() - start) / 10000
+
+start = time.perf_counter_ns()
+for step in range(10000):
+   thru.send_state()
+steady_time = (time.perf_counter_ns() - start) / 10000
+
+print("sending state")
+print("   %-24s %8.1f us" % ('color changing', changing_time / 1000.0))
+print("   %-24s %8.1f us" % ('color steady', steady_time / 1000.0))
+print("   %-24s %8d" % ('SysEx sent', output.sysex))
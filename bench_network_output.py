@@ -0,0 +1,94 @@
+#!/usr/bin/python
+
+# Drives every channel of many universes as fast as possible at a UDP listener on
+# localhost, checks what arrives, and reports frames and datagrams per second.
+#
+#    ./bench_network_output.py [artnet|sacn] [universes] [frames]
+
+
+import sys
+import time
+import socket
+import threading
+
+from acrylic_guitar import network_output
+
+
+protocol      = sys.argv[1] if len(sys.argv) > 1 else 'artnet'
+num_universes = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+num_frames    = int(sys.argv[3]) if len(sys.argv) > 3 else 2000
+
+
+# {{{ def listen(listener, received, stop_event):
+def listen(listener, received, stop_event):
+   while not stop_event.is_set():
+      try:
+         packet = listener.recv(1024)
+      except socket.timeout:
+         continue
+
+      received['packets'] += 1
+      received['bytes']   += len(packet)
+
+      if protocol == 'artnet' and not packet.startswith(b'Art-Net\x00'):
+         received['bad'] += 1
+      elif protocol == 'sacn' and packet[4:13] != b'ASC-E1.17':
+         received['bad'] += 1
+   # while not stop_event.is_set():
+# def listen(listener, received, stop_event):
+
+
+# }}}
+
+
+listener = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+listener.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 * 1024 * 1024)
+listener.bind(('127.0.0.1', 0))
+listener.settimeout(0.1)
+
+received   = {'packets': 0, 'bytes': 0, 'bad': 0}
+stop_event = threading.Event()
+thread     = threading.Thread(name='listener', target=listen, args=(listener, received, stop_event))
+thread.start()
+
+
+universes = list(range(1, num_universes + 1))
+output    = network_output.create_network_output(protocol, universes, '127.0.0.1', listener.getsockname()[1])
+
+
+try:
+   # Every frame touches all 170 RGB fixtures of every universe, one channel group at a time
+   start = time.perf_counter()
+
+   for frame in range(num_frames):
+      level = frame & 0xff
+      color = (level, 255 - level, (level * 7) & 0xff)
+
+      for universe in universes:
+         for channel in range(1, 511, 3):
+            output.set_channels(universe, channel, color)
+
+      output.send_frame()
+   # for frame in range(num_frames):
+
+   elapsed = time.perf_counter() - start
+
+
+   # A static frame should send nothing until the keep-alive is due
+   static_sent = output.send_frame()
+
+
+   # Give the listener a moment to drain its socket
+   time.sleep(0.5)
+
+finally:
+   stop_event.set()
+   thread.join()
+   output.close()
+   listener.close()
+
+
+print("%s: %d universes, %d frames in %0.3f sec" % (protocol, num_universes, num_frames, elapsed))
+print("   %0.1f frames/sec, %0.0f datagrams/sec" % (num_frames / elapsed, output.packets_sent / elapsed))
+print("   sent %d datagrams, received %d (%d bytes, %d malformed)" % (output.packets_sent, received['packets'], received['bytes'], received['bad']))
+print("   datagrams sent for an unchanged frame: %d" % static_sent)
@@ -0,0 +1,97 @@
+#!/usr/bin/python
+
+# Sweeps two knobs at several hundred CCs per second each against the parameter bus,
+# updating it once per 10 ms frame as the render loop does, and reports what a CC
+# and a frame's update cost and how many setting changes the sweep came to. Then
+# jumps a knob from one end to the other and shows the smoothed setting following.
+#
+#    ./bench_parameters.py [seconds]
+
+
+import sys
+import time
+
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 10.0
+
+CCS_PER_FRAME = 4
+
+
+# {{{ class CountingGuitar(AcrylicGuitar):
+class CountingGuitar(AcrylicGuitar):
+   # Counts setting changes as they land
+
+
+   # {{{ def __setattr__(self, name, value):
+   def __setattr__(self, name, value):
+      if name.isupper() and 'setting_changes' in self.__dict__:
+         self.__dict__['setting_changes'] += 1
+
+      object.__setattr__(self, name, value)
+   # def __setattr__(self, name, value):
+
+
+   # }}}
+# class CountingGuitar(AcrylicGuitar):
+
+
+# }}}
+
+
+ag = CountingGuitar()
+ag.setting_changes = 0
+
+bus            = ag.parameters
+frame_interval = ag.frame_clock.frame_interval
+num_frames     = int(duration / frame_interval)
+
+cc_time     = 0
+update_time = 0
+num_ccs     = 0
+
+for frame in range(num_frames):
+   # A triangle sweep on the volume and mod wheel CCs
+   for step in range(CCS_PER_FRAME):
+      position = (frame * CCS_PER_FRAME) + step
+      value    = position % 254
+      value    = value if value < 128 else 253 - value
+
+      start = time.perf_counter_ns()
+      bus.set_cc(7, value)
+      bus.set_cc(1, 127 - value)
+      cc_time += time.perf_counter_ns() - start
+
+      num_ccs += 2
+   # for step in range(CCS_PER_FRAME):
+
+   start = time.perf_counter_ns()
+   bus.update(frame * frame_interval)
+   update_time += time.perf_counter_ns() - start
+# for frame in range(num_frames):
+
+print("%0.0f sec at %0.0f fps, 2 knobs sweeping" % (duration, 1.0 / frame_interval))
+print("   %-28s %10d (%0.0f/sec)" % ('CCs received', num_ccs, num_ccs / duration))
+print("   %-28s %10d" % ('setting changes', ag.setting_changes))
+print("   %-28s %10.0f" % ('ns per CC', float(cc_time) / num_ccs))
+print("   %-28s %10.0f" % ('ns per frame update', float(update_time) / num_frames))
+print("")
+
+
+# A jump from full to nothing on the volume CC
+ag.DISPLAY_MANAGER__BRIGHTNESS = 1.0
+bus.set_cc(7, 127)
+for frame in range(num_frames, num_frames + 100):
+   bus.update(frame * frame_interval)
+
+bus.set_cc(7, 0)
+start_frame = num_frames + 100
+
+print("brightness after jumping the volume CC from 127 to 0 (%0.0f ms smoothing):" % (ag.CC_PARAMETERS__SMOOTHING_TIME * 1000))
+for frame in range(start_frame, start_frame + 40):
+   bus.update(frame * frame_interval)
+
+   if (frame - start_frame) % 4 == 0:
+      print("   %4.0f ms %8.3f" % ((frame - start_frame) * frame_interval * 1000, ag.DISPLAY_MANAGER__BRIGHTNESS))
+# for frame in range(start_frame, start_frame + 40):
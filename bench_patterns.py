@@ -0,0 +1,75 @@
+#!/usr/bin/python
+
+# Times picking crazy flash's next color the old way (random.choice over a fresh list
+# of the color names, retrying black and the current color) against the precomputed
+# color sequence, checks the sequence never repeats a color, wrapping round included,
+# and checks two guitars with the same seed pick the same colors and another seed doesn't.
+#
+#    ./bench_patterns.py [picks]
+
+
+import sys
+import time
+import random
+
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+picks = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+
+# {{{ def get_sequence(seed, count):
+def get_sequence(seed, count):
+   ag = AcrylicGuitar()
+   ag.PATTERN_SEED = seed
+
+   color_names = ag.patterns.get_color_sequence('crazy_flash', sorted([name for name in ag.colors if name != 'black']))
+
+   return [color_names.next() for pick in range(count)]
+# def get_sequence(seed, count):
+
+
+# }}}
+
+
+ag = AcrylicGuitar()
+ag.PATTERN_SEED = 1
+
+# The old way
+current_color_name = 'black'
+start = time.perf_counter_ns()
+for pick in range(picks):
+   new_color_name = None
+   while new_color_name in [None, 'black', current_color_name]:
+      new_color_name = random.choice(list(ag.colors.keys()))
+
+   current_color_name = new_color_name
+# for pick in range(picks):
+old_time = (time.perf_counter_ns() - start) / picks
+
+# The sequence, including building it
+start = time.perf_counter_ns()
+color_names = ag.patterns.get_color_sequence('crazy_flash', sorted([name for name in ag.colors if name != 'black']))
+build_time = (time.perf_counter_ns() - start) / 1000.0
+
+current_color_name = 'black'
+start = time.perf_counter_ns()
+for pick in range(picks):
+   current_color_name = color_names.next(current_color_name)
+new_time = (time.perf_counter_ns() - start) / picks
+
+print("%d picks from %d colors" % (picks, len(color_names.palette)))
+print("   %-34s %8.0f ns" % ('random.choice with retries', old_time))
+print("   %-34s %8.0f ns" % ('color sequence', new_time))
+print("   %-34s %8.0f us (%d bytes)" % ('building the sequence', build_time, len(color_names.indexes) * color_names.indexes.itemsize))
+print("")
+
+indexes = color_names.indexes
+repeats = len([position for position in range(len(indexes)) if indexes[position] == indexes[position - 1]])
+
+same      = get_sequence(42, 1000) == get_sequence(42, 1000)
+different = get_sequence(42, 1000) != get_sequence(43, 1000)
+
+print("   %-34s %8d" % ('repeats, wrapping round included', repeats))
+print("   %-34s %8s" % ('same seed, same colors', 'yes' if same else 'NO'))
+print("   %-34s %8s" % ('other seed, other colors', 'yes' if different else 'NO'))
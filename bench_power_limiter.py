@@ -0,0 +1,104 @@
+#!/usr/bin/python
+
+# Times the power limiter per frame, and summing the current of pixel buffers of a
+# few sizes. Then plays crazy flash colors on a strip of 60 LEDs (3.6 A at full
+# white) against a 2 A budget, with the release smoothing and without, and reports
+# the current before and after limiting, how often the limiter kicked in, and how much
+# the scale swung about frame to frame.
+#
+#    ./bench_power_limiter.py [seconds]
+
+
+import sys
+import time
+import array
+
+from acrylic_guitar import power_limiter
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 30.0
+
+ITERATIONS = 20000
+PIXELS     = 60
+BUDGET     = 2.0
+
+
+# {{{ def simulate(release_time):
+def simulate(release_time):
+   ag = AcrylicGuitar()
+   ag.PATTERN_SEED                = 1
+   ag.POWER_LIMITER__BUDGET       = BUDGET
+   ag.POWER_LIMITER__PIXELS       = PIXELS
+   ag.POWER_LIMITER__RELEASE_TIME = release_time
+
+   limiter        = ag.power_limiter
+   frame_interval = ag.frame_clock.frame_interval
+   frames_held    = max(1, int(round(ag.DISPLAY_MANAGER__FLASH_INTERVAL / frame_interval)))
+   colors         = ag.patterns.get_color_sequence('crazy_flash', sorted([name for name in ag.colors if name != 'black']))
+
+   max_before = 0.0
+   max_after  = 0.0
+   over       = 0
+   swing      = 0.0
+   scale      = 1.0
+
+   for frame in range(int(duration / frame_interval)):
+      if frame % frames_held == 0:
+         color = ag.colors[colors.next()]
+
+      current    = limiter.get_current(color['red'], color['green'], color['blue'], PIXELS)
+      last_scale = scale
+      scale      = limiter.limit(current, frame * frame_interval)
+
+      max_before = max(max_before, current)
+      max_after  = max(max_after, current * scale)
+      over      += 1 if current > BUDGET else 0
+      swing     += abs(scale - last_scale)
+   # for frame in range(int(duration / frame_interval)):
+
+   return (max_before, max_after, over, ag.metric_power_limiter_activations.value, swing / duration)
+# def simulate(release_time):
+
+
+# }}}
+
+
+ag = AcrylicGuitar()
+
+start = time.perf_counter_ns()
+for iteration in range(ITERATIONS):
+   ag.get_output_scale(100.0, 100.0, 100.0)
+off_time = (time.perf_counter_ns() - start) / ITERATIONS
+
+ag.POWER_LIMITER__BUDGET = BUDGET
+ag.POWER_LIMITER__PIXELS = PIXELS
+
+start = time.perf_counter_ns()
+for iteration in range(ITERATIONS):
+   ag.get_output_scale(100.0, 100.0, 100.0)
+on_time = (time.perf_counter_ns() - start) / ITERATIONS
+
+print("per frame, one color")
+print("   %-36s %8.0f ns" % ('no budget', off_time))
+print("   %-36s %8.0f ns" % ('limiting', on_time))
+print("")
+
+print("summing a pixel buffer (numpy %s)" % ('installed' if power_limiter.get_numpy() else 'not installed'))
+for pixels in [60, 600, 6000]:
+   buffer = array.array('d', [50.0, 25.0, 75.0] * pixels)
+
+   start = time.perf_counter_ns()
+   for iteration in range(1000):
+      ag.power_limiter.get_buffer_current(buffer)
+   print("   %-36s %8.1f us" % ('%d pixels' % pixels, (time.perf_counter_ns() - start) / 1000.0 / 1000.0))
+# for pixels in [60, 600, 6000]:
+print("")
+
+print("%0.0f sec of crazy flash, %d LEDs, %0.1f A budget" % (duration, PIXELS, BUDGET))
+print("   %-16s %12s %12s %12s %12s %12s" % ('release', 'max A before', 'max A after', 'frames over', 'activations', 'swing/sec'))
+for release_time in [0.0, ag.POWER_LIMITER__RELEASE_TIME]:
+   max_before, max_after, over, activations, swing = simulate(release_time)
+
+   print("   %-16s %12.2f %12.2f %12d %12d %12.2f" % ('%0.1f sec' % release_time, max_before, max_after, over, activations, swing))
+# for release_time in [0.0, ag.POWER_LIMITER__RELEASE_TIME]:
@@ -0,0 +1,52 @@
+#!/usr/bin/python
+
+# Measures what a profiled span costs with profiling off and on, then writes a
+# short sample trace to open in about://tracing.
+#
+#    ./bench_profiler.py [spans] [trace path]
+
+
+import sys
+import time
+import timeit
+
+from acrylic_guitar import profiler
+
+
+num_spans  = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+trace_path = sys.argv[2] if len(sys.argv) > 2 else '/tmp/bench_profiler_trace.json'
+
+
+# {{{ def work(profile):
+def work(profile):
+   # A span exactly as the hot path writes one, around no work at all
+   profiling = profile.enabled
+   if profiling: span_start = time.perf_counter_ns()
+
+   if profiling: profile.record(profiler.STAGE_COLOR_MATH, span_start, time.perf_counter_ns())
+# def work(profile):
+
+
+# }}}
+
+
+profile = profiler.Profiler()
+
+for enabled in [False, True]:
+   profile.enabled = enabled
+   elapsed = min(timeit.repeat('work(profile)', globals=globals(), number=num_spans, repeat=5))
+   print("profiling %-8s %6.1f ns/span" % ('on:' if enabled else 'off:', elapsed / num_spans * 1e9))
+# for enabled in [False, True]:
+
+baseline = min(timeit.repeat('pass', number=num_spans, repeat=5))
+print("empty statement  %6.1f ns" % (baseline / num_spans * 1e9))
+
+
+profile.clear()
+for stage in range(len(profiler.STAGE_NAMES)):
+   start = time.perf_counter_ns()
+   time.sleep(0.001)
+   profile.record(stage, start, time.perf_counter_ns())
+# for stage in range(len(profiler.STAGE_NAMES)):
+
+print("wrote %s" % profile.dump(trace_path))
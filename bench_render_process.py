@@ -0,0 +1,113 @@
+#!/usr/bin/python
+
+# Compares frame timing at the outputs with rendering in-process and in a separate
+# render process, while a thread in the main process hogs the interpreter the way
+# a burst of pretty-printed MIDI logging does. Needs no hardware.
+#
+#    ./bench_render_process.py [seconds]
+
+
+import sys
+import time
+import pprint
+
+from acrylic_guitar import backends
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+from acrylic_guitar.backends.null import NullOutput
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 3.0
+
+
+# {{{ class TimingOutput(NullOutput):
+class TimingOutput(NullOutput):
+   # Keeps the time of every frame that reaches the output
+   write_times = []
+
+   # {{{ def write(self, red, green, blue):
+   def write(self, red, green, blue):
+      TimingOutput.write_times.append(time.monotonic())
+      NullOutput.write(self, red, green, blue)
+   # def write(self, red, green, blue):
+
+
+   # }}}
+# class TimingOutput(NullOutput):
+
+
+# }}}
+
+backends.BACKENDS['timing'] = ('__main__', 'TimingOutput')
+
+
+# {{{ def midi_burst(stop_event):
+def midi_burst(stop_event):
+   # Format a stream of fake MIDI messages as verbosely as the old reader did
+   message = [[[144, 60, 100, 0], 1234]] * 64
+
+   while not stop_event.is_set():
+      pprint.pformat(message)
+# def midi_burst(stop_event):
+
+
+# }}}
+# {{{ def measure(render_process):
+def measure(render_process):
+   TimingOutput.write_times = []
+
+   ag = AcrylicGuitar()
+   ag.OUTPUT_BACKENDS = ['timing']
+   ag.RENDER_PROCESS  = render_process
+   ag.display_mode    = DisplayMode.random_glow
+
+   threads = {}
+
+   if render_process:
+      from acrylic_guitar import render_process as render_process_module
+
+      ag.render_link = render_process_module.RenderLink()
+      ag.render_process, ag.render_stop_event = render_process_module.start_render_process(ag, ag.render_link)
+      ag.start_thread(threads, 'frame_pump', ag.frame_pump)
+   else:
+      ag.start_thread(threads, 'display_manager', ag.display_manager)
+   # else:
+
+   # Let things settle, then measure under load
+   time.sleep(1.0)
+
+   ag.start_thread(threads, 'midi_burst', midi_burst)
+   start = time.monotonic()
+   time.sleep(duration)
+
+   for thread in threads.values():
+      thread['stopper'].set()
+   ag.display_mode_change_event.set()
+
+   for thread in threads.values():
+      thread['thread'].join()
+
+   ag.cleanup()
+
+   times     = [t for t in TimingOutput.write_times if t >= start]
+   intervals = sorted([(b - a) for a, b in zip(times, times[1:])])
+
+   return (len(times), intervals)
+# def measure(render_process):
+
+
+# }}}
+
+
+if __name__ == '__main__':
+   # The render process is spawned, and re-imports this script
+   print("%0.1f sec of random_glow per run, with a busy thread in the main process" % duration)
+
+   for render_process in [False, True]:
+      frames, intervals = measure(render_process)
+
+      print("   %-16s %5d frames, interval median %6.2f ms, p99 %6.2f ms, max %6.2f ms" % (
+         'render process:' if render_process else 'in process:', frames,
+         intervals[len(intervals) // 2] * 1000, intervals[int(len(intervals) * 0.99)] * 1000, intervals[-1] * 1000
+      ))
+   # for render_process in [False, True]:
+# if __name__ == '__main__':
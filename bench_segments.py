@@ -0,0 +1,103 @@
+#!/usr/bin/python
+
+# Runs the random glow with short and long fades, writing every frame (the null
+# output) and handing each fade over as a segment (the fake segment output), and
+# reports the Python calls the display manager made per second and per fade, the
+# writes and segments sent, and how the segments' timing held up: how many arrived
+# after the frame they were due to start in, the latest any arrived, and how many
+# started away from the color being shown. Random glow fades back to back, so each
+# run covers its length over the fade time fades. Call counting slows things down,
+# so timing comes from a second run without it.
+#
+#    ./bench_segments.py [seconds]
+
+
+import sys
+import time
+import threading
+
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+
+FADE_TIMES = [0.5, 2.0]
+
+
+# {{{ def measure(backend, fade_time, count_calls):
+def measure(backend, fade_time, count_calls):
+   ag = AcrylicGuitar()
+   ag.OUTPUT_BACKENDS = [backend]
+   ag.display_mode    = DisplayMode.random_glow
+
+   ag.DISPLAY_MANAGER__GLOW_COLOR_SPEED = fade_time
+
+   calls = [0]
+
+   # {{{ def count_call(frame, event, arg):
+   def count_call(frame, event, arg):
+      if event == 'call' or event == 'c_call':
+         calls[0] += 1
+   # def count_call(frame, event, arg):
+
+
+   # }}}
+
+   stop_event = threading.Event()
+   thread     = threading.Thread(target=ag.display_manager, args=(stop_event,))
+
+   if count_calls:
+      threading.setprofile(count_call)
+   thread.start()
+   threading.setprofile(None)
+
+   # Let it settle into the mode before measuring
+   time.sleep(0.5)
+
+   output    = ag.outputs[0]
+   calls[0]  = 0
+   writes    = output.frames_written
+   cpu_start = time.process_time()
+   start     = time.perf_counter()
+
+   # Long enough for a good few fades however long they are
+   time.sleep(max(duration, fade_time * 5))
+
+   elapsed  = time.perf_counter() - start
+   cpu_used = time.process_time() - cpu_start
+   results  = {
+      'calls'   : calls[0] / elapsed,
+      'per_fade': calls[0] * fade_time / elapsed,
+      'writes'  : (output.frames_written - writes) / elapsed,
+      'cpu'     : 100.0 * cpu_used / elapsed,
+      'segments': getattr(output, 'segments_played', 0),
+      'late'    : getattr(output, 'segments_late', 0),
+      'max_lag' : getattr(output, 'max_start_lag', 0.0),
+      'jumps'   : getattr(output, 'segment_jumps', 0),
+   }
+
+   stop_event.set()
+   thread.join()
+   ag.cleanup()
+
+   return results
+# def measure(backend, fade_time, count_calls):
+
+
+# }}}
+
+
+print("At least %0.1f sec of random glow per run" % duration)
+print("   %-14s %6s %10s %10s %10s %8s %9s %6s %12s %6s" % ('output', 'fade', 'calls/s', 'calls/fade', 'writes/s', 'CPU %', 'segments', 'late', 'max lag ms', 'jumps'))
+
+for backend in ['null', 'fake_segments']:
+   for fade_time in FADE_TIMES:
+      counted = measure(backend, fade_time, True)
+      results = measure(backend, fade_time, False)
+
+      print("   %-14s %6.1f %10.0f %10.0f %10.1f %7.1f%% %9d %6d %12.2f %6d" % (
+         backend, fade_time, counted['calls'], counted['per_fade'], results['writes'], results['cpu'],
+         results['segments'], results['late'], results['max_lag'] * 1000, results['jumps']
+      ))
+   # for fade_time in FADE_TIMES:
+# for backend in ['null', 'fake_segments']:
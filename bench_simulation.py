@@ -0,0 +1,126 @@
+#!/usr/bin/python
+
+# Runs every display mode for minutes of simulated stage time, with notes played
+# throughout and the mode switched off partway, and checks the frames written: frame
+# numbers never go back, colors stay within 0-100%, the lights are black soon after
+# switching off, the same run twice gives exactly the same frames, and crazy flash
+# (jump) never shows the same color twice in a row. Reports how long each took
+# against the stage time it covered. Exits 1 if any check fails.
+#
+#    ./bench_simulation.py [minutes]
+
+
+import sys
+import time
+
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+from acrylic_guitar.simulation import Simulation
+
+
+minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+
+duration = minutes * 60.0
+off_at   = duration * 0.75
+
+
+# {{{ def simulate(display_mode):
+def simulate(display_mode):
+   ag = AcrylicGuitar()
+   ag.display_mode = display_mode
+
+   simulation = Simulation(ag)
+
+   # A note every half second, held for 0.2 sec, up to switching off
+   note_time = 1.0
+   while note_time < off_at:
+      key = 40 + int(note_time * 2) % 20
+      simulation.play_at(note_time, key, 100)
+      simulation.play_at(note_time + 0.2, key, 0)
+
+      note_time += 0.5
+   # while note_time < off_at:
+
+   simulation.set_mode_at(off_at, DisplayMode.off)
+
+   start  = time.perf_counter()
+   frames = simulation.run(duration)
+
+   return (ag, frames, time.perf_counter() - start)
+# def simulate(display_mode):
+
+
+# }}}
+# {{{ def check(ag, frames, again):
+def check(ag, frames, again):
+   failures = []
+
+   if not frames:
+      return ['no frames']
+
+   if [frame for frame in range(1, len(frames)) if frames[frame][0] < frames[frame - 1][0]]:
+      failures.append('frames went back')
+
+   if [color for color in frames if min(color[1:]) < 0.0 or max(color[1:]) > 100.0]:
+      failures.append('color out of range')
+
+   # Off fades to black over a flash interval, plus one frame to notice
+   off_frame = int((off_at + ag.DISPLAY_MANAGER__FLASH_INTERVAL) / ag.frame_clock.frame_interval) + 1
+   if [color for color in frames if color[0] > off_frame and max(color[1:]) > 0.0]:
+      failures.append('not black after off')
+
+   if frames != again:
+      failures.append('runs differ')
+
+   return failures
+# def check(ag, frames, again):
+
+
+# }}}
+# {{{ def get_jump_repeats(frames, end_frame):
+def get_jump_repeats(frames, end_frame):
+   # Times crazy flash (jump) showed the same color twice in a row. Each flash is
+   # written on a frame of its own; a fade ending and the next starting can write the
+   # same frame twice, so only the last write to each frame counts.
+   flashes = []
+   for color in frames:
+      if color[0] >= end_frame:
+         break
+
+      if flashes and flashes[-1][0] == color[0]:
+         flashes[-1] = color
+      else:
+         flashes.append(color)
+   # for color in frames:
+
+   return len([index for index in range(1, len(flashes)) if flashes[index][1:] == flashes[index - 1][1:]])
+# def get_jump_repeats(frames, end_frame):
+
+
+# }}}
+
+
+print("%0.0f min of stage time per mode, switched off at %0.0f min" % (minutes, off_at / 60.0))
+print("   %-28s %8s %10s %10s  %s" % ('mode', 'frames', 'wall ms', 'speedup', 'checks'))
+
+failed = False
+for display_mode in DisplayMode.get_modes():
+   ag, frames, wall_time = simulate(display_mode)
+   ignored, again, ignored = simulate(display_mode)
+
+   failures = check(ag, frames, again)
+
+   if display_mode == DisplayMode.crazy_flash_jump:
+      end_frame = int(off_at / ag.frame_clock.frame_interval)
+      if get_jump_repeats(frames, end_frame):
+         failures.append('color repeated')
+   # if display_mode == DisplayMode.crazy_flash_jump:
+
+   failed = failed or bool(failures)
+
+   name = [name for name in dir(DisplayMode) if getattr(DisplayMode, name) == display_mode][0]
+   print("   %-28s %8d %10.1f %9.0fx  %s" % (
+      '%d %s' % (display_mode, name), len(frames), wall_time * 1000, duration / wall_time, ', '.join(failures) if failures else 'ok'
+   ))
+# for display_mode in DisplayMode.get_modes():
+
+sys.exit(1 if failed else 0)
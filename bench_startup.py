@@ -0,0 +1,89 @@
+#!/usr/bin/python
+
+# Measures how long the package takes to import, and how long a fresh process
+# takes from launch to first light (the first frame reaching an output). Runs
+# with the null backend, so it needs no hardware, and checks that neither pygame
+# nor RPi.GPIO got loaded on the way.
+#
+#    ./bench_startup.py [runs]
+
+
+import sys
+import time
+import subprocess
+
+
+num_runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+
+IMPORT_SCRIPT = '''
+import time
+start = time.perf_counter()
+import acrylic_guitar.guitar
+print(time.perf_counter() - start)
+'''
+
+FIRST_LIGHT_SCRIPT = '''
+import sys
+import time
+import threading
+
+from acrylic_guitar.guitar import AcrylicGuitar
+
+ag = AcrylicGuitar()
+ag.OUTPUT_BACKENDS = ['null']
+
+stop_event = threading.Event()
+thread = threading.Thread(target=ag.display_manager, args=(stop_event,))
+thread.daemon = True
+thread.start()
+
+while not (ag.outputs and ag.outputs[0].first_write_time):
+   time.sleep(0.0005)
+
+print(ag.outputs[0].first_write_time)
+print(' '.join([name for name in ['pygame', 'RPi'] if name in sys.modules]))
+'''
+
+
+# {{{ def run_python(script):
+def run_python(script):
+   return subprocess.check_output([sys.executable, '-c', script]).decode('utf-8').split('\n')
+# def run_python(script):
+
+
+# }}}
+
+
+baseline_times    = []
+import_times      = []
+first_light_times = []
+heavy_modules     = set()
+
+for run in range(num_runs):
+   start = time.monotonic()
+   run_python('pass')
+   baseline_times.append(time.monotonic() - start)
+
+   import_times.append(float(run_python(IMPORT_SCRIPT)[0]))
+
+   # Both processes read the same monotonic clock, so the child's first light
+   # time can be compared with when we launched it
+   start  = time.monotonic()
+   output = run_python(FIRST_LIGHT_SCRIPT)
+   first_light_times.append(float(output[0]) - start)
+   heavy_modules.update(output[1].split())
+# for run in range(num_runs):
+
+
+print("%d runs (best / median)" % num_runs)
+for name, times in [
+   ('bare interpreter'              , baseline_times),
+   ('import acrylic_guitar.guitar'  , import_times),
+   ('launch to first light'         , first_light_times),
+]:
+   times.sort()
+   print("   %-30s %7.1f ms / %7.1f ms" % (name, times[0] * 1000, times[len(times) // 2] * 1000))
+# for name, times in [...]:
+
+print("   heavy modules loaded: %s" % (', '.join(sorted(heavy_modules)) if heavy_modules else 'none'))
@@ -0,0 +1,93 @@
+#!/usr/bin/python
+
+# Times publishing the guitar's state to the state file and reading it back, then
+# reads as fast as possible while another process publishes as fast as possible, and
+# reports how many reads got a consistent state and how many found nothing new.
+#
+#    ./bench_state_export.py [seconds]
+
+
+import os
+import sys
+import time
+import tempfile
+import multiprocessing
+
+from acrylic_guitar import state_export
+from acrylic_guitar.guitar import AcrylicGuitar
+
+
+duration = float(sys.argv[1]) if len(sys.argv) > 1 else 2.0
+
+ITERATIONS = 20000
+
+
+# {{{ def publish_flat_out(path, duration):
+def publish_flat_out(path, duration):
+   ag = AcrylicGuitar()
+   exporter = state_export.StateExporter(ag, path, 0)
+
+   end = time.monotonic() + duration
+   while time.monotonic() < end:
+      ag.keys[48] = 0 if ag.keys[48] else 100
+      ag.update_key_stats()
+
+      exporter.publish()
+   # while time.monotonic() < end:
+
+   exporter.close()
+# def publish_flat_out(path, duration):
+
+
+# }}}
+
+
+if __name__ == '__main__':
+   path = os.path.join(tempfile.mkdtemp(), 'state')
+
+   ag       = AcrylicGuitar()
+   exporter = state_export.StateExporter(ag, path, 0)
+   reader   = state_export.StateReader(path)
+
+   start = time.perf_counter_ns()
+   for iteration in range(ITERATIONS):
+      exporter.publish()
+   publish_time = (time.perf_counter_ns() - start) / ITERATIONS
+
+   start = time.perf_counter_ns()
+   for iteration in range(ITERATIONS):
+      reader.read()
+   read_time = (time.perf_counter_ns() - start) / ITERATIONS
+
+   print("%-36s %8.0f ns" % ('publish', publish_time))
+   print("%-36s %8.0f ns" % ('read', read_time))
+
+   # Now against a writer in another process that never lets up
+   writer = multiprocessing.Process(target=publish_flat_out, args=(path, duration + 0.5))
+   writer.start()
+   time.sleep(0.25)
+
+   reads         = 0
+   new_states    = 0
+   last_sequence = None
+
+   end = time.monotonic() + duration
+   while time.monotonic() < end:
+      state = reader.read(last_sequence)
+      reads += 1
+
+      if state:
+         new_states   += 1
+         last_sequence = state['sequence']
+      # if state:
+   # while time.monotonic() < end:
+
+   writer.join()
+   reader.close()
+   exporter.close()
+
+   print("")
+   print("against a writer publishing flat out for %0.1f sec:" % duration)
+   print("   %-32s %10.0f" % ('reads/sec', reads / duration))
+   print("   %-32s %10.0f" % ('new states/sec', new_states / duration))
+   print("   %-32s %10d" % ('states published', (last_sequence or 0) // 2))
@@ -0,0 +1,100 @@
+#!/usr/bin/python
+
+# Measures what one frame costs the zone scheduler for 1 to 32 zones, cycling the
+# zones through every display mode and playing a new note every few frames so the
+# note modes keep fading. Frames are rendered back to back to the null backend,
+# without waiting for the frame clock. The layered runs add a velocity flash and a
+# dimming layer over every zone, and keep crossfading between display modes.
+#
+#    ./bench_zones.py [frames]
+
+
+import sys
+import time
+
+from acrylic_guitar import zones
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+
+
+num_frames  = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+zone_counts = [1, 2, 4, 8, 16, 32]
+
+
+# {{{ def measure(num_zones, layered):
+def measure(num_zones, layered):
+   ag = AcrylicGuitar()
+   modes = DisplayMode.get_modes()
+
+   ag.ZONES = [
+      {'name': 'zone%d' % index, 'display_mode': modes[index % len(modes)], 'keys': (index, index + 48), 'backends': ['null']}
+      for index in range(num_zones)
+   ]
+
+   if layered:
+      ag.DISPLAY_MANAGER__CROSSFADE_TIME = 1.0
+
+      for index, zone in enumerate(ag.ZONES):
+         # Half the zones follow the guitar's display mode, so they crossfade
+         if index % 2:
+            zone['display_mode'] = None
+
+         zone['layers'] = [
+            {'display_mode': DisplayMode.flash_lowest_midi_key_on, 'blend': 'add'},
+            {'display_mode': DisplayMode.random_glow, 'blend': 'multiply', 'opacity': 0.5},
+         ]
+      # for index, zone in enumerate(ag.ZONES):
+   # if layered:
+
+   scheduler = zones.ZoneScheduler(ag, zones.create_zones(ag))
+   scheduler.start()
+
+   frame = ag.mode_epoch_frame
+   start = time.perf_counter()
+
+   for count in range(num_frames):
+      # A new lowest note every 25 frames
+      if count % 25 == 0:
+         with ag.midi_data_lock:
+            ag.keys[36 + (count // 25) % 24] = 100
+            ag.keys[36 + (count // 25 - 1) % 24] = 0
+            ag.update_key_stats()
+         # with ag.midi_data_lock:
+      # if count % 25 == 0:
+
+      # A new display mode every 150 frames, crossfading for the next 100
+      if layered and count % 150 == 0:
+         ag.display_mode = modes[(count // 150) % len(modes)]
+         # New modes start on the frame after the current one
+         ag.frame_clock.current_frame = lambda: frame - 1
+         scheduler.start_display_mode()
+      # if layered and count % 150 == 0:
+
+      scheduler.render_frame(frame)
+      frame += 1
+   # for count in range(num_frames):
+
+   elapsed = time.perf_counter() - start
+
+   ag.cleanup()
+
+   return elapsed / num_frames
+# def measure(num_zones, layered):
+
+
+# }}}
+
+
+frame_interval = AcrylicGuitar().frame_clock.frame_interval
+
+print("%d frames per run (%0.0f ms frame interval)" % (num_frames, frame_interval * 1000))
+
+for layered in [False, True]:
+   print("   %s" % ('3 layers per zone, crossfading:' if layered else '1 layer per zone:'))
+   print("   %6s %12s %12s %10s" % ('zones', 'us/frame', 'us/zone', 'frame %'))
+
+   for num_zones in zone_counts:
+      per_frame = measure(num_zones, layered)
+
+      print("   %6d %12.1f %12.2f %9.2f%%" % (num_zones, per_frame * 1e6, per_frame * 1e6 / num_zones, 100.0 * per_frame / frame_interval))
+   # for num_zones in zone_counts:
+# for layered in [False, True]:
@@ -0,0 +1,206 @@
+#!/usr/bin/python
+
+# Pins the colors each display mode shows at chosen frames, running it on simulated
+# time with the same notes each time: E3 (52) and G3 (55) on together at 1 sec, E3
+# off at 1.5 sec, G3 off at 2 sec, then the mode switched off at 2.5 sec. Frames
+# are 10 ms apart, so the notes land on frames 100, 150 and 200 and off on 250.
+#
+#    python -m pytest -q tests
+
+
+from acrylic_guitar.guitar import AcrylicGuitar, DisplayMode
+from acrylic_guitar.simulation import Simulation
+
+
+BLACK = (0.0, 0.0, 0.0)
+
+
+# {{{ def simulate(display_mode, seed = 0):
+def simulate(display_mode, seed = 0):
+   # Three seconds of display_mode, as {frame: (red, green, blue)} rounded to 0.001%
+   ag = AcrylicGuitar()
+   ag.display_mode = display_mode
+
+   simulation = Simulation(ag, seed=seed)
+
+   simulation.play_at(1.0, 52, 100)
+   simulation.play_at(1.0, 55, 60)
+   simulation.play_at(1.5, 52, 0)
+   simulation.play_at(2.0, 55, 0)
+   simulation.set_mode_at(2.5, DisplayMode.off)
+
+   colors = {}
+   for frame, red, green, blue in simulation.run(3.0):
+      colors[frame] = (round(red, 3), round(green, 3), round(blue, 3))
+
+   return colors
+# def simulate(display_mode, seed = 0):
+
+
+# }}}
+# {{{ def pick(colors, frames):
+def pick(colors, frames):
+   return dict([(frame, colors[frame]) for frame in frames])
+# def pick(colors, frames):
+
+
+# }}}
+# {{{ def test_off():
+def test_off():
+   # Notes or not, nothing lights
+   colors = simulate(DisplayMode.off)
+
+   assert colors
+   assert set(colors.values()) == set([BLACK])
+# def test_off():
+
+
+# }}}
+# {{{ def test_off_fades_out():
+def test_off_fades_out():
+   # Switching off fades from the color showing to black over the flash interval
+   colors = simulate(DisplayMode.random_glow)
+
+   assert pick(colors, range(250, 258)) == {
+      250: (100.0, 65.333, 0.0),
+      251: (100.0, 65.333, 0.0),
+      252: (83.333, 54.444, 0.0),
+      253: (66.667, 43.556, 0.0),
+      254: (50.0, 32.667, 0.0),
+      255: (33.333, 21.778, 0.0),
+      256: (16.667, 10.889, 0.0),
+      257: BLACK,
+   }
+# def test_off_fades_out():
+
+
+# }}}
+# {{{ def test_random_glow():
+def test_random_glow():
+   # Fades from black to red and on towards yellow, taking no notice of the notes
+   colors = simulate(DisplayMode.random_glow)
+
+   assert pick(colors, [0, 20, 150, 160, 249]) == {
+      0:   BLACK,
+      20:  (12.667, 0.0, 0.0),
+      150: (99.333, 0.0, 0.0),
+      160: (100.0, 6.0, 0.0),
+      249: (100.0, 65.333, 0.0),
+   }
+# def test_random_glow():
+
+
+# }}}
+# {{{ def test_random_glow_midi_velocity():
+def test_random_glow_midi_velocity():
+   # The random glow's colors scaled by the velocity of the keys held: 100/127 while
+   # E3 is, and the 50% floor with only G3's 60 or nothing held
+   colors = simulate(DisplayMode.random_glow_midi_velocity)
+
+   assert pick(colors, [0, 50, 100, 150, 200, 249]) == {
+      0:   BLACK,
+      50:  (16.333, 0.0, 0.0),
+      100: (51.969, 0.0, 0.0),
+      150: (49.667, 0.0, 0.0),
+      200: (50.0, 16.333, 0.0),
+      249: (50.0, 32.667, 0.0),
+   }
+# def test_random_glow_midi_velocity():
+
+
+# }}}
+# {{{ def test_crazy_flash_jump():
+def test_crazy_flash_jump():
+   # A new color every flash interval, jumped to, in the seed's order
+   colors = simulate(DisplayMode.crazy_flash_jump)
+
+   assert pick(colors, [0, 7, 13, 19, 25, 31, 37, 43, 103, 145]) == {
+      0:   (0.0, 0.0, 100.0),
+      7:   (100.0, 0.0, 0.0),
+      13:  (0.0, 100.0, 100.0),
+      19:  (100.0, 100.0, 0.0),
+      25:  (100.0, 0.0, 0.0),
+      31:  (100.0, 100.0, 0.0),
+      37:  (100.0, 0.0, 100.0),
+      43:  (0.0, 0.0, 100.0),
+      103: (100.0, 13.0, 0.0),
+      145: (90.0, 9.0, 35.0),
+   }
+
+   # Another seed, another order
+   colors = simulate(DisplayMode.crazy_flash_jump, seed=1)
+
+   assert pick(colors, [0, 7, 13, 19]) == {
+      0:  (100.0, 100.0, 100.0),
+      7:  (90.0, 9.0, 35.0),
+      13: (0.0, 100.0, 0.0),
+      19: (100.0, 100.0, 0.0),
+   }
+# def test_crazy_flash_jump():
+
+
+# }}}
+# {{{ def test_crazy_flash_fade():
+def test_crazy_flash_fade():
+   colors = simulate(DisplayMode.crazy_flash_fade)
+
+   assert pick(colors, [0, 13, 25, 49, 106, 114, 122, 130]) == {
+      0:   BLACK,
+      13:  (100.0, 0.0, 0.0),
+      25:  (100.0, 100.0, 0.0),
+      49:  (0.0, 0.0, 100.0),
+      106: (100.0, 6.5, 50.0),
+      114: (100.0, 85.5, 0.0),
+      122: (16.667, 0.0, 83.333),
+      130: (50.0, 50.0, 0.0),
+   }
+# def test_crazy_flash_fade():
+
+
+# }}}
+# {{{ def test_glow_lowest_midi_key_on():
+def test_glow_lowest_midi_key_on():
+   # Fades up to E3's color and glows, moves to G3's once E3 is let go, and fades
+   # out after G3
+   colors = simulate(DisplayMode.glow_lowest_midi_key_on)
+
+   assert pick(colors, [100, 101, 106, 107, 150, 151, 156, 157, 200, 201, 206]) == {
+      100: BLACK,
+      101: (15.833, 0.0, 0.0),
+      106: (95.0, 0.0, 0.0),
+      107: (95.033, 0.033, 0.033),
+      150: (96.433, 1.433, 1.433),
+      151: (94.528, 1.861, 6.194),
+      156: (85.0, 4.0, 30.0),
+      157: (85.067, 4.067, 30.067),
+      200: (87.867, 6.867, 32.867),
+      201: (73.222, 5.722, 27.389),
+      206: BLACK,
+   }
+# def test_glow_lowest_midi_key_on():
+
+
+# }}}
+# {{{ def test_flash_lowest_midi_key_on():
+def test_flash_lowest_midi_key_on():
+   # Flashes up to E3's color and decays, flashes to G3's once E3 is let go, and
+   # fades out after G3
+   colors = simulate(DisplayMode.flash_lowest_midi_key_on)
+
+   assert pick(colors, [100, 101, 106, 107, 150, 151, 156, 157, 200, 201, 206]) == {
+      100: BLACK,
+      101: (16.667, 0.0, 0.0),
+      106: (100.0, 0.0, 0.0),
+      107: (99.667, 0.0, 0.0),
+      150: (85.667, 0.0, 0.0),
+      151: (86.389, 1.5, 5.833),
+      156: (90.0, 9.0, 35.0),
+      157: (89.7, 8.97, 34.883),
+      200: (77.1, 7.71, 29.983),
+      201: (64.25, 6.425, 24.986),
+      206: BLACK,
+   }
+# def test_flash_lowest_midi_key_on():
+
+
+# }}}